@@ -1,13 +1,31 @@
 import os
+import json
 import random
+import argparse
+import itertools
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageFont
 
-def create_dummy_chart(filename, chart_type="bar"):
-    """Creates a simple chart image (bar or pie)."""
+# Vocabulary for synthetic benchmark corpora: every document gets its own
+# "<adjective> <subject> in <region>" topic, so each query has one right answer
+ADJECTIVES = ["Quarterly", "Annual", "Regional", "Strategic", "Operational", "Projected",
+              "Historical", "Sustainable", "Emerging", "Consolidated", "Seasonal", "Competitive"]
+SUBJECTS = ["Battery Recycling", "Coffee Exports", "Wind Energy", "Freight Logistics", "Cloud Spending",
+            "Dairy Production", "Semiconductor Supply", "Hospital Staffing", "Rail Ridership",
+            "Textile Imports", "Water Utilities", "Insurance Claims", "Solar Installations",
+            "Retail Footfall", "Copper Mining"]
+REGIONS = ["Norway", "Kenya", "Chile", "Vietnam", "Portugal", "Canada", "Peru", "Malaysia",
+           "Finland", "Morocco", "Uruguay", "Ireland"]
+
+def create_dummy_chart(filename, chart_type="bar", title=None, verbose=True):
+    """Creates a simple chart image (bar or pie), optionally captioned with a title."""
     img = Image.new('RGB', (400, 300), color='white')
     d = ImageDraw.Draw(img)
+
+    if title:
+        # Large enough for OCR to read back
+        d.text((10, 8), title, fill="black", font=ImageFont.load_default(size=14))
     
     if chart_type == "bar":
         # Draw random bars
@@ -27,7 +45,8 @@ def create_dummy_chart(filename, chart_type="bar"):
         d.pieslice([100, 50, 300, 250], 90, 360, fill="green")
     
     img.save(filename)
-    print(f"Created image: {filename}")
+    if verbose:
+        print(f"Created image: {filename}")
 
 def create_dummy_pdf(filename, topic, image_path=None):
     """Creates a PDF with random text and optional image."""
@@ -47,7 +66,88 @@ def create_dummy_pdf(filename, topic, image_path=None):
     c.save()
     print(f"Created PDF: {filename}")
 
-if __name__ == "__main__":
+def create_report_pdf(filename, topic, facts, image_path=None, pages=1):
+    """Creates a multi-page report on one topic: one fact per paragraph, chart on page 1."""
+    c = canvas.Canvas(filename, pagesize=letter)
+
+    for page in range(pages):
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(100, 750, f"Report on {topic}" + (f" (continued, page {page + 1})" if page else ""))
+        c.setFont("Helvetica", 12)
+        y = 720
+        for fact in facts[page::pages]:
+            c.drawString(100, y, fact)
+            y -= 20
+
+        if image_path and page == 0:
+            c.drawImage(image_path, 100, 300, width=300, height=225)
+            c.drawString(100, 280, f"Figure 1: Analysis of {topic}")
+        c.showPage()
+
+    c.save()
+
+def create_corpus(output_dir, num_docs=1000, num_images=200, pages=2, chart_every=3, seed=0):
+    """
+    Synthesizes a benchmark corpus of num_docs PDFs and num_images standalone charts,
+    each about a topic no other file shares, and writes ground_truth.json next to
+    them: one {"query", "expected_doc"} pair per file.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    # Charts embedded in PDFs live in a subdirectory, which ingestion does not scan
+    chart_dir = os.path.join(output_dir, "embedded_charts")
+    os.makedirs(chart_dir, exist_ok=True)
+
+    combinations = list(itertools.product(ADJECTIVES, SUBJECTS, REGIONS))
+    rng.shuffle(combinations)
+
+    def topic(i):
+        adjective, subject, region = combinations[i % len(combinations)]
+        # Past the vocabulary size, a series number keeps topics unique
+        series = f" Series {i // len(combinations) + 1}" if i >= len(combinations) else ""
+        return f"{adjective} {subject} in {region}{series}"
+
+    ground_truth = []
+
+    # 1. PDFs, every chart_every-th one with an embedded chart
+    for i in range(num_docs):
+        name = topic(i)
+        year = rng.randint(2015, 2024)
+        facts = [
+            f"This document covers the latest trends in {name}.",
+            f"The {name} index reached {rng.randint(100, 999)} points in {year}.",
+            f"Analysts expect {name} to grow {rng.randint(2, 40)}% next year.",
+            "Data shows significant growth in this sector.",
+            f"Costs for {name} fell by {rng.randint(1, 25)}% compared to {year - 1}.",
+            "Further details are available from the regional statistics office.",
+        ]
+        image_path = None
+        if chart_every and i % chart_every == 0:
+            image_path = os.path.join(chart_dir, f"chart_{i:05d}.png")
+            create_dummy_chart(image_path, chart_type=rng.choice(["bar", "pie"]), verbose=False)
+
+        filename = f"report_{i:05d}.pdf"
+        create_report_pdf(os.path.join(output_dir, filename), name, facts, image_path, pages=pages)
+        ground_truth.append({"query": f"What are the latest trends in {name}?", "expected_doc": filename})
+        if (i + 1) % 500 == 0:
+            print(f"Created {i + 1}/{num_docs} PDFs")
+
+    # 2. Standalone charts whose only text is the caption OCR reads back
+    for i in range(num_images):
+        name = topic(num_docs + i)
+        filename = f"chart_{i:05d}.png"
+        create_dummy_chart(os.path.join(output_dir, filename), chart_type=rng.choice(["bar", "pie"]),
+                           title=f"{name} chart", verbose=False)
+        ground_truth.append({"query": f"Show me the chart of {name}", "expected_doc": filename})
+
+    with open(os.path.join(output_dir, "ground_truth.json"), "w") as f:
+        json.dump(ground_truth, f, indent=1)
+
+    print(f"✅ Generated {num_docs} PDFs and {num_images} images in {output_dir}")
+    return ground_truth
+
+def create_sample_documents():
+    """The small hand-picked set in sample_documents/ that tests/evaluate.py scores against."""
     os.makedirs("sample_documents", exist_ok=True)
     
     topics = ["AI Trends", "Q3 Finance", "Supply Chain", "HR Policies", "Marketing"]
@@ -69,4 +169,20 @@ if __name__ == "__main__":
     create_dummy_pdf("sample_documents/doc_text_only_1.pdf", "Legal Disclaimers")
     create_dummy_pdf("sample_documents/doc_text_only_2.pdf", "Meeting Minutes")
 
-    print("\n✅ GENERATED 10+ DIVERSE DOCUMENTS!")
\ No newline at end of file
+    print("\n✅ GENERATED 10+ DIVERSE DOCUMENTS!")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Generate test documents.")
+    arg_parser.add_argument("--docs", type=int, default=None,
+                            help="Generate a synthetic benchmark corpus of this many PDFs instead of the sample set")
+    arg_parser.add_argument("--images", type=int, default=200)
+    arg_parser.add_argument("--pages", type=int, default=2)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output-dir", default=None)
+    args = arg_parser.parse_args()
+
+    if args.docs is not None:
+        create_corpus(args.output_dir or "benchmark_corpus", num_docs=args.docs,
+                      num_images=args.images, pages=args.pages, seed=args.seed)
+    else:
+        create_sample_documents()
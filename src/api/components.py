@@ -0,0 +1,101 @@
+import asyncio
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+class LazyComponent:
+    def __init__(self, name: str, factory: Callable[[], Any], warm_up: Optional[Callable[[Any], None]] = None):
+        """
+        A pipeline component that is built on first use (or by a background warm-up)
+        instead of at import time.
+        :param factory: Builds the component, e.g. loads a model.
+        :param warm_up: Optional extra step run once after building, e.g. a dummy encode.
+        """
+        self.name = name
+        self.factory = factory
+        self.warm_up_fn = warm_up
+        self.instance: Any = None
+        # cold -> loading -> loaded -> warming -> warm; a failed build is "failed" until
+        # the next get() retries it, a failed warm-up goes back to "loaded" to be retried
+        self.status = "cold"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warm_up_seconds: Optional[float] = None
+        self.build_lock = threading.Lock()
+        self.warm_lock = threading.Lock()
+
+    def get(self) -> Any:
+        """
+        Returns the component, building it first if nobody has yet.
+        Callers never wait for warm-up, only for construction.
+        """
+        if self.instance is not None:
+            return self.instance
+
+        with self.build_lock:
+            if self.instance is None:
+                print(f"Loading {self.name}...")
+                self.status = "loading"
+                start = time.perf_counter()
+                try:
+                    instance = self.factory()
+                except Exception as e:
+                    self.status = "failed"
+                    self.error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.instance = instance
+                self.status = "loaded"
+        return self.instance
+
+    async def aget(self) -> Any:
+        """
+        get() for async code: builds on a worker thread so the event loop never blocks.
+        """
+        if self.instance is not None:
+            return self.instance
+        return await asyncio.get_running_loop().run_in_executor(None, self.get)
+
+    def warm_up(self) -> bool:
+        """
+        Builds the component and runs its warm-up step, unless that already succeeded.
+        Failures are recorded, not raised; calling again retries. Returns True once warm.
+        """
+        try:
+            instance = self.get()
+        except Exception as e:
+            print(f"⚠️ Failed to load {self.name}: {e}")
+            return False
+
+        with self.warm_lock:
+            if self.status != "loaded" or self.warm_up_fn is None:
+                if self.status == "loaded":
+                    self.status = "warm"
+                return self.is_warm
+            self.status = "warming"
+            start = time.perf_counter()
+            try:
+                self.warm_up_fn(instance)
+            except Exception as e:
+                # The component itself is usable; e.g. Ollama may simply not be up yet
+                print(f"⚠️ Warm-up of {self.name} failed: {e}")
+                self.status = "loaded"
+                self.error = str(e)
+                return False
+            self.warm_up_seconds = time.perf_counter() - start
+            self.status = "warm"
+            self.error = None
+            print(f"{self.name} warm (load {self.load_seconds:.2f}s, warm-up {self.warm_up_seconds:.2f}s)")
+            return True
+
+    @property
+    def is_warm(self) -> bool:
+        return self.status == "warm"
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "load_seconds": self.load_seconds,
+            "warm_up_seconds": self.warm_up_seconds,
+            "error": self.error,
+        }
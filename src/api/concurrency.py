@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from src.monitoring.tracing import record
+
+class StageSaturated(Exception):
+    """
+    Raised when a stage already has as many requests waiting as it allows.
+    """
+    def __init__(self, stage: str):
+        super().__init__(f"The {stage} stage is saturated, try again shortly.")
+        self.stage = stage
+
+class StageLimiter:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: Optional[float] = None):
+        """
+        Runs blocking work for one pipeline stage on its own thread pool, off the event loop.
+        :param max_concurrency: Calls allowed to run at the same time (also the pool size).
+        :param max_queue: Callers allowed to wait for a slot; beyond that we reject immediately.
+        :param queue_timeout: Seconds a caller may wait for a slot before being rejected.
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"rag-{name}")
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Waits for a free slot, then runs fn(*args, **kwargs) on the stage's thread pool.
+        """
+        start = time.perf_counter()
+        await self.acquire()
+        record(f"{self.name}.queue", time.perf_counter() - start)
+        try:
+            loop = asyncio.get_running_loop()
+            # Run in a copy of the caller's context so spans reach its per-request timings
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, context.run, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.release()
+
+    def check_capacity(self):
+        """
+        Raises StageSaturated if a new caller would be rejected right now.
+        Lets an endpoint answer 429 before it commits to a streaming response.
+        """
+        if self.semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise StageSaturated(self.name)
+
+    async def acquire(self):
+        """
+        Claims a slot, raising StageSaturated instead of queueing without bound.
+        """
+        self.check_capacity()
+
+        self.waiting += 1
+        try:
+            if self.queue_timeout is None:
+                await self.semaphore.acquire()
+            else:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise StageSaturated(self.name)
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self):
+        self.running -= 1
+        self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,25 +1,203 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, field_validator
+from contextlib import asynccontextmanager, aclosing
+from typing import List, Optional, Dict, Any, Union
+from datetime import datetime
+import threading
+import asyncio
 import uvicorn
+import time
+import json
 import os
 
 # Import our custom modules
 from src.retrieval.retriever import Retriever
-from src.generation.generator import Generator
+from src.generation.generator import Generator, DEFAULT_MODEL, GENERATION_ERROR_PREFIX
+from src.generation.answer_cache import AnswerCache
+from src.ingestion.manifest import corpus_version
+from src.ingestion.service import IngestionService, UnsupportedFile
+from src.ingest import IndexWriter
+from src.api.concurrency import StageLimiter, StageSaturated
+from src.api.components import LazyComponent
+from src.monitoring.metrics import REGISTRY, gauge
+from src.monitoring.tracing import span, collect_timings
 
-app = FastAPI(title="Multimodal RAG API")
+# Models and the vector store are built lazily: by the background warm-up started
+# in the lifespan handler, or by the first request that needs them, whichever
+# comes first. Importing this module stays cheap.
+retriever_component = LazyComponent(
+    "retriever",
+    # RAG_DUAL_INDEX=1 when the corpus was ingested with `python -m src.ingest --dual-index`
+    # RAG_EMBEDDING_BACKEND=onnx-int8 runs CLIP on ONNX Runtime with int8 weights;
+    # RAG_EMBEDDING_THREADS caps its CPU threads when several workers share a box
+    lambda: Retriever(
+        dual_index=os.getenv("RAG_DUAL_INDEX", "0") == "1",
+        embedding_backend=os.getenv("RAG_EMBEDDING_BACKEND", "torch"),
+        num_threads=int(os.getenv("RAG_EMBEDDING_THREADS", "0")) or None,
+        # RAG_VECTOR_PRECISION=int8|float16 after ingesting with --vector-precision
+        vector_precision=os.getenv("RAG_VECTOR_PRECISION") or None,
+        # RAG_VECTOR_STORE=numpy after ingesting with --vector-store numpy
+        vector_store=os.getenv("RAG_VECTOR_STORE", "chroma"),
+        # RAG_RERANK=1 re-scores RAG_RERANK_CANDIDATES first-stage hits with a cross-encoder,
+        # within RAG_RERANK_BUDGET_MS per query (0 = no budget)
+        rerank=os.getenv("RAG_RERANK", "0") == "1",
+        rerank_candidates=int(os.getenv("RAG_RERANK_CANDIDATES", "50")),
+        rerank_budget_ms=float(os.getenv("RAG_RERANK_BUDGET_MS", "150")) or None,
+    ),
+    warm_up=lambda r: r.warm_up()
+)
+generator_component = LazyComponent(
+    "generator",
+    # RAG_CONTEXT_TOKENS caps the retrieved text per prompt; RAG_IMAGE_MAX_SIDE the image size
+    lambda: Generator(
+        max_context_tokens=int(os.getenv("RAG_CONTEXT_TOKENS", "1500")),
+        image_max_side=int(os.getenv("RAG_IMAGE_MAX_SIDE", "672")),
+    ),
+    warm_up=lambda g: g.warm_up()
+)
+components = [retriever_component, generator_component]
 
-# Initialize modules (Load models once on startup to save time)
-print("Initializing RAG pipeline...")
-retriever = Retriever()
-generator = Generator()
-print("Pipeline ready.")
+def _build_ingestion_service() -> IngestionService:
+    # Writes through the retriever's own stores and models, so new files are searchable
+    # here as soon as a batch commits, without loading the models twice
+    retriever = retriever_component.get()
+    writer = IndexWriter(retriever.vector_db, retriever.embedding_model,
+                         text_db=retriever.text_db, text_embedder=retriever.text_embedding_model)
+    watch_dirs = [d for d in os.getenv("RAG_WATCH_DIRS", "").split(os.pathsep) if d]
+    service = IngestionService(
+        writer,
+        watch_dirs=watch_dirs,
+        upload_dir=os.getenv("RAG_UPLOAD_DIR", "uploads"),
+        queue_path=os.getenv("RAG_INGEST_QUEUE", "ingest_jobs/jobs.sqlite"),
+        num_workers=int(os.getenv("RAG_INGEST_WORKERS", "2")),
+    )
+    service.start()
+    return service
+
+# POST /ingest and RAG_WATCH_DIRS (os.pathsep-separated) feed a background ingestion service
+ingestion_component = LazyComponent("ingestion", _build_ingestion_service)
+
+# Serve /health immediately; models load in the background (RAG_WARMUP=0 disables this,
+# and components then count as ready once a request has built them)
+WARM_UP = os.getenv("RAG_WARMUP", "1") != "0"
+warm_up_stop = threading.Event()
+
+def _warm_up_pipeline(max_delay: float = 60.0):
+    print("Warming up RAG pipeline...")
+    delay = 1.0
+    # Keep retrying what failed (e.g. Ollama not up yet at boot), backing off up to max_delay
+    while not all([component.warm_up() for component in components]):
+        print(f"⚠️ Warm-up incomplete, retrying in {delay:.0f}s")
+        if warm_up_stop.wait(delay):
+            return
+        delay = min(delay * 2, max_delay)
+    print("Pipeline warm-up finished.")
+
+def _is_ready(component: LazyComponent) -> bool:
+    return component.is_warm or (not WARM_UP and component.status == "loaded")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_UP:
+        warm_up_stop.clear()
+        threading.Thread(target=_warm_up_pipeline, name="rag-warm-up", daemon=True).start()
+    # Watched directories are picked up from startup, not from the first upload
+    if os.getenv("RAG_WATCH_DIRS"):
+        threading.Thread(target=ingestion_component.get, name="rag-ingestion-start", daemon=True).start()
+    yield
+    warm_up_stop.set()
+    if ingestion_component.instance is not None:
+        ingestion_component.instance.stop()
+    retrieval_stage.shutdown()
+    generation_stage.shutdown()
+    if retriever_component.instance is not None:
+        retriever_component.instance.close()
+
+app = FastAPI(title="Multimodal RAG API", lifespan=lifespan)
+
+REQUEST_SECONDS = REGISTRY.histogram("rag_request_seconds", "HTTP request latency by route and status.",
+                                     label_names=("route", "status"))
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    # Streaming endpoints are timed until their headers go out; their stages have spans
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(time.perf_counter() - start,
+                            route=route.path if route else "unmatched", status=response.status_code)
+    return response
+
+# Blocking work runs on per-stage thread pools so the event loop stays free.
+# Retrieval is cheap and gets many slots (concurrent retrievals are micro-batched
+# together, so more slots means bigger batches); LLaVA calls are expensive and get few,
+# with a short queue in front so overload turns into 429s instead of timeouts.
+retrieval_stage = StageLimiter(
+    "retrieval",
+    max_concurrency=int(os.getenv("RAG_RETRIEVAL_CONCURRENCY", "32")),
+    max_queue=int(os.getenv("RAG_RETRIEVAL_QUEUE", "256")),
+)
+generation_stage = StageLimiter(
+    "generation",
+    max_concurrency=int(os.getenv("RAG_GENERATION_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("RAG_GENERATION_QUEUE", "8")),
+    queue_timeout=float(os.getenv("RAG_GENERATION_QUEUE_TIMEOUT", "30")),
+)
+
+# Repeated questions over the same retrieved context reuse the previous answer.
+# Setting RAG_ANSWER_CACHE_SEMANTIC_THRESHOLD (e.g. 0.95) also matches paraphrases.
+semantic_threshold = os.getenv("RAG_ANSWER_CACHE_SEMANTIC_THRESHOLD")
+answer_cache = AnswerCache(
+    model_name=DEFAULT_MODEL,
+    max_entries=int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600")),
+    semantic_threshold=float(semantic_threshold) if semantic_threshold else None,
+)
+
+# Chunks + images handed to LLaVA per question; with re-ranking on, fewer are needed
+QUERY_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+
+# /query/batch retrieves this many queries per encode call + multi-query search
+BATCH_CHUNK_SIZE = int(os.getenv("RAG_BATCH_CHUNK_SIZE", "64"))
+BATCH_MAX_QUERIES = int(os.getenv("RAG_BATCH_MAX_QUERIES", "10000"))
+# Shared by every batch, and kept below the generation stage's concurrency, so bulk
+# answering never holds all LLaVA slots and interactive /query calls always get a turn
+BATCH_GENERATION_CONCURRENCY = int(os.getenv("RAG_BATCH_GENERATION_CONCURRENCY",
+                                             str(max(1, generation_stage.max_concurrency - 1))))
+batch_generation_slots = asyncio.Semaphore(BATCH_GENERATION_CONCURRENCY)
 
 # --- Pydantic Models for Input/Output Validation ---
 
+class QueryFilters(BaseModel):
+    filename: Optional[Union[str, List[str]]] = None
+    source_dir: Optional[Union[str, List[str]]] = None # Directory the file was ingested from
+    type: Optional[Union[str, List[str]]] = None # "text", "table" and/or "image"
+    page_min: Optional[int] = None
+    page_max: Optional[int] = None
+    ingested_after: Optional[datetime] = None
+    ingested_before: Optional[datetime] = None
+
+    @field_validator("filename", "source_dir", "type")
+    @classmethod
+    def _not_empty(cls, value):
+        # An empty list would match nothing; reject it (422) rather than guess
+        if isinstance(value, list) and not value:
+            raise ValueError("must contain at least one value")
+        return value
+
 class QueryRequest(BaseModel):
     query: str
+    filters: Optional[QueryFilters] = None
+    timings: bool = False # Return per-stage milliseconds with the answer
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    filters: Optional[QueryFilters] = None # Applied to every query
+    retrieval_only: bool = False # Skip generation, only return sources
+    # Capped like /query: every sub-query fans out to the vector store and the reranker
+    top_k: int = Field(min(5, QUERY_TOP_K), ge=1, le=QUERY_TOP_K)
 
 class Source(BaseModel):
     document_id: str
@@ -30,58 +208,387 @@ class Source(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     sources: List[Source]
+    timings: Optional[Dict[str, float]] = None # Only when requested
 
 # --- API Endpoints ---
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/query", response_model=QueryResponse, response_model_exclude_none=True)
 async def query_rag_system(request: QueryRequest):
     """
     Main endpoint:
     1. Receives text query.
     2. Retrieves relevant images and text.
     3. Generates an answer using VLM.
-    4. Returns answer + sources.
+    4. Returns answer + sources (+ per-stage timings if asked for).
     """
     try:
-        # Step 1: Retrieve Context
-        # We ask for top 3 chunks to keep context concise for the VLM
-        context = retriever.retrieve(request.query, top_k=5)
-        
-        # Step 2: Generate Answer
-        answer = generator.generate_answer(request.query, context)
-        
+        with collect_timings(request.timings) as timings:
+            # Step 1: Retrieve Context
+            # We ask for top 3 chunks to keep context concise for the VLM
+            lookup = await retrieval_stage.run(_retrieve_with_cache, request.query, _filters(request))
+            context = lookup["context"]
+
+            # Step 2: Generate Answer (unless we've already answered this)
+            answer = lookup["cached_answer"]
+            if answer is None:
+                generator = await generator_component.aget()
+                answer = await generation_stage.run(generator.generate_answer, request.query, context)
+                _remember_answer(request.query, lookup, answer)
+
         # Step 3: Format Sources for Response
-        # We need to combine text and images back into a single list of sources
-        response_sources = []
-        
-        # Add text sources
-        for item in context.get('text_chunks', []):
-            response_sources.append(Source(
-                document_id=item['metadata']['filename'],
-                page_number=item['metadata']['page_number'],
-                content_type="text",
-                snippet=item['content'][:200] + "..." # Truncate for display
-            ))
-            
-        # Add image sources
-        for item in context.get('images', []):
-            response_sources.append(Source(
-                document_id=item['metadata']['filename'],
-                page_number=item['metadata']['page_number'],
-                content_type="image",
-                snippet=item['metadata']['image_path'] # Return path to the image
-            ))
-
-        return QueryResponse(answer=answer, sources=response_sources)
+        return QueryResponse(answer=answer, sources=_build_sources(context),
+                             timings={stage: round(ms, 3) for stage, ms in timings.items()} if timings else None)
 
+    except StageSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def stream_rag_query(request: QueryRequest, http_request: Request):
+    """
+    Streaming variant of /query, as Server-Sent Events:
+    1. 'sources' right after retrieval, before any generation starts.
+    2. 'token' events as LLaVA produces the answer.
+    3. 'done' (or 'error') at the end.
+    If the client disconnects, the Ollama stream is closed and the generation slot freed.
+    """
+    try:
+        lookup = await retrieval_stage.run(_retrieve_with_cache, request.query, _filters(request))
+        context = lookup["context"]
+        # Refuse up front rather than after the 200 + headers have gone out
+        if lookup["cached_answer"] is None:
+            generation_stage.check_capacity()
+    except StageSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        print(f"Error processing query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        yield _sse_event("sources", jsonable_encoder(_build_sources(context)))
+
+        if lookup["cached_answer"] is not None:
+            yield _sse_event("token", {"text": lookup["cached_answer"]})
+            yield _sse_event("done", {})
+            return
+
+        try:
+            await generation_stage.acquire()
+        except StageSaturated as e:
+            yield _sse_event("error", {"detail": str(e)})
+            return
+
+        try:
+            generator = await generator_component.aget()
+            tokens = []
+            # aclosing: leaving the loop early closes the Ollama stream right away,
+            # instead of whenever the abandoned generator is garbage collected
+            async with aclosing(generator.stream_answer(request.query, context)) as stream:
+                async for token in stream:
+                    if await http_request.is_disconnected():
+                        print("Client disconnected, cancelling generation.")
+                        return
+                    tokens.append(token)
+                    yield _sse_event("token", {"text": token})
+            _remember_answer(request.query, lookup, "".join(tokens))
+            yield _sse_event("done", {})
+        except Exception as e:
+            print(f"Error streaming answer: {e}")
+            yield _sse_event("error", {"detail": str(e)})
+        finally:
+            generation_stage.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/query/batch")
+async def batch_rag_query(request: BatchQueryRequest, http_request: Request):
+    """
+    Many queries in one request, for offline evaluation and bulk jobs.
+    Results stream back as NDJSON (one JSON object per line) as they finish, each tagged
+    with the query's index in the request; a final line reports totals.
+    1. Queries are retrieved in chunks of RAG_BATCH_CHUNK_SIZE: one encode call and one
+       multi-query vector search per chunk.
+    2. Unless retrieval_only is set, answers are generated (or served from the answer
+       cache) using fewer generation slots than the stage has (shared by all batches),
+       so interactive traffic keeps at least one (when the stage has more than one).
+    """
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUERIES} queries per batch")
+    filters = _filters(request)
+
+    async def answer(index: int, query: str, lookup: Dict[str, Any]) -> Dict[str, Any]:
+        line = {"index": index, "query": query, "sources": jsonable_encoder(_build_sources(lookup["context"]))}
+        if lookup["cached_answer"] is not None:
+            return {**line, "answer": lookup["cached_answer"], "cached": True}
+        try:
+            async with batch_generation_slots:
+                generator = await generator_component.aget()
+                text = await _run_patiently(generation_stage, generator.generate_answer, query, lookup["context"])
+            _remember_answer(query, lookup, text)
+            return {**line, "answer": text, "cached": False}
+        except Exception as e:
+            return {**line, "error": str(e)}
+
+    async def result_lines():
+        start = time.perf_counter()
+        failures = 0
+        pending: List[asyncio.Task] = []
+        try:
+            for offset in range(0, len(request.queries), BATCH_CHUNK_SIZE):
+                if await http_request.is_disconnected():
+                    print("Client disconnected, abandoning batch.")
+                    return
+                chunk = request.queries[offset:offset + BATCH_CHUNK_SIZE]
+
+                try:
+                    lookups = await _run_patiently(retrieval_stage, _retrieve_batch_with_cache, chunk, filters,
+                                                   request.top_k, not request.retrieval_only)
+                except Exception as e:
+                    print(f"Error retrieving batch: {e}")
+                    failures += len(chunk)
+                    for i, query in enumerate(chunk):
+                        yield _ndjson({"index": offset + i, "query": query, "error": str(e)})
+                    continue
+
+                if request.retrieval_only:
+                    for i, (query, lookup) in enumerate(zip(chunk, lookups)):
+                        yield _ndjson({"index": offset + i, "query": query,
+                                       "sources": jsonable_encoder(_build_sources(lookup["context"]))})
+                    continue
+
+                pending = [asyncio.create_task(answer(offset + i, query, lookup))
+                           for i, (query, lookup) in enumerate(zip(chunk, lookups))]
+                for finished in asyncio.as_completed(pending):
+                    line = await finished
+                    failures += "error" in line
+                    yield _ndjson(line)
+
+            yield _ndjson({"done": True, "queries": len(request.queries), "failures": failures,
+                           "seconds": round(time.perf_counter() - start, 3)})
+        finally:
+            # A disconnected client shouldn't keep generation slots busy
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+def _filters(request: Union[QueryRequest, BatchQueryRequest]) -> Optional[Dict[str, Any]]:
+    return request.filters.model_dump(exclude_none=True) if request.filters else None
+
+def _retrieve_with_cache(query: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Runs on the retrieval pool: retrieval followed by the answer-cache lookup.
+    (Filtered queries retrieve different chunks, so they never share a cached answer.)
+    """
+    retriever = retriever_component.get()
+    context = retriever.retrieve(query, top_k=QUERY_TOP_K, filters=filters)
+
+    query_embedding = None
+    if answer_cache.semantic_threshold is not None:
+        # Retrieval just embedded this query, so this is an embedding-cache hit
+        query_embedding = retriever.embedding_model.embed_text(query)
+
+    version = corpus_version(retriever.vector_db.persist_dir)
+    with span("answer_cache.lookup"):
+        cached_answer = answer_cache.get(query, context, query_embedding, corpus_version=version)
+    return {
+        "context": context,
+        "query_embedding": query_embedding,
+        "corpus_version": version,
+        "cached_answer": cached_answer,
+    }
+
+def _retrieve_batch_with_cache(queries: List[str],
+                               filters: Optional[Dict[str, Any]],
+                               top_k: int,
+                               check_cache: bool) -> List[Dict[str, Any]]:
+    """
+    Batch counterpart of _retrieve_with_cache: one lookup dict per query, in order.
+    """
+    retriever = retriever_component.get()
+    contexts = retriever.retrieve_batch(queries, top_k=top_k, filters=filters)
+
+    embeddings = [None] * len(queries)
+    if check_cache and answer_cache.semantic_threshold is not None:
+        embeddings = retriever.embedding_model.embed_text(queries)
+
+    version = corpus_version(retriever.vector_db.persist_dir)
+    return [{
+        "context": context,
+        "query_embedding": embedding,
+        "corpus_version": version,
+        "cached_answer": answer_cache.get(query, context, embedding, corpus_version=version) if check_cache else None,
+    } for query, context, embedding in zip(queries, contexts, embeddings)]
+
+async def _run_patiently(stage: StageLimiter, fn, *args, attempts: int = 60):
+    # Bulk work waits for capacity instead of failing when interactive traffic fills the queue
+    for attempt in range(attempts):
+        try:
+            return await stage.run(fn, *args)
+        except StageSaturated:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(1.0)
+
+def _remember_answer(query: str, lookup: Dict[str, Any], answer: str):
+    # Failed generations are not worth replaying
+    if not answer or answer.startswith(GENERATION_ERROR_PREFIX):
+        return
+    answer_cache.put(query, lookup["context"], answer,
+                     query_embedding=lookup["query_embedding"],
+                     corpus_version=lookup["corpus_version"])
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _ndjson(data: Dict[str, Any]) -> str:
+    return json.dumps(data) + "\n"
+
+def _build_sources(context) -> List[Source]:
+    """
+    Combines text and images back into a single list of sources for the response.
+    """
+    response_sources = []
+
+    # Add text sources
+    for item in context.get('text_chunks', []):
+        response_sources.append(Source(
+            document_id=item['metadata']['filename'],
+            page_number=item['metadata'].get('page_number') or 0,
+            content_type="text",
+            snippet=item['content'][:200] + "..." # Truncate for display
+        ))
+
+    # Add image sources
+    for item in context.get('images', []):
+        response_sources.append(Source(
+            document_id=item['metadata']['filename'],
+            page_number=item['metadata'].get('page_number') or 0,
+            content_type="image",
+            snippet=item['metadata']['image_path'] # Return path to the image
+        ))
+
+    return response_sources
+
+@app.post("/ingest", status_code=202)
+async def ingest_file(file: UploadFile = File(...)):
+    """
+    Adds a PDF or image to the index in the background. Returns the queued job;
+    poll GET /ingest/jobs/{id} until its status is "done" (searchable) or "failed".
+    """
+    service = await ingestion_component.aget()
+    try:
+        job = await asyncio.to_thread(service.submit_upload, file.filename, file.file)
+    except UnsupportedFile as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return job
+
+@app.get("/ingest/jobs/{job_id}")
+async def ingest_job_status(job_id: str):
+    service = await ingestion_component.aget()
+    job = service.queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job {job_id}")
+    return job
+
+@app.get("/ingest/jobs")
+async def ingest_jobs(status: Optional[str] = None, limit: int = 50):
+    """
+    Recent ingestion jobs (newest first) and the number of jobs per status.
+    """
+    service = await ingestion_component.aget()
+    return {"counts": service.queue.counts(), "jobs": service.queue.list(status=status, limit=limit)}
+
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "active"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness, unlike /health (liveness): 200 only once every component is loaded
+    and warmed up (just loaded, with RAG_WARMUP=0), 503 before that. Reports
+    per-component status and load times.
+    """
+    report = {component.name: component.report() for component in components}
+    ready = all(_is_ready(component) for component in components)
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "components": report})
+
+@app.get("/stats")
+async def pipeline_stats():
+    """
+    Current load of each stage and cache hit rates, for spotting saturation.
+    """
+    return {
+        "retrieval": retrieval_stage.stats(),
+        "generation": generation_stage.stats(),
+        "answer_cache": answer_cache.stats(),
+        "embedding_cache": (retriever_component.instance.embedding_model.cache_stats()
+                            if retriever_component.instance is not None else {}),
+        "compact_vectors": (retriever_component.instance.vector_db.compact_report()
+                            if retriever_component.instance is not None else {}),
+        "reranker": (retriever_component.instance.reranker.stats()
+                     if retriever_component.instance is not None and retriever_component.instance.reranker else {}),
+        "image_preprocessing": (generator_component.instance.image_preprocessor.stats()
+                                if generator_component.instance is not None else {}),
+        "ingestion": (ingestion_component.instance.stats()
+                      if ingestion_component.instance is not None else {}),
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: stage latency histograms (rag_stage_seconds), request
+    latencies, queue depths, cache hit rates and model load times.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def _pipeline_metrics():
+    # Read at scrape time from the objects that already keep these numbers
+    stages = [retrieval_stage.stats(), generation_stage.stats()]
+    names = [retrieval_stage.name, generation_stage.name]
+    yield gauge("rag_stage_running", "Calls currently running per API stage.",
+                {(("stage", name),): stats["running"] for name, stats in zip(names, stages)})
+    yield gauge("rag_stage_waiting", "Calls queued for a slot per API stage.",
+                {(("stage", name),): stats["waiting"] for name, stats in zip(names, stages)})
+    yield ("rag_stage_rejected_total", "Calls turned away with 429 per API stage.", "counter",
+           {(("stage", name),): stats["rejected"] for name, stats in zip(names, stages)})
+
+    caches = {"answer": answer_cache.stats()}
+    retriever = retriever_component.instance
+    if retriever is not None:
+        caches["embedding"] = retriever.embedding_model.cache_stats()
+        batchers = {"image" if retriever.dual_index else "default": retriever.batcher,
+                    "text": retriever.text_batcher}
+        yield gauge("rag_query_batcher_queue_depth", "Queries waiting for the micro-batcher.",
+                    {(("index", name),): batcher.requests.qsize() for name, batcher in batchers.items() if batcher})
+    caches = {name: stats for name, stats in caches.items() if stats}
+    yield gauge("rag_cache_hit_rate", "Hit rate since startup per cache.",
+                {(("cache", name),): stats["hit_rate"] for name, stats in caches.items()})
+    yield ("rag_cache_misses_total", "Cache misses since startup per cache.", "counter",
+           {(("cache", name),): stats["misses"] for name, stats in caches.items()})
+
+    if ingestion_component.instance is not None:
+        yield gauge("rag_ingest_jobs", "Ingestion jobs per status.",
+                    {(("status", status),): count
+                     for status, count in ingestion_component.instance.queue.counts().items()})
+
+    loaded = [component for component in components if component.load_seconds is not None]
+    yield gauge("rag_component_load_seconds", "Time taken to build each component (model load).",
+                {(("component", c.name),): c.load_seconds for c in loaded})
+    yield gauge("rag_component_warm_up_seconds", "Time taken by each component's warm-up.",
+                {(("component", c.name),): c.warm_up_seconds for c in loaded if c.warm_up_seconds is not None})
+    yield gauge("rag_component_ready", "1 once a component is loaded and warm.",
+                {(("component", c.name),): float(_is_ready(c)) for c in components})
+
+REGISTRY.add_collector(_pipeline_metrics)
+
 if __name__ == "__main__":
     # Run the server
     uvicorn.run("src.api.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
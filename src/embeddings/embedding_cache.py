@@ -0,0 +1,173 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any
+import numpy as np
+
+class EmbeddingCache:
+    def __init__(self,
+                 path: str = "embedding_cache/embeddings.sqlite",
+                 max_entries: int = 500_000,
+                 memory_entries: int = 4096,
+                 touch_interval: float = 600.0):
+        """
+        Two-level cache of embedding vectors: an in-memory LRU in front of a SQLite file.
+        Vectors are stored as raw float32 bytes.
+        :param path: SQLite file holding the persistent layer.
+        :param max_entries: Size cap for the SQLite layer; least recently used rows are evicted.
+        :param memory_entries: Size of the in-memory LRU layer.
+        :param touch_interval: Recency on disk is only refreshed for rows last used longer ago
+                               than this (seconds), and written out in batches, so hot
+                               lookups stay read-only instead of each being a write transaction.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.touch_interval = touch_interval
+        # key -> last_used waiting to be written
+        self.pending_touches: Dict[str, float] = {}
+        self.last_touch_flush = time.time()
+        self.memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets several API workers / ingest runs read while one writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        # Upper bound on the row count, so inserts don't need a COUNT(*) each time
+        self.approx_disk_entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name: str, kind: str, payload: bytes) -> str:
+        """
+        Cache key for a piece of content: the model plus the sha256 of the raw bytes.
+        :param kind: "text" or "image", so identical bytes in different modalities don't collide.
+        """
+        return f"{model_name}:{kind}:{hashlib.sha256(payload).hexdigest()}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks up several keys at once; missing keys are simply absent from the result.
+        """
+        found: Dict[str, np.ndarray] = {}
+
+        with self.lock:
+            # 1. Memory layer
+            for key in keys:
+                vector = self.memory.get(key)
+                if vector is not None:
+                    self.memory.move_to_end(key)
+                    found[key] = vector
+                    self.memory_hits += 1
+
+            # 2. Disk layer for whatever the memory layer didn't have
+            remaining = list({key for key in keys if key not in found})
+            if remaining:
+                now = time.time()
+                for start in range(0, len(remaining), 500):
+                    part = remaining[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows = self.conn.execute(
+                        f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})", part
+                    ).fetchall()
+                    for key, blob, last_used in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+                        if now - last_used > self.touch_interval:
+                            self.pending_touches[key] = now
+                if len(self.pending_touches) >= 1000 or (
+                        self.pending_touches and now - self.last_touch_flush > self.touch_interval):
+                    self._flush_touches()
+                    self.conn.commit()
+
+            self.misses += len({key for key in keys if key not in found})
+
+        return found
+
+    def put_many(self, items: Dict[str, Any]):
+        """
+        Stores freshly computed vectors in both layers.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        with self.lock:
+            for key, vector in items.items():
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes(), now))
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self.approx_disk_entries += len(rows)
+            # Piggyback on this write: eviction should see up-to-date recency
+            self._flush_touches()
+            self._evict()
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters since startup plus the current size of each layer.
+        """
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_entries": disk_entries,
+                "evictions": self.evictions,
+            }
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _flush_touches(self):
+        # Caller holds the lock and commits
+        if self.pending_touches:
+            self.conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                  [(last_used, key) for key, last_used in self.pending_touches.items()])
+            self.pending_touches = {}
+        self.last_touch_flush = time.time()
+
+    def _evict(self):
+        # Caller holds the lock. Trim the oldest rows once over the cap,
+        # with 10% headroom so we don't evict on every single insert.
+        if self.approx_disk_entries <= self.max_entries:
+            return
+        count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.approx_disk_entries = count
+        if count <= self.max_entries:
+            return
+        to_remove = count - int(self.max_entries * 0.9)
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (to_remove,)
+        )
+        self.evictions += to_remove
+        self.approx_disk_entries = count - to_remove
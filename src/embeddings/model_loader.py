@@ -1,44 +1,194 @@
-from sentence_transformers import SentenceTransformer
 from PIL import Image
-from typing import List, Union
+from typing import List, Dict, Any, Union, Optional
+import io
 import numpy as np
+from src.embeddings.embedding_cache import EmbeddingCache
+from src.embeddings.onnx_backend import BACKENDS, OnnxClipBackend
+
+# Text-only model for the dual-index mode; 256-token window, much better than CLIP at text-to-text
+DEFAULT_TEXT_MODEL = "all-MiniLM-L6-v2"
+
+DEFAULT_CACHE_PATH = "embedding_cache/embeddings.sqlite"
+
+# A float32 array, or nested lists of floats unless as_numpy is set
+Vectors = Union[np.ndarray, List[float], List[List[float]]]
 
 class EmbeddingModel:
-    def __init__(self, model_name: str = "clip-ViT-B-32"):
+    def __init__(self,
+                 model_name: str = "clip-ViT-B-32",
+                 batch_size: int = 32,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 backend: str = "torch",
+                 num_threads: Optional[int] = None,
+                 as_numpy: bool = False):
         """
-        Initializes the CLIP model. 
+        Initializes the CLIP model.
         'clip-ViT-B-32' is a standard, efficient model for multimodal tasks.
+        :param batch_size: How many inputs CLIP encodes per forward pass.
+        :param cache_path: SQLite file for the embedding cache (None disables caching).
+        :param backend: "torch", "onnx" (ONNX Runtime, fp32) or "onnx-int8" (dynamically
+                        quantized weights; fastest on CPU). The ONNX backends support CLIP only.
+        :param num_threads: CPU threads used for inference (None = library default).
+        :param as_numpy: Return float32 NumPy arrays instead of Python lists. A list of floats
+                         costs ~9x the memory of the array and a per-element conversion.
         """
-        print(f"Loading embedding model: {model_name}...")
-        self.model = SentenceTransformer(model_name)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {BACKENDS}")
+
+        print(f"Loading embedding model: {model_name} ({backend})...")
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.as_numpy = as_numpy
+
+        if backend == "torch":
+            # Imported here so importing this module doesn't pull in torch
+            from sentence_transformers import SentenceTransformer
 
-    def embed_text(self, text: Union[str, List[str]]) -> List[List[float]]:
+            if num_threads:
+                import torch
+                torch.set_num_threads(num_threads)
+            self.model = SentenceTransformer(model_name)
+        else:
+            self.model = OnnxClipBackend(model_name, quantize=backend == "onnx-int8", num_threads=num_threads)
+
+        # Quantized vectors differ slightly, so each backend gets its own cache entries
+        self.cache_namespace = model_name if backend == "torch" else f"{model_name}@{backend}"
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
+
+    def embed_text(self, text: Union[str, List[str]]) -> Vectors:
         """
         Converts text into a vector embedding.
+        Passing a list encodes the whole batch in one call.
         """
-        # CLIP has a short context window (77 tokens). 
-        # Ideally, we truncate or summarize text before embedding for CLIP.
-        embeddings = self.model.encode(text)
-        
-        # Convert to list if it's a single numpy array
-        if isinstance(embeddings, np.ndarray):
-            return embeddings.tolist()
-        return embeddings
+        if self.cache is None:
+            return self._output(self._encode_text(text))
+
+        # Identical strings (boilerplate, repeated queries) are only encoded once
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        keys = [EmbeddingCache.make_key(self.cache_namespace, "text", t.encode("utf-8")) for t in texts]
 
-    def embed_image(self, image_path: str) -> List[float]:
+        found = self.cache.get_many(keys)
+        missing = {key: t for key, t in zip(keys, texts) if key not in found}
+        if missing:
+            vectors = self._encode_text(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        vectors = np.stack([np.asarray(found[key], dtype=np.float32) for key in keys])
+        return self._output(vectors[0] if single else vectors)
+
+    def embed_long_text(self,
+                        texts: List[str],
+                        window_chars: int = 1000,
+                        overlap_chars: int = 200) -> Vectors:
+        """
+        Embeds texts longer than the model's context window: each text is cut into
+        overlapping windows, all windows are encoded in one batch, and the window
+        vectors are max-pooled into one (re-normalized) vector per text.
+        :param window_chars: Window size; ~1000 characters fits a 256-token model.
+        :param overlap_chars: Overlap so sentences on a window edge aren't split in both.
+        """
+        if not texts:
+            return self._output(np.zeros((0, 0), dtype=np.float32))
+
+        step = max(window_chars - overlap_chars, 1)
+        windows = []
+        offsets = []  # index of each text's first window
+        for text in texts:
+            offsets.append(len(windows))
+            for start in range(0, max(len(text) - overlap_chars, 1), step):
+                windows.append(text[start:start + window_chars])
+
+        window_vectors = np.asarray(self.embed_text(windows), dtype=np.float32)
+        window_vectors /= np.maximum(np.linalg.norm(window_vectors, axis=1, keepdims=True), 1e-12)
+
+        # Windows of one text are contiguous, so one reduceat pools them all
+        pooled = np.maximum.reduceat(window_vectors, offsets, axis=0)
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return self._output(pooled)
+
+    def embed_image(self, image_path: str) -> Vectors:
         """
         Converts an image file into a vector embedding.
         """
-        try:
-            img = Image.open(image_path)
-            embedding = self.model.encode(img)
-            return embedding.tolist()
-        except Exception as e:
-            print(f"Error embedding image {image_path}: {e}")
-            return []
+        return self.embed_images([image_path])[0]
+
+    def embed_images(self, image_paths: List[str]) -> List[Vectors]:
+        """
+        Converts a batch of image files into vector embeddings with one encode call.
+        Images that fail to load get an empty vector, so the output stays
+        aligned with image_paths.
+        """
+        vectors: List[Vectors] = [self._output(np.zeros(0, dtype=np.float32)) for _ in image_paths]
+        payloads: Dict[int, bytes] = {}
+
+        for i, image_path in enumerate(image_paths):
+            try:
+                with open(image_path, "rb") as f:
+                    payloads[i] = f.read()
+            except Exception as e:
+                print(f"Error embedding image {image_path}: {e}")
+
+        # 1. Serve repeated images (logos, shared charts) from the cache
+        keys = {i: EmbeddingCache.make_key(self.cache_namespace, "image", payload) for i, payload in payloads.items()}
+        found = self.cache.get_many(list(keys.values())) if self.cache else {}
+
+        # 2. Decode and encode only the misses, all in one call
+        images = []
+        positions = []
+        for i, payload in payloads.items():
+            if keys[i] in found:
+                continue
+            try:
+                img = Image.open(io.BytesIO(payload))
+                img.load()
+                images.append(img)
+                positions.append(i)
+            except Exception as e:
+                print(f"Error embedding image {image_paths[i]}: {e}")
+
+        if images:
+            embeddings = self.model.encode(images, batch_size=self.batch_size)
+            computed = {keys[i]: embedding for i, embedding in zip(positions, embeddings)}
+            if self.cache:
+                self.cache.put_many(computed)
+            found.update(computed)
+
+        for i, key in keys.items():
+            if key in found:
+                vectors[i] = self._output(np.asarray(found[key], dtype=np.float32))
+
+        return vectors
+
+    def warm_up(self, images: bool = True):
+        """
+        Runs one dummy text and image encode (bypassing the cache) so the first
+        real request doesn't pay for lazy allocations inside the model.
+        :param images: Set False for text-only models.
+        """
+        self.model.encode(["warm-up"], batch_size=1)
+        if images:
+            self.model.encode([Image.new("RGB", (224, 224))], batch_size=1)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters of the embedding cache (empty if caching is disabled).
+        """
+        return self.cache.stats() if self.cache else {}
+
+    def _encode_text(self, text: Union[str, List[str]]) -> np.ndarray:
+        # CLIP has a short context window (77 tokens).
+        # Ideally, we truncate or summarize text before embedding for CLIP.
+        return np.asarray(self.model.encode(text, batch_size=self.batch_size), dtype=np.float32)
+
+    def _output(self, vectors: np.ndarray) -> Vectors:
+        return vectors if self.as_numpy else vectors.tolist()
 
 if __name__ == "__main__":
     # Test
     model = EmbeddingModel()
     vec = model.embed_text("Hello world")
-    print(f"Vector length: {len(vec)}") # Should be 512 for ViT-B-32
\ No newline at end of file
+    print(f"Vector length: {len(vec)}") # Should be 512 for ViT-B-32
@@ -0,0 +1,142 @@
+import os
+from typing import List, Optional, Union
+import numpy as np
+from PIL import Image
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+class OnnxClipBackend:
+    def __init__(self,
+                 model_name: str = "clip-ViT-B-32",
+                 export_dir: str = "onnx_models",
+                 quantize: bool = True,
+                 num_threads: Optional[int] = None):
+        """
+        Runs a sentence-transformers CLIP model's text and vision towers on ONNX Runtime.
+        The towers are exported from the PyTorch model on first use (and cached in export_dir);
+        with quantize=True the weights are converted to int8 by dynamic quantization.
+        Exposes the same encode() signature EmbeddingModel uses on SentenceTransformer.
+        :param num_threads: Intra-op threads per session; set this when several API workers
+                            share a box, so they don't each grab every core.
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The ONNX backend needs `pip install onnx onnxruntime`.") from e
+
+        self.model_name = model_name
+        variant = "int8" if quantize else "fp32"
+        self.model_dir = os.path.join(export_dir, model_name.replace("/", "_"))
+        text_path = os.path.join(self.model_dir, f"text_{variant}.onnx")
+        vision_path = os.path.join(self.model_dir, f"vision_{variant}.onnx")
+
+        self.processor = self._export_if_missing(text_path, vision_path, quantize)
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        print(f"Loading ONNX ({variant}) towers for {model_name}...")
+        self.text_session = ort.InferenceSession(text_path, options, providers=["CPUExecutionProvider"])
+        self.vision_session = ort.InferenceSession(vision_path, options, providers=["CPUExecutionProvider"])
+
+    def encode(self, inputs: Union[str, Image.Image, List[Union[str, Image.Image]]], batch_size: int = 32) -> np.ndarray:
+        """
+        Encodes texts or PIL images; a single input returns a 1-D vector, a list a 2-D array.
+        """
+        single = not isinstance(inputs, list)
+        items = [inputs] if single else inputs
+        if not items:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        outputs = []
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            if isinstance(batch[0], str):
+                outputs.append(self._encode_texts(batch))
+            else:
+                outputs.append(self._encode_images(batch))
+
+        embeddings = np.concatenate(outputs, axis=0)
+        return embeddings[0] if single else embeddings
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        tokens = self.processor.tokenizer(
+            texts, padding=True, truncation=True, max_length=77, return_tensors="np"
+        )
+        return self.text_session.run(None, {
+            "input_ids": tokens["input_ids"].astype(np.int64),
+            "attention_mask": tokens["attention_mask"].astype(np.int64),
+        })[0]
+
+    def _encode_images(self, images: List[Image.Image]) -> np.ndarray:
+        pixels = self.processor.image_processor(
+            [image.convert("RGB") for image in images], return_tensors="np"
+        )["pixel_values"]
+        return self.vision_session.run(None, {"pixel_values": pixels.astype(np.float32)})[0]
+
+    def _export_if_missing(self, text_path: str, vision_path: str, quantize: bool):
+        # Once exported, only the tokenizer and image preprocessing are loaded: no PyTorch,
+        # no fp32 model in memory (which is what this backend saves at startup)
+        processor_dir = os.path.join(self.model_dir, "processor")
+        if os.path.exists(text_path) and os.path.exists(vision_path) and os.path.isdir(processor_dir):
+            from transformers import CLIPProcessor
+
+            return CLIPProcessor.from_pretrained(processor_dir)
+
+        # PyTorch is only needed for the one-off export
+        from sentence_transformers import SentenceTransformer
+
+        clip_module = SentenceTransformer(self.model_name, device="cpu")[0]
+        if not hasattr(clip_module, "processor"):
+            raise ValueError(f"{self.model_name} is not a CLIP model; the ONNX backend only supports CLIP.")
+
+        if not (os.path.exists(text_path) and os.path.exists(vision_path)):
+            import torch
+
+            print(f"Exporting {self.model_name} to ONNX (one-off)...")
+            os.makedirs(self.model_dir, exist_ok=True)
+            model = clip_module.model.eval()
+            fp32_text = os.path.join(self.model_dir, "text_fp32.onnx")
+            fp32_vision = os.path.join(self.model_dir, "vision_fp32.onnx")
+
+            class TextTower(torch.nn.Module):
+                def forward(self, input_ids, attention_mask):
+                    return model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+            class VisionTower(torch.nn.Module):
+                def forward(self, pixel_values):
+                    return model.get_image_features(pixel_values=pixel_values)
+
+            dummy_tokens = clip_module.processor.tokenizer(["warm-up"], return_tensors="pt")
+            dummy_pixels = clip_module.processor.image_processor(
+                [Image.new("RGB", (224, 224))], return_tensors="pt"
+            )["pixel_values"]
+
+            with torch.no_grad():
+                torch.onnx.export(
+                    TextTower(), (dummy_tokens["input_ids"], dummy_tokens["attention_mask"]), fp32_text,
+                    input_names=["input_ids", "attention_mask"], output_names=["embeddings"],
+                    dynamic_axes={"input_ids": {0: "batch", 1: "sequence"},
+                                  "attention_mask": {0: "batch", 1: "sequence"},
+                                  "embeddings": {0: "batch"}},
+                    opset_version=17,
+                )
+                torch.onnx.export(
+                    VisionTower(), (dummy_pixels,), fp32_vision,
+                    input_names=["pixel_values"], output_names=["embeddings"],
+                    dynamic_axes={"pixel_values": {0: "batch"}, "embeddings": {0: "batch"}},
+                    opset_version=17,
+                )
+
+            if quantize:
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+
+                quantize_dynamic(fp32_text, text_path, weight_type=QuantType.QInt8)
+                quantize_dynamic(fp32_vision, vision_path, weight_type=QuantType.QInt8)
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        clip_module.processor.save_pretrained(processor_dir)
+        return clip_module.processor
@@ -0,0 +1,148 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+class AnswerCache:
+    def __init__(self,
+                 model_name: str,
+                 max_entries: int = 1024,
+                 ttl_seconds: float = 3600,
+                 semantic_threshold: Optional[float] = None):
+        """
+        Caches generated answers so repeated questions skip LLaVA.
+        An entry is keyed by (normalized query, retrieved chunk IDs, model name).
+        :param max_entries: Size cap; least recently used entries are evicted.
+        :param ttl_seconds: Entries older than this are treated as misses.
+        :param semantic_threshold: If set, a query whose embedding has at least this cosine
+                                   similarity to a cached query, and that retrieved exactly
+                                   the same chunks, reuses that query's answer.
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self.entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self.corpus_version: Any = None
+        self.lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Lowercases, collapses whitespace and drops trailing punctuation,
+        so trivially different spellings of a question share an entry.
+        """
+        query = re.sub(r"\s+", " ", query.strip().lower())
+        return query.rstrip("?!. ")
+
+    @staticmethod
+    def context_key(context: Dict[str, List[Any]]) -> Tuple[str, ...]:
+        """
+        Order-independent identity of what retrieval returned.
+        """
+        ids = [item['id'] for item in context.get('text_chunks', []) + context.get('images', [])]
+        return tuple(sorted(ids))
+
+    def get(self,
+            query: str,
+            context: Dict[str, List[Any]],
+            query_embedding: Optional[List[float]] = None,
+            corpus_version: Any = None) -> Optional[str]:
+        """
+        Returns a cached answer, or None on a miss.
+        :param corpus_version: Anything that changes when the ingested corpus changes;
+                               a new value drops every entry.
+        """
+        context_key = self.context_key(context)
+        key = (self.normalize_query(query), context_key, self.model_name)
+
+        with self.lock:
+            self._check_corpus_version(corpus_version)
+            now = time.time()
+
+            # 1. Exact match on the normalized query
+            entry = self.entries.get(key)
+            if entry is not None and now - entry["created"] <= self.ttl_seconds:
+                self.entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"]
+
+            # 2. Semantic match, only among entries that saw the same context
+            if self.semantic_threshold is not None and query_embedding is not None:
+                query_vector = self._unit(query_embedding)
+                for other_key, other in reversed(self.entries.items()):
+                    if other_key[1] != context_key or other_key[2] != self.model_name:
+                        continue
+                    if now - other["created"] > self.ttl_seconds or other["embedding"] is None:
+                        continue
+                    if float(np.dot(query_vector, other["embedding"])) >= self.semantic_threshold:
+                        self.entries.move_to_end(other_key)
+                        self.semantic_hits += 1
+                        return other["answer"]
+
+            self.misses += 1
+            return None
+
+    def put(self,
+            query: str,
+            context: Dict[str, List[Any]],
+            answer: str,
+            query_embedding: Optional[List[float]] = None,
+            corpus_version: Any = None):
+        key = (self.normalize_query(query), self.context_key(context), self.model_name)
+
+        with self.lock:
+            self._check_corpus_version(corpus_version)
+            self.entries[key] = {
+                "answer": answer,
+                "created": time.time(),
+                "embedding": self._unit(query_embedding) if query_embedding is not None else None,
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """
+        Drops every cached answer.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _check_corpus_version(self, corpus_version: Any):
+        # Caller holds the lock
+        if corpus_version is None or corpus_version == self.corpus_version:
+            return
+        if self.corpus_version is not None:
+            self.entries.clear()
+            self.invalidations += 1
+        self.corpus_version = corpus_version
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
@@ -0,0 +1,87 @@
+import re
+from typing import List, Dict, Any, Tuple
+
+# Rough English average for LLaMA-family tokenizers; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+class ContextPacker:
+    def __init__(self,
+                 max_tokens: int = 1500,
+                 min_chunk_tokens: int = 40,
+                 duplicate_threshold: float = 0.8):
+        """
+        Fits retrieved text chunks into a prompt token budget before they reach LLaVA,
+        whose prompt-processing time grows with every token.
+        :param max_tokens: Budget for all context text together.
+        :param min_chunk_tokens: Smallest truncated chunk worth including; when less budget
+                                 than this is left, packing stops.
+        :param duplicate_threshold: Share of a chunk's word trigrams already present in the
+                                    packed context above which the chunk is dropped as overlap.
+        """
+        self.max_tokens = max_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+    def pack(self, chunks: List[Dict[str, Any]]) -> Tuple[List[str], Dict[str, int]]:
+        """
+        Returns the texts to put in the prompt (most relevant first) and packing stats.
+        :param chunks: Retrieved text chunks, best first (the order the retriever returns).
+        """
+        packed: List[str] = []
+        seen: set = set()
+        stats = {"chunks_in": len(chunks), "chunks_out": 0, "duplicates": 0, "truncated": 0,
+                 "tokens_in": 0, "tokens_out": 0}
+        remaining = self.max_tokens
+
+        for chunk in chunks:
+            # 1. Tables: the plain-text rendering is a fraction of the HTML's tokens
+            text = self.chunk_text(chunk).strip()
+            if not text:
+                continue
+            tokens = estimate_tokens(text)
+            stats["tokens_in"] += tokens
+
+            # 2. Overlapping chunks (same passage from a re-ingested or re-chunked file) add nothing
+            shingles = _shingles(text)
+            if shingles and len(shingles & seen) / len(shingles) >= self.duplicate_threshold:
+                stats["duplicates"] += 1
+                continue
+
+            # 3. Chunks arrive in relevance order, so whatever doesn't fit is the least relevant
+            if tokens > remaining:
+                if remaining < self.min_chunk_tokens:
+                    break
+                text = _truncate(text, remaining * CHARS_PER_TOKEN)
+                tokens = estimate_tokens(text)
+                stats["truncated"] += 1
+
+            packed.append(text)
+            seen |= shingles
+            remaining -= tokens
+            stats["tokens_out"] += tokens
+
+        stats["chunks_out"] = len(packed)
+        return packed, stats
+
+    @staticmethod
+    def chunk_text(chunk: Dict[str, Any]) -> str:
+        metadata = chunk.get('metadata') or {}
+        if metadata.get('type') == 'table' and metadata.get('text_summary'):
+            return metadata['text_summary']
+        return chunk.get('content') or ""
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 0))}
+
+def _truncate(text: str, max_chars: int) -> str:
+    # Prefer ending on a sentence, then on a word, over cutting a word in half
+    cut = text[:max_chars]
+    sentence_end = max(cut.rfind(". "), cut.rfind(".\n"))
+    if sentence_end > max_chars // 2:
+        return cut[:sentence_end + 1]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 else cut) + " ..."
@@ -1,22 +1,116 @@
 import os
+import time
+import asyncio
 import ollama
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from src.monitoring.metrics import REGISTRY
+from src.monitoring.tracing import span, record
+from src.generation.context_packer import ContextPacker
+from src.generation.image_preprocessor import ImagePreprocessor, DEFAULT_MAX_SIDE
+
+DEFAULT_MODEL = "llava"
+NO_CONTEXT_ANSWER = "I couldn't find any relevant information in the documents."
+GENERATION_ERROR_PREFIX = "Error generating answer"
+
+PROMPT_TOKENS = REGISTRY.histogram("rag_prompt_tokens", "Prompt tokens LLaVA processed per answer (Ollama's count).",
+                                   buckets=(128, 256, 512, 1024, 2048, 4096, 8192))
 
 class Generator:
-    def __init__(self):
+    def __init__(self,
+                 max_context_tokens: int = 1500,
+                 image_max_side: int = DEFAULT_MAX_SIDE,
+                 image_cache_dir: str = "image_cache"):
         """
         Initialize the local LLaVA model via Ollama.
         No API keys required!
+        :param max_context_tokens: Token budget for retrieved text in the prompt.
+        :param image_max_side: Images are downscaled to this longest side before LLaVA sees them.
+        :param image_cache_dir: Where downscaled images are kept between requests.
         """
-        self.model = "llava" 
+        self.model = DEFAULT_MODEL
+        self.async_client = ollama.AsyncClient()
+        self.packer = ContextPacker(max_tokens=max_context_tokens)
+        self.image_preprocessor = ImagePreprocessor(max_side=image_max_side, cache_dir=image_cache_dir)
         print(f"Generator ready using local model: {self.model}")
 
+    def warm_up(self):
+        """
+        Asks Ollama to load LLaVA into memory (an empty prompt loads without generating).
+        """
+        ollama.generate(model=self.model, prompt="")
+
     def generate_answer(self, query: str, context: Dict[str, List[Any]]) -> str:
         """
         Generates a visually grounded answer using local LLaVA.
         """
         print("Generating answer with local LLaVA...")
 
+        with span("generation.prompt"):
+            prompt, image_paths = self._build_prompt(query, context)
+        if prompt is None:
+            return NO_CONTEXT_ANSWER
+
+        # 3. Call the Local Model
+        try:
+            with span("generation.llm"):
+                response = ollama.chat(
+                    model=self.model,
+                    messages=[{
+                        'role': 'user',
+                        'content': prompt,
+                        'images': image_paths # Ollama handles the file reading/encoding automatically!
+                    }]
+                )
+            self._log_prefill(response)
+            return response['message']['content']
+        except Exception as e:
+            return f"{GENERATION_ERROR_PREFIX}: {e}"
+
+    async def stream_answer(self, query: str, context: Dict[str, List[Any]]) -> AsyncIterator[str]:
+        """
+        Same as generate_answer, but yields the answer token by token as LLaVA produces it.
+        Closing the iterator early (e.g. the client went away) closes the HTTP
+        stream to Ollama, which stops the generation.
+        """
+        print("Streaming answer with local LLaVA...")
+
+        # Image downscaling and context packing are blocking work: keep them off the event loop
+        with span("generation.prompt"):
+            prompt, image_paths = await asyncio.to_thread(self._build_prompt, query, context)
+        if prompt is None:
+            yield NO_CONTEXT_ANSWER
+            return
+
+        start = time.perf_counter()
+        first_token = True
+        stream = await self.async_client.chat(
+            model=self.model,
+            messages=[{
+                'role': 'user',
+                'content': prompt,
+                'images': image_paths
+            }],
+            stream=True
+        )
+        try:
+            async for part in stream:
+                token = part['message']['content']
+                if token:
+                    if first_token:
+                        record("generation.first_token", time.perf_counter() - start)
+                        first_token = False
+                    yield token
+                if part.get('done'):
+                    # The closing message carries the prompt/eval counters
+                    self._log_prefill(part)
+        finally:
+            record("generation.llm", time.perf_counter() - start)
+            await stream.aclose()
+
+    def _build_prompt(self, query: str, context: Dict[str, List[Any]]) -> Tuple[Optional[str], List[str]]:
+        """
+        Returns (prompt, image_paths), or (None, []) when retrieval found nothing.
+        """
         # 1. Collect Image Paths
         # LLaVA via Ollama is simple: you pass the text query and a list of image paths.
         image_paths = []
@@ -26,11 +120,17 @@ class Generator:
         # 2. Build the Text Prompt
         # We verify if we found any context
         if not context['text_chunks'] and not image_paths:
-            return "I couldn't find any relevant information in the documents."
+            return None, []
 
+        # Deduplicated, table summaries instead of HTML, cut to the token budget by relevance
+        texts, packing = self.packer.pack(context.get('text_chunks', []))
         context_text = ""
-        for item in context.get('text_chunks', []):
-            context_text += f"\n- {item['content']}\n"
+        for text in texts:
+            context_text += f"\n- {text}\n"
+
+        # Model-sized copies: full-resolution pages only cost transfer and decode time
+        with span("generation.images"):
+            image_paths = self.image_preprocessor.prepare_many(image_paths)
 
         prompt = (
             f"You are a helpful assistant. Use the following context and images to answer the question.\n"
@@ -38,20 +138,24 @@ class Generator:
             f"Context from documents:\n{context_text}\n\n"
             f"Instruction: Answer the question based on the text and the provided images."
         )
+        print(f"🧾 Prompt: ~{len(prompt) // 4} tokens of text ({packing['chunks_out']}/{packing['chunks_in']} chunks, "
+              f"{packing['tokens_in']} -> {packing['tokens_out']} context tokens, "
+              f"{packing['duplicates']} duplicates dropped) + {len(image_paths)} images")
+        return prompt, image_paths
 
-        # 3. Call the Local Model
-        try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt,
-                    'images': image_paths # Ollama handles the file reading/encoding automatically!
-                }]
-            )
-            return response['message']['content']
-        except Exception as e:
-            return f"Error generating answer: {e}"
+    def _log_prefill(self, response):
+        # Ollama reports durations in nanoseconds; prefill = processing the prompt (and images)
+        prompt_tokens = response.get('prompt_eval_count')
+        prefill_ns = response.get('prompt_eval_duration')
+        if prompt_tokens is None or prefill_ns is None:
+            return  # e.g. the prompt was already in Ollama's KV cache
+        PROMPT_TOKENS.observe(prompt_tokens)
+        record("generation.prefill", prefill_ns / 1e9)
+        eval_ns = response.get('eval_duration')
+        if eval_ns:
+            record("generation.decode", eval_ns / 1e9)
+        print(f"⏱️ Prefill: {prompt_tokens} prompt tokens in {prefill_ns / 1e6:.0f} ms"
+              + (f", decode: {response.get('eval_count')} tokens in {eval_ns / 1e6:.0f} ms" if eval_ns else ""))
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+from typing import List, Dict, Any
+from PIL import Image
+
+# LLaVA 1.6 tiles images up to 672x672; anything larger is downscaled by the model anyway,
+# after paying to transfer, decode and resize the full-resolution file on every request
+DEFAULT_MAX_SIDE = 672
+
+class ImagePreprocessor:
+    def __init__(self,
+                 max_side: int = DEFAULT_MAX_SIDE,
+                 quality: int = 85,
+                 cache_dir: str = "image_cache"):
+        """
+        Downscales and re-encodes images to the vision model's input resolution before
+        they are sent to it, keeping the results on disk so each image is only converted once.
+        :param max_side: Longest side, in pixels, of the image handed to the model.
+        :param quality: JPEG quality of the re-encoded image.
+        :param cache_dir: Where converted images are kept (keyed by source path, size,
+                          modification time and settings, so edited images are reconverted).
+        """
+        self.max_side = max_side
+        self.quality = quality
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.converted = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def prepare(self, image_path: str) -> str:
+        """
+        Returns the path of a model-sized version of the image (the original path if it
+        is already small enough, or if it can't be converted).
+        """
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return image_path
+
+        key = hashlib.sha256(
+            f"{os.path.abspath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.max_side}|{self.quality}".encode()
+        ).hexdigest()
+        cached_path = os.path.join(self.cache_dir, f"{key}.jpg")
+        if os.path.exists(cached_path):
+            self._count(hits=1)
+            return cached_path
+
+        try:
+            with Image.open(image_path) as image:
+                if max(image.size) <= self.max_side and image.format == "JPEG":
+                    self._count(passthrough=1)
+                    return image_path
+                image = image.convert("RGB")
+                image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+                # Write then rename, so concurrent requests never read a half-written file
+                tmp_path = f"{cached_path}.{threading.get_ident()}.tmp"
+                image.save(tmp_path, "JPEG", quality=self.quality, optimize=True)
+            os.replace(tmp_path, cached_path)
+        except Exception as e:
+            print(f"⚠️ Could not downscale {image_path}: {e}")
+            return image_path
+
+        self._count(converted=1, bytes_in=stat.st_size, bytes_out=os.path.getsize(cached_path))
+        return cached_path
+
+    def prepare_many(self, image_paths: List[str]) -> List[str]:
+        return [self.prepare(path) for path in image_paths]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "max_side": self.max_side,
+                "cache_hits": self.hits,
+                "converted": self.converted,
+                "passthrough": self.passthrough,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+            }
+
+    def _count(self, hits: int = 0, converted: int = 0, passthrough: int = 0, bytes_in: int = 0, bytes_out: int = 0):
+        with self.lock:
+            self.hits += hits
+            self.converted += converted
+            self.passthrough += passthrough
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
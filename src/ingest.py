@@ -1,71 +1,462 @@
 import os
-from src.ingestion.document_parser import DocumentParser
-from src.ingestion.image_processor import ImageProcessor
-from src.embeddings.model_loader import EmbeddingModel
-from src.vector_store.chroma_manager import ChromaManager
+import time
+import uuid
+import argparse
+from typing import List, Dict, Any, Optional, Tuple, Set
+from src.ingestion.parallel_parser import ParallelParser, is_supported, PDF_EXTENSIONS, DEFAULT_SHARD_PAGES
+from src.ingestion.page_router import STRATEGIES, PDF_STRATEGIES
+from src.ingestion.image_hashing import ImageStore
+from src.ingestion.manifest import IngestManifest, file_sha256, chunk_id, manifest_path
+from src.embeddings.model_loader import EmbeddingModel, DEFAULT_TEXT_MODEL, DEFAULT_CACHE_PATH
+from src.embeddings.onnx_backend import BACKENDS
+from src.vector_store.base import VectorStore, VECTOR_STORES, TEXT_COLLECTION, create_vector_store
+from src.vector_store.compact_index import PRECISIONS
+from src.retrieval.bm25_index import BM25Index, bm25_path, lexical_text
+from src.monitoring.tracing import record
 
-def main():
+DEFAULT_BATCH_SIZE = 64
+
+class IngestionPipeline:
+    def __init__(self,
+                 db: VectorStore,
+                 embedder: EmbeddingModel,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 lexical_index: Optional[BM25Index] = None,
+                 text_db: Optional[VectorStore] = None,
+                 text_embedder: Optional[EmbeddingModel] = None):
+        """
+        Accumulates chunks from any number of files and writes them in batches.
+        Each batch costs one CLIP encode call for its texts, one for its images,
+        and a single ChromaDB write.
+        :param batch_size: Number of chunks to collect before embedding and storing.
+        :param lexical_index: BM25 index to keep in step with the vector store (optional).
+        :param text_db: Dual-index mode: text/table chunks go here instead of db...
+        :param text_embedder: ...embedded by this text model over sliding windows.
+        """
+        self.db = db
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.lexical_index = lexical_index
+        self.text_db = text_db
+        self.text_embedder = text_embedder
+        self.pending: List[Dict[str, Any]] = []
+        self.chunks_saved = 0
+        # Wall time spent in each stage this pipeline runs, for throughput reports
+        self.stage_seconds = {"embed": 0.0, "store": 0.0}
+
+    def add_chunks(self, chunks: List[Dict[str, Any]]):
+        """
+        Queues chunks for storage, flushing every time a full batch is available.
+        """
+        self.pending.extend(chunks)
+        while len(self.pending) >= self.batch_size:
+            batch = self.pending[:self.batch_size]
+            self.pending = self.pending[self.batch_size:]
+            self._write_batch(batch)
+
+    def flush(self):
+        """
+        Writes whatever is left over as a final (smaller) batch.
+        """
+        if self.pending:
+            batch, self.pending = self.pending, []
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        # 1. Split by modality: CLIP encodes text and pixels through different towers
+        text_chunks = [chunk for chunk in batch if chunk['type'] != 'image']
+        image_chunks = [chunk for chunk in batch if chunk['type'] == 'image']
+
+        text_rows = _Rows()
+        image_rows = _Rows()
+        start = time.perf_counter()
+
+        # 2. Embed all texts in one call
+        if text_chunks:
+            # Tables may have no HTML rendering, fall back to their plain text
+            texts = [chunk['content'] or chunk.get('text_summary') or "" for chunk in text_chunks]
+            if self.text_embedder is not None:
+                # Dual-index mode: windows max-pooled per chunk, so nothing past 77 tokens is lost
+                vectors = self.text_embedder.embed_long_text(texts)
+            else:
+                vectors = self.embedder.embed_text(texts)
+            for chunk, text, vector in zip(text_chunks, texts, vectors):
+                text_rows.append(chunk, vector, text)
+
+        # 3. Embed all images in one call
+        if image_chunks:
+            image_paths = [chunk['metadata'].get('image_path') or chunk['image_path'] for chunk in image_chunks]
+            vectors = self.embedder.embed_images(image_paths)
+            for chunk, vector in zip(image_chunks, vectors):
+                if len(vector) == 0:
+                    continue
+                # For the document text stored in DB, we use "Image: [filename]" as a placeholder
+                image_rows.append(chunk, vector, f"Image content from {chunk['metadata']['filename']}")
+
+        embedded = time.perf_counter()
+        self.stage_seconds["embed"] += embedded - start
+        record("ingest.embed", embedded - start)
+
+        # 4. One write transaction per collection for the whole batch
+        # (upsert, so re-ingesting a chunk with a stable ID overwrites it)
+        if self.text_db is None:
+            writes = [(self.db, text_rows.extend(image_rows))]
+        else:
+            writes = [(self.text_db, text_rows), (self.db, image_rows)]
+
+        for db, rows in writes:
+            if not rows.ids:
+                continue
+            db.upsert_data(
+                ids=rows.ids,
+                embeddings=rows.embeddings,
+                documents=rows.documents,
+                metadatas=rows.metadatas
+            )
+            self.chunks_saved += len(rows.ids)
+
+            if self.lexical_index is not None:
+                self.lexical_index.add(rows.ids, [lexical_text(chunk) for chunk in rows.chunks])
+
+        self.stage_seconds["store"] += time.perf_counter() - embedded
+        record("ingest.store", time.perf_counter() - embedded)
+
+def stored_metadata(chunk: Dict[str, Any], ingested_at: int) -> Dict[str, Any]:
+    """
+    The metadata persisted with a chunk: what the parser recorded plus the fields
+    retrieval filters on (type, source_dir, ingested_at) and what the generator needs
+    (image_path, a table's text_summary). Chroma rejects None values, so those are dropped.
+    """
+    metadata = dict(chunk['metadata'])
+    metadata.update({
+        "type": chunk['type'],
+        "source_dir": os.path.normpath(os.path.dirname(metadata.get('source') or "")),
+        "ingested_at": ingested_at,
+        "image_path": chunk.get('image_path') or metadata.get('image_path'),
+        "text_summary": chunk.get('text_summary'),
+    })
+    return {key: value for key, value in metadata.items() if value is not None}
+
+class IndexWriter:
+    def __init__(self,
+                 db: VectorStore,
+                 embedder: EmbeddingModel,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 text_db: Optional[VectorStore] = None,
+                 text_embedder: Optional[EmbeddingModel] = None,
+                 image_store: Optional[ImageStore] = None):
+        """
+        Keeps the vector store(s), the BM25 index, the manifest and the image store's
+        record of which file has which image in step while files are added, replaced and
+        removed. Used by the one-shot ingest script and by the ingestion service; nothing
+        is visible to the API until commit().
+        :param image_store: Where the parsers filed the images (default: the parsers' default).
+        """
+        self.db = db
+        self.stores = [db] + ([text_db] if text_db is not None else [])
+        self.lexical_index = BM25Index.load(bm25_path(db.persist_dir))
+        self.pipeline = IngestionPipeline(db, embedder, batch_size=batch_size, lexical_index=self.lexical_index,
+                                          text_db=text_db, text_embedder=text_embedder)
+        model_name = embedder.model_name
+        if text_embedder is not None:
+            model_name = f"{embedder.model_name}+{text_embedder.model_name}"
+        self.manifest = IngestManifest(manifest_path(db.persist_dir), model_name=model_name)
+        self.pending: Dict[str, Tuple[str, List[str]]] = {}
+        self.image_store = image_store or ImageStore()
+        # Images each file added or removed since the last commit still has
+        self.image_sources: Dict[str, Set[str]] = {}
+
+    def remove_file(self, filepath: str):
+        """
+        Drops every chunk of a file that no longer exists (or failed halfway through parsing).
+        """
+        # Chunks added since the last commit may still wait in the batch buffer
+        if filepath in self.pending:
+            self.pipeline.flush()
+        for store in self.stores:
+            store.delete_source(filepath)
+        entry = self.manifest.forget(filepath)
+        _, pending_ids = self.pending.pop(filepath, (None, []))
+        self.lexical_index.remove((entry["chunk_ids"] if entry else []) + pending_ids)
+        self.image_sources[filepath] = set()
+
+    def add_file(self, filepath: str, file_hash: str, chunks: List[Dict[str, Any]], append: bool = False):
+        """
+        Replaces a file's chunks with freshly parsed ones (embedded and stored in batches).
+        :param append: The chunks continue a file added since the last commit (the next
+                       shard of a large PDF) instead of replacing it.
+        """
+        if append and filepath in self.pending:
+            # Keep numbering where the earlier shards stopped
+            chunk_ids = self.pending[filepath][1]
+        else:
+            # Drop whatever an older version of this file left behind, then give the
+            # new chunks IDs derived from the path and content hash so reruns overwrite them
+            for store in self.stores:
+                store.delete_source(filepath)
+            self.lexical_index.remove(self.manifest.files.get(filepath, {}).get("chunk_ids", []))
+            chunk_ids = []
+            self.image_sources[filepath] = set()
+        self.image_sources.setdefault(filepath, set()).update(
+            chunk['metadata']['image_hash'] for chunk in chunks if chunk['metadata'].get('image_hash')
+        )
+        ingested_at = int(time.time())
+        for index, chunk in enumerate(chunks, start=len(chunk_ids)):
+            chunk['id'] = chunk_id(filepath, file_hash, index)
+            chunk['metadata'] = stored_metadata(chunk, ingested_at)
+        self.pending[filepath] = (file_hash, chunk_ids + [chunk['id'] for chunk in chunks])
+
+        # Embed and Store (happens whenever a batch fills up)
+        if chunks:
+            self.pipeline.add_chunks(chunks)
+
+    def commit(self):
+        """
+        Writes out everything added so far and publishes it to readers.
+        """
+        self.pipeline.flush()
+
+        # Only record files once their chunks are safely stored
+        # (the manifest goes last: rewriting it is what tells the API the corpus changed)
+        self.lexical_index.save(bm25_path(self.db.persist_dir))
+        for store in self.stores:
+            store.persist()
+        for filepath, (file_hash, chunk_ids) in self.pending.items():
+            self.manifest.record(filepath, file_hash, chunk_ids)
+        self.manifest.save()
+        self.pending = {}
+        # Images a file no longer has pass to the next file that has them (or are deleted)
+        for filepath, keys in self.image_sources.items():
+            self.image_store.retain_source(filepath, keys)
+        self.image_sources = {}
+
+class _Rows:
+    """
+    Column-wise buffer of rows headed for one collection.
+    """
+    def __init__(self):
+        self.ids = []
+        self.embeddings = []
+        self.documents = []
+        self.metadatas = []
+        self.chunks = []
+
+    def append(self, chunk: Dict[str, Any], vector: List[float], document: str):
+        self.ids.append(chunk.get('id') or str(uuid.uuid4()))
+        self.embeddings.append(vector)
+        self.documents.append(document)
+        self.metadatas.append(chunk['metadata'])
+        self.chunks.append(chunk)
+
+    def extend(self, other: "_Rows") -> "_Rows":
+        for name in ("ids", "embeddings", "documents", "metadatas", "chunks"):
+            getattr(self, name).extend(getattr(other, name))
+        return self
+
+def main(data_dir: str = "sample_documents",
+         batch_size: int = DEFAULT_BATCH_SIZE,
+         num_workers: Optional[int] = None,
+         queue_size: int = 8,
+         incremental: bool = True,
+         dual_index: bool = False,
+         text_model_name: str = DEFAULT_TEXT_MODEL,
+         backend: str = "torch",
+         num_threads: Optional[int] = None,
+         vector_precision: Optional[str] = None,
+         vector_store: str = "chroma",
+         persist_dir: Optional[str] = None,
+         embedding_cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+         pdf_strategy: str = "auto",
+         shard_pages: int = DEFAULT_SHARD_PAGES) -> Dict[str, Any]:
+    """
+    Ingests every supported file in data_dir and returns the run's throughput stats.
+    :param persist_dir: Where the vector store lives (defaults to the backend's own directory).
+    :param embedding_cache_path: SQLite embedding cache (None embeds everything from scratch).
+    :param pdf_strategy: "auto" routes each PDF page to "fast" or "hi_res" parsing.
+    :param shard_pages: PDFs longer than this are parsed in page ranges across workers.
+    """
     # 1. Setup
-    DATA_DIR = "sample_documents"
-    db = ChromaManager()
-    embedder = EmbeddingModel()
-    pdf_parser = DocumentParser()
-    img_processor = ImageProcessor()
-
-    print(f"🚀 Starting ingestion from {DATA_DIR}...")
-
-    # 2. Iterate through files
-    for filename in os.listdir(DATA_DIR):
-        filepath = os.path.join(DATA_DIR, filename)
-        
-        extracted_chunks = []
-
-        # A. Handle PDFs
-        if filename.endswith(".pdf"):
-            print(f"Processing PDF: {filename}")
-            extracted_chunks = pdf_parser.parse_pdf(filepath)
-
-        # B. Handle Images
-        elif filename.endswith((".png", ".jpg", ".jpeg")):
-            print(f"Processing Image: {filename}")
-            result = img_processor.process_image(filepath)
-            if result:
-                extracted_chunks = [result]
-
-        # 3. Embed and Store
-        if extracted_chunks:
-            # Prepare lists for batch insertion
-            texts_to_embed = [] # This will be text OR image descriptions
-            metadatas = []
-            ids = []
-
-            for chunk in extracted_chunks:
-                # For images, we embed the 'content' (which might be OCR text or a placeholder)
-                # In a real VLM app, you might use a specific Image Embedding model here.
-                # For this assignment using CLIP, we can embed the images directly if supported,
-                # OR embed the text description. 
-                
-                # IMPORTANT: If chunk is image, use embed_image, else embed_text
-                if chunk['type'] == 'image':
-                    # Embed the actual image pixels using CLIP
-                    vector = embedder.embed_image(chunk['metadata'].get('image_path') or chunk['image_path'])
-                    # For the document text stored in DB, we use "Image: [filename]" as a placeholder
-                    doc_text = f"Image content from {filename}" 
-                else:
-                    # Embed the text
-                    vector = embedder.embed_text(chunk['content'])
-                    doc_text = chunk['content']
-
-                if vector:
-                    db.add_data(
-                        embeddings=[vector],
-                        documents=[doc_text],
-                        metadatas=[chunk['metadata']]
-                    )
-            
-            print(f"Saved {len(extracted_chunks)} chunks from {filename}")
+    # (compact vector copies are a Chroma option; the NumPy store is already memory-mapped)
+    store_options = {"compact_precision": vector_precision} if vector_store == "chroma" else {}
+    db = create_vector_store(vector_store, persist_dir=persist_dir, **store_options)
+    embedder = EmbeddingModel(backend=backend, cache_path=embedding_cache_path,
+                              num_threads=num_threads, as_numpy=True)
+    parser = ParallelParser(num_workers=num_workers, queue_size=queue_size,
+                            pdf_strategy=pdf_strategy, shard_pages=shard_pages)
+
+    text_db = None
+    text_embedder = None
+    if dual_index:
+        text_db = create_vector_store(vector_store, collection_name=TEXT_COLLECTION,
+                                      persist_dir=persist_dir, **store_options)
+        text_embedder = EmbeddingModel(text_model_name, cache_path=embedding_cache_path,
+                                       num_threads=num_threads, as_numpy=True)
+
+    writer = IndexWriter(db, embedder, batch_size=batch_size, text_db=text_db, text_embedder=text_embedder,
+                         image_store=ImageStore(root=parser.image_output_dir))
+    manifest = writer.manifest
+    pipeline = writer.pipeline
+
+    start_time = time.perf_counter()
+
+    filepaths = [
+        os.path.join(data_dir, filename)
+        for filename in sorted(os.listdir(data_dir))
+        if is_supported(filename)
+    ]
+
+    # 2. Work out what changed since the last run
+    file_hashes = {path: file_sha256(path) for path in filepaths}
+    if incremental:
+        to_ingest = [path for path in filepaths if not manifest.is_current(path, file_hashes[path])]
+    else:
+        to_ingest = filepaths
 
+    removed = manifest.removed_files(data_dir, filepaths)
+    for path in removed:
+        writer.remove_file(path)
+        print(f"🗑️ Removed chunks of deleted file {os.path.basename(path)}")
+
+    print(f"🚀 Starting ingestion from {data_dir}: {len(to_ingest)} new/changed, "
+          f"{len(filepaths) - len(to_ingest)} unchanged, {len(removed)} removed "
+          f"({parser.num_workers} parse workers, batch size {batch_size})...")
+
+    docs_processed = 0
+    failures = []
+    # Worker time per file type; hi_res PDF parsing runs its own OCR and counts as parse
+    parse_seconds = {"parse": 0.0, "ocr": 0.0}
+    # PDF pages and worker time per partition strategy
+    parse_strategies = {strategy: {"pages": 0, "seconds": 0.0} for strategy in STRATEGIES}
+    # Images extracted from PDFs: indexed, repeats within a document, also in other
+    # sources (embedding and OCR text cached), dropped as decorative
+    image_counts = {"kept": 0, "repeats": 0, "shared": 0, "tiny": 0}
+    # Image files: OCR runs, cache hits, images the pre-check found no text in, OCR time
+    ocr_counts = {"images": 0, "cached": 0, "no_text": 0, "seconds": 0.0}
+
+    # 3. Parse files in worker processes; chunks arrive here as each file (or each
+    #    page shard of a large PDF) finishes
+    started = set()
+    for parsed in parser.parse_files(to_ingest):
+        filepath = parsed['filepath']
+        filename = os.path.basename(filepath)
+        stage = "parse" if filepath.lower().endswith(PDF_EXTENSIONS) else "ocr"
+        parse_seconds[stage] += parsed['seconds']
+        record(f"ingest.{stage}", parsed['seconds'])
+        # A PDF reports pages per strategy and images, an image file its OCR
+        report = parsed.get('report') or {}
+        for strategy, totals in parse_strategies.items():
+            if strategy in report and report[strategy]['pages']:
+                totals['pages'] += report[strategy]['pages']
+                totals['seconds'] += report[strategy]['seconds']
+                record(f"ingest.parse.{strategy}", report[strategy]['seconds'])
+        if 'images' in report:
+            for key in image_counts:
+                image_counts[key] += report['images'][key]
+        if 'ocr' in report:
+            for key in ocr_counts:
+                ocr_counts[key] += report['ocr'][key]
+            if report['ocr']['images']:
+                record("ingest.ocr.image", report['ocr']['seconds'])
+
+        if parsed['error']:
+            print(f"❌ Failed to parse {filename}: {parsed['error']}")
+            failures.append(filename)
+            if filepath in started:
+                # Earlier shards are already indexed: drop them, the next run retries the file
+                writer.remove_file(filepath)
+            continue
+
+        docs_processed += parsed['final']
+
+        # 4. Embed and Store (happens whenever a batch fills up)
+        writer.add_file(filepath, file_hashes[filepath], parsed['chunks'], append=filepath in started)
+        started.add(filepath)
+        if parsed['chunks']:
+            print(f"Queued {len(parsed['chunks'])} chunks from {filename}")
+
+    # 5. Flush the last batch and publish the new index state
+    writer.commit()
+
+    # 6. Report throughput
+    elapsed = time.perf_counter() - start_time
+    stage_seconds = {**parse_seconds, **pipeline.stage_seconds}
     print("✅ Ingestion Complete!")
+    print(f"📊 {docs_processed} docs, {pipeline.chunks_saved} chunks in {elapsed:.2f}s "
+          f"({docs_processed / max(elapsed, 1e-9):.2f} docs/sec, "
+          f"{pipeline.chunks_saved / max(elapsed, 1e-9):.1f} chunks/sec)")
+    print(f"⏱️ Stages: parse {stage_seconds['parse']:.2f}s + OCR {stage_seconds['ocr']:.2f}s "
+          f"(worker time across {parser.num_workers} processes), "
+          f"embed {stage_seconds['embed']:.2f}s, store {stage_seconds['store']:.2f}s")
+    if any(totals["pages"] for totals in parse_strategies.values()):
+        print("🧭 Page routing: " + ", ".join(
+            f"{strategy} {totals['pages']} pages in {totals['seconds']:.2f}s "
+            f"({totals['seconds'] / max(totals['pages'], 1):.2f}s/page)"
+            for strategy, totals in parse_strategies.items()
+        ))
+    if image_counts["repeats"] or image_counts["shared"] or image_counts["tiny"]:
+        print(f"🖼️ Images: {image_counts['kept']} indexed ({image_counts['shared']} shared with other files), "
+              f"{image_counts['repeats']} repeats skipped, {image_counts['tiny']} tiny ones dropped")
+    if ocr_counts["images"]:
+        print(f"🔤 OCR: {ocr_counts['images']} images in {ocr_counts['seconds']:.2f}s "
+              f"({ocr_counts['cached']} from cache, {ocr_counts['no_text']} skipped as text-free)")
+    if failures:
+        print(f"⚠️ {len(failures)} files failed to parse: {', '.join(failures)}")
+    for store in writer.stores:
+        report = store.compact_report(recall_k=10)
+        if report and report["vectors"]:
+            print(f"🗜️ {store.collection_name}: {report['vectors']} {report['precision']} vectors, "
+                  f"{report['mb_per_million']:.0f} MB per 1M vectors (float32: "
+                  f"{report['float32_mb_per_million']:.0f} MB), recall@10 vs float32 {report['recall_at_10']:.3f}")
+    cache_stats = embedder.cache_stats()
+    if cache_stats:
+        print(f"🗄️ Embedding cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, "
+              f"{cache_stats['misses']} misses ({cache_stats['hit_rate'] * 100:.1f}% hit rate)")
+
+    return {
+        "docs": docs_processed,
+        "chunks": pipeline.chunks_saved,
+        "failures": len(failures),
+        "seconds": elapsed,
+        "docs_per_sec": docs_processed / max(elapsed, 1e-9),
+        "chunks_per_sec": pipeline.chunks_saved / max(elapsed, 1e-9),
+        "stage_seconds": stage_seconds,
+        "parse_strategies": parse_strategies,
+        "images": image_counts,
+        "ocr": ocr_counts,
+    }
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Ingest documents into the multimodal RAG index.")
+    arg_parser.add_argument("--data-dir", default="sample_documents")
+    arg_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="Parser processes (defaults to the number of cores)")
+    arg_parser.add_argument("--queue-size", type=int, default=8,
+                            help="Parsed files buffered ahead of the embedding stage")
+    arg_parser.add_argument("--full", action="store_true",
+                            help="Re-ingest every file, even if it is unchanged since the last run")
+    arg_parser.add_argument("--dual-index", action="store_true",
+                            help="Embed text/table chunks with a dedicated text model in their own collection")
+    arg_parser.add_argument("--text-model", default=DEFAULT_TEXT_MODEL)
+    arg_parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                            help="CLIP inference backend; onnx-int8 is the fastest on CPU")
+    arg_parser.add_argument("--threads", type=int, default=None,
+                            help="CPU threads per embedding model (defaults to all cores)")
+    arg_parser.add_argument("--vector-store", choices=VECTOR_STORES, default="chroma",
+                            help="Vector store backend; the API must be started with the same one")
+    arg_parser.add_argument("--vector-precision", choices=PRECISIONS, default=None,
+                            help="Also keep a compact float16/int8 copy of the vectors for the API to search")
+    arg_parser.add_argument("--persist-dir", default=None,
+                            help="Vector store directory (defaults to chroma_db / numpy_db)")
+    arg_parser.add_argument("--pdf-strategy", choices=PDF_STRATEGIES, default="auto",
+                            help="PDF parsing: route each page to fast/hi_res (auto), or force one for every page")
+    arg_parser.add_argument("--shard-pages", type=int, default=DEFAULT_SHARD_PAGES,
+                            help="Parse PDFs longer than this many pages in page ranges across workers")
+    args = arg_parser.parse_args()
+    main(data_dir=args.data_dir, batch_size=args.batch_size,
+         num_workers=args.workers, queue_size=args.queue_size,
+         incremental=not args.full, dual_index=args.dual_index,
+         text_model_name=args.text_model, backend=args.backend,
+         num_threads=args.threads, vector_precision=args.vector_precision,
+         vector_store=args.vector_store, persist_dir=args.persist_dir,
+         pdf_strategy=args.pdf_strategy, shard_pages=args.shard_pages)
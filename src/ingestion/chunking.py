@@ -0,0 +1,125 @@
+import os
+from typing import List, Dict, Any, Iterable, Callable, Optional, Tuple
+
+# What partition_pdf(chunking_strategy="by_title") was called with before chunking moved here
+CHUNKING_OPTIONS = {"max_characters": 4000, "new_after_n_chars": 3800, "combine_text_under_n_chars": 2000}
+
+class TitleChunker:
+    def __init__(self,
+                 file_path: str,
+                 chunk_function: Optional[Callable[..., List[Tuple[Dict[str, Any], List[int]]]]] = None,
+                 **options):
+        """
+        unstructured's chunk_by_title over parsed PDF elements, fed incrementally (pages
+        parsed separately, shards of a large PDF) with the same result as one call over
+        the whole document.
+        chunk_by_title only closes a chunk based on the elements before it, so every chunk
+        but the last is final: add() hands those out and keeps the last chunk's elements,
+        to be chunked again together with the next ones.
+        Image elements are taken out first and become image chunks of their own, handed
+        out by flush(); everything else goes through chunk_by_title unchanged.
+        :param file_path: Source PDF, recorded in every chunk's metadata.
+        :param chunk_function: Stands in for chunk_by_title: takes element dicts (with an
+                               "id") and options, returns (chunk, ids of its elements) pairs.
+        :param options: chunk_by_title options (default: CHUNKING_OPTIONS).
+        """
+        self.file_path = file_path
+        self.chunk_function = chunk_function or _chunk_by_title
+        self.options = {**CHUNKING_OPTIONS, **options}
+        self.pending: List[Dict[str, Any]] = []  # elements of the chunk(s) still open
+        self.images: List[Dict[str, Any]] = []
+        self.next_id = 0
+
+    def add(self, elements: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Feeds elements (in document order) and returns the chunks they completed.
+        """
+        for element in elements:
+            if element["category"] == "Image":
+                self.images.append({
+                    "type": "image",
+                    "content": "Image extracted from page.",
+                    "image_path": element.get("image_path"),
+                    # Links the chunk to every place the image occurs (see ImageStore)
+                    "metadata": {**self._metadata(element.get("page_number")),
+                                 "image_hash": element.get("image_hash")},
+                })
+                continue
+            self.pending.append({**element, "id": self.next_id})
+            self.next_id += 1
+        if not self.pending:
+            return []
+
+        chunks = self.chunk_function(self.pending, **self.options)
+        if not chunks:
+            return []
+        # The last chunk may still grow; so may any chunk sharing an element with it
+        # (an element too long for one chunk is split across several)
+        held = set(chunks[-1][1])
+        first_open = len(chunks) - 1
+        while first_open > 0 and held.intersection(chunks[first_open - 1][1]):
+            first_open -= 1
+            held.update(chunks[first_open][1])
+        if not held:
+            return []
+        start = next(index for index, element in enumerate(self.pending) if element["id"] in held)
+        self.pending = self.pending[start:]
+        return [self._finish(chunk) for chunk, _ in chunks[:first_open]]
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Closes the open chunk(s) at the end of the document, followed by the image chunks.
+        """
+        chunks = [self._finish(chunk) for chunk, _ in self.chunk_function(self.pending, **self.options)] \
+            if self.pending else []
+        chunks += self.images
+        self.pending, self.images = [], []
+        return chunks
+
+    def _finish(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        page_number = chunk.pop("page_number", None)
+        return {**chunk, "metadata": self._metadata(page_number)}
+
+    def _metadata(self, page_number: Optional[int]) -> Dict[str, Any]:
+        return {
+            "source": self.file_path,
+            "page_number": page_number,
+            "filename": os.path.basename(self.file_path),
+        }
+
+def _chunk_by_title(elements: List[Dict[str, Any]], **options) -> List[Tuple[Dict[str, Any], List[int]]]:
+    # Imported here: unstructured is slow to import
+    from unstructured.chunking.title import chunk_by_title
+    from unstructured.documents.elements import ElementMetadata, Text, TYPE_TO_TEXT_ELEMENT_MAP
+
+    unstructured_elements = []
+    for element in elements:
+        if element["category"] == "PageBreak":
+            continue
+        element_class = TYPE_TO_TEXT_ELEMENT_MAP.get(element["category"], Text)
+        metadata = ElementMetadata(page_number=element.get("page_number"), text_as_html=element.get("text_as_html"))
+        unstructured_elements.append(
+            element_class(text=element.get("text") or "", element_id=str(element["id"]), metadata=metadata)
+        )
+
+    result = []
+    for chunk in chunk_by_title(unstructured_elements, **options):
+        orig_elements = getattr(chunk.metadata, "orig_elements", None)
+        # Without the original elements (older unstructured) every chunk stays open until flush()
+        ids = [int(element.id) for element in orig_elements] if orig_elements \
+            else [element["id"] for element in elements]
+        # Same chunk shapes partition_pdf(chunking_strategy="by_title") gave
+        if "Table" in str(type(chunk)):
+            data = {"type": "table", "content": chunk.metadata.text_as_html, "text_summary": str(chunk)}
+        else:
+            data = {"type": "text", "content": str(chunk)}
+        data["page_number"] = chunk.metadata.page_number
+        result.append((data, ids))
+    return result
+
+def chunk_elements(elements: Iterable[Dict[str, Any]], file_path: str, **options) -> List[Dict[str, Any]]:
+    """
+    Chunks a whole document's elements in one go.
+    """
+    chunker = TitleChunker(file_path, **options)
+    return chunker.add(elements) + chunker.flush()
@@ -1,14 +1,37 @@
 import os
-from typing import List, Dict, Any
-from unstructured.partition.pdf import partition_pdf
+import time
+import shutil
+import tempfile
+from typing import List, Dict, Any, Optional
+from src.ingestion.chunking import chunk_elements
+from src.ingestion.page_router import PageRouter, STRATEGIES, PDF_STRATEGIES, count_pages
+from src.ingestion.image_hashing import ImageStore
 
 class DocumentParser:
-    def __init__(self, image_output_dir: str = "src/assets/extracted_images"):
+    def __init__(self,
+                 image_output_dir: str = "src/assets/extracted_images",
+                 strategy: str = "auto",
+                 router: Optional[PageRouter] = None,
+                 image_store: Optional[ImageStore] = None):
         """
         Initializes the parser.
         :param image_output_dir: Directory to save images extracted from PDFs.
+        :param strategy: "auto" sends each page to the cheap "fast" text-layer extraction
+                         unless it needs layout detection ("hi_res": scanned pages, pictures,
+                         tables); "fast" or "hi_res" use one strategy for every page.
+        :param router: Page routing rules for "auto" (see PageRouter).
+        :param image_store: Where extracted images are filed and their occurrences recorded
+                            (defaults to an ImageStore in image_output_dir).
         """
+        if strategy not in PDF_STRATEGIES:
+            raise ValueError(f"Unknown PDF strategy {strategy!r}; expected one of {PDF_STRATEGIES}")
         self.image_output_dir = image_output_dir
+        self.strategy = strategy
+        self.router = router or PageRouter()
+        self.image_store = image_store or ImageStore(root=image_output_dir)
+        self.tiny_images = 0
+        # Pages and seconds per strategy for the last parse_pdf call
+        self.last_report: Dict[str, Any] = {}
         os.makedirs(self.image_output_dir, exist_ok=True)
 
     def parse_pdf(self, file_path: str) -> List[Dict[str, Any]]:
@@ -16,65 +39,116 @@ class DocumentParser:
         Parses a PDF file to extract text, tables, and images.
         """
         print(f"Processing PDF: {file_path}...")
-        
-        # partition_pdf is the magic function that splits the PDF into elements
-        # strategy="hi_res" is needed for table and image extraction
-        elements = partition_pdf(
-            filename=file_path,
-            strategy="hi_res", 
-            extract_images_in_pdf=True,
-            image_output_dir_path=self.image_output_dir,
-            infer_table_structure=True,
-            chunking_strategy="by_title",
-            max_characters=4000,
-            new_after_n_chars=3800,
-            combine_text_under_n_chars=2000,
-        )
+        return chunk_elements(self.extract_elements(file_path), file_path)
 
-        extracted_data = []
+    def extract_elements(self, file_path: str, pages: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Parses pages of a PDF into elements ({"category", "text", "page_number", ...}),
+        in page order, each page with the strategy it was routed to.
+        :param pages: 1-based page numbers (default: the whole document).
+        """
+        # 1. Route pages
+        start = time.perf_counter()
+        self.tiny_images = 0  # images _partition drops as decorative
+        if self.strategy == "auto":
+            plan = self.router.plan(file_path, pages)
+        else:
+            plan = {strategy: [] for strategy in STRATEGIES}
+            plan[self.strategy] = pages or list(range(1, count_pages(file_path) + 1))
+        report: Dict[str, Any] = {"inspect_seconds": time.perf_counter() - start}
+
+        # 2. Parse each strategy's pages in one partition call
+        total_pages = sum(len(strategy_pages) for strategy_pages in plan.values())
+        report["pages"] = total_pages
+        elements: List[Dict[str, Any]] = []
+        for strategy in STRATEGIES:
+            strategy_pages = sorted(plan[strategy])
+            start = time.perf_counter()
+            if strategy_pages:
+                whole_file = pages is None and len(strategy_pages) == total_pages
+                elements.extend(self._partition(file_path, strategy_pages, strategy, whole_file))
+            report[strategy] = {"pages": len(strategy_pages), "seconds": time.perf_counter() - start}
+
+        # 3. Back into reading order (sorted() is stable: order within a page is kept),
+        #    keeping one copy of each image: a logo repeated on every page is one chunk
+        kept: List[Dict[str, Any]] = []
+        seen_images = set()
+        repeats = shared = 0
+        for element in sorted(elements, key=lambda element: element["page_number"] or 0):
+            image_hash = element.get("image_hash")
+            if image_hash:
+                if image_hash in seen_images:
+                    repeats += 1
+                    continue
+                seen_images.add(image_hash)
+                shared += element.get("shared", False)
+            kept.append(element)
+        # "shared": images other sources have too (their embedding and OCR text are cached)
+        report["images"] = {"kept": len(seen_images), "repeats": repeats, "shared": shared, "tiny": self.tiny_images}
+        self.last_report = report
+        return kept
+
+    def _partition(self, file_path: str, pages: List[int], strategy: str, whole_file: bool) -> List[Dict[str, Any]]:
+        # Imported here: unstructured (and its layout models) is slow to import
+        from unstructured.partition.pdf import partition_pdf
+
+        work_dir = tempfile.mkdtemp(prefix="partition-", dir=self.image_output_dir)
+        try:
+            # Pages routed to this strategy are copied into a PDF of their own
+            source = file_path if whole_file else _write_pages(file_path, pages, work_dir)
+            options = {}
+            if strategy == "hi_res":
+                # hi_res is what finds tables and pictures
+                options = {"extract_images_in_pdf": True, "image_output_dir_path": work_dir,
+                           "infer_table_structure": True}
+            elements = partition_pdf(filename=source, strategy=strategy, **options)
 
-        for element in elements:
-            # Common metadata for all elements
-            metadata = {
-                "source": file_path,
-                "page_number": element.metadata.page_number,
-                "filename": os.path.basename(file_path)
-            }
+            result = []
+            for element in elements:
+                data = _element_dict(element)
+                # Page numbers of the copied PDF -> page numbers of the original
+                if not whole_file and data["page_number"]:
+                    data["page_number"] = pages[data["page_number"] - 1]
+                if data["image_path"]:
+                    stored = self.image_store.add(data["image_path"], file_path, data["page_number"])
+                    if stored is None:
+                        self.tiny_images += 1
+                        continue
+                    data.update(image_path=stored["path"], image_hash=stored["key"], shared=stored["shared"])
+                result.append(data)
+            return result
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
-            # Handle Tables specifically to preserve structure
-            if "Table" in str(type(element)):
-                extracted_data.append({
-                    "type": "table",
-                    "content": element.metadata.text_as_html, # Keep HTML for structure
-                    "text_summary": str(element), # Plain text for searching
-                    "metadata": metadata
-                })
-            
-            # Handle Images (The element text will often be empty, but metadata has image info)
-            elif "Image" in str(type(element)):
-                # Note: 'partition_pdf' saves the image to disk automatically.
-                # We need to link the text chunk to that image file.
-                image_path = element.metadata.image_path
-                extracted_data.append({
-                    "type": "image",
-                    "content": "Image extracted from page.",
-                    "image_path": image_path,
-                    "metadata": metadata
-                })
+def _element_dict(element) -> Dict[str, Any]:
+    """
+    The parts of an unstructured element chunking needs, as a plain (picklable) dict.
+    """
+    metadata = element.metadata
+    return {
+        "category": getattr(element, "category", type(element).__name__),
+        "text": str(element),
+        "page_number": metadata.page_number,
+        "text_as_html": getattr(metadata, "text_as_html", None),
+        "image_path": getattr(metadata, "image_path", None),
+    }
 
-            # Handle Regular Text
-            else:
-                extracted_data.append({
-                    "type": "text",
-                    "content": str(element),
-                    "metadata": metadata
-                })
+def _write_pages(file_path: str, pages: List[int], work_dir: str) -> str:
+    # pypdf comes with unstructured's PDF support
+    from pypdf import PdfReader, PdfWriter
 
-        return extracted_data
+    reader = PdfReader(file_path)
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(reader.pages[page - 1])
+    path = os.path.join(work_dir, "pages.pdf")
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
 
 if __name__ == "__main__":
     # Simple test to verify it works
     parser = DocumentParser()
     # Ensure you have a test PDF in sample_documents to run this
     # data = parser.parse_pdf("sample_documents/test.pdf")
-    # print(f"Extracted {len(data)} elements.")
\ No newline at end of file
+    # print(f"Extracted {len(data)} elements.")
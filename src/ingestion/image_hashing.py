@@ -0,0 +1,214 @@
+import os
+import shutil
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+import numpy as np
+from PIL import Image
+
+# A 64-bit hash is looked up by its 8 bytes: two hashes at most 7 bits apart
+# always agree on at least one byte, so candidates never miss a near-duplicate
+HASH_BANDS = 8
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: which neighbouring pixels get brighter, on a tiny grayscale copy.
+    """
+    pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS), dtype=np.int16)
+    return _to_int(pixels[:, 1:] > pixels[:, :-1])
+
+def phash(image: Image.Image, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """
+    Perceptual hash: signs of the lowest DCT frequencies against their median. Survives
+    rescaling, recompression and small colour changes.
+    """
+    size = hash_size * highfreq_factor
+    pixels = np.asarray(image.convert("L").resize((size, size), Image.LANCZOS), dtype=np.float64)
+    # 2-D DCT-II as two matrix products (numpy has no DCT of its own)
+    n = np.arange(size)
+    basis = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size))
+    low = (basis @ pixels @ basis.T)[:hash_size, :hash_size]
+    return _to_int(low > np.median(low))
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+def _bands(value: int) -> List[int]:
+    return [(value >> (8 * band)) & 0xFF for band in range(HASH_BANDS)]
+
+class ImageStore:
+    def __init__(self,
+                 root: str = "src/assets/extracted_images",
+                 max_distance: int = 6,
+                 min_side: int = 32):
+        """
+        Content-addressed store for every image the pipeline indexes, shared by
+        DocumentParser (images extracted from PDFs) and ImageProcessor (image files).
+        Images are kept once under their content hash, near-duplicates (the same logo,
+        header or chart in another document) are recognised by perceptual hash and filed
+        under the first copy, and every place an image occurs is recorded. Each source
+        still gets its own chunk for an image, so per-file filters and deletes keep
+        working, but the copies share one file: its embedding and OCR text come from the
+        embedding and OCR caches after the first time.
+        The index is a SQLite file next to the images, shared by all worker processes.
+        :param max_distance: Bits (of 64) in which both the pHash and dHash of two images
+                             may differ for them to count as the same image (at most 7).
+        :param min_side: Images narrower or shorter than this (pixels) are dropped as
+                         decorative: bullets, rules, spacers. 0 keeps everything.
+        """
+        if not 0 <= max_distance < HASH_BANDS:
+            raise ValueError(f"max_distance must be between 0 and {HASH_BANDS - 1}")
+        self.root = root
+        self.max_distance = max_distance
+        self.min_side = min_side
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+
+    def add(self, path: str, source: str, page_number: Optional[int] = None,
+            keep_original: bool = False, min_side: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Files an image and records where it occurs. Returns None for an image below the
+        size threshold, otherwise {"key", "path", "shared"}: "path" is the stored copy,
+        and "shared" is True when another source has the same (or a near-identical) image.
+        :param keep_original: Copy the file instead of moving it (for the user's own files).
+        :param min_side: Overrides the store's size threshold.
+        """
+        with Image.open(path) as image:
+            if min(image.size) < (self.min_side if min_side is None else min_side):
+                if not keep_original:
+                    os.remove(path)
+                return None
+            perceptual, difference = phash(image), dhash(image)
+
+        with open(path, "rb") as f:
+            key = hashlib.sha256(f.read()).hexdigest()[:32]
+
+        with self.lock, self._transaction() as conn:
+            match = conn.execute("SELECT key, path FROM images WHERE key = ?", (key,)).fetchone() \
+                or self._near_duplicate(conn, perceptual, difference)
+            if match is None:
+                stored = self._file(path, key, keep_original)
+                conn.execute(
+                    "INSERT OR IGNORE INTO images (key, path, owner, phash, dhash, "
+                    + ", ".join(f"band{band}" for band in range(HASH_BANDS)) + ") VALUES ("
+                    + ", ".join("?" * (5 + HASH_BANDS)) + ")",
+                    [key, stored, source, f"{perceptual:016x}", f"{difference:016x}"] + _bands(perceptual),
+                )
+                match = (key, stored)
+            elif not keep_original and os.path.abspath(path) != os.path.abspath(match[1]):
+                os.remove(path)  # the stored copy stands in for this one
+
+            conn.execute("INSERT OR IGNORE INTO occurrences (key, source, page_number) VALUES (?, ?, ?)",
+                         (match[0], source, page_number if page_number is not None else 0))
+            shared = conn.execute("SELECT 1 FROM occurrences WHERE key = ? AND source != ? LIMIT 1",
+                                  (match[0], source)).fetchone() is not None
+
+        key, stored = match
+        return {"key": key, "path": stored, "shared": shared}
+
+    def retain_source(self, source: str, keys: Iterable[str] = ()):
+        """
+        Drops a source's occurrences of every image except keys: call with the images a
+        re-ingested file still has, or with none when the file is deleted. The next
+        remaining source becomes an image's owner; an image no source has any more is
+        deleted.
+        """
+        if self.conn is None and not os.path.exists(self._index_path()):
+            return  # nothing was ever filed here
+        keys = set(keys)
+        with self.lock, self._transaction() as conn:
+            stale = [key for (key,) in conn.execute("SELECT DISTINCT key FROM occurrences WHERE source = ?", (source,))
+                     if key not in keys]
+            for key in stale:
+                conn.execute("DELETE FROM occurrences WHERE key = ? AND source = ?", (key, source))
+                remaining = conn.execute("SELECT source FROM occurrences WHERE key = ? ORDER BY rowid LIMIT 1",
+                                         (key,)).fetchone()
+                if remaining is not None:
+                    conn.execute("UPDATE images SET owner = ? WHERE key = ? AND owner = ?", (remaining[0], key, source))
+                    continue
+                row = conn.execute("SELECT path FROM images WHERE key = ?", (key,)).fetchone()
+                conn.execute("DELETE FROM images WHERE key = ?", (key,))
+                if row is not None and os.path.exists(row[0]):
+                    os.remove(row[0])
+
+    def owner(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self._connect().execute("SELECT owner FROM images WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def occurrences(self, key: str) -> List[Dict[str, Any]]:
+        """
+        Every (source, page_number) an image was found at.
+        """
+        with self.lock:
+            rows = self._connect().execute(
+                "SELECT source, page_number FROM occurrences WHERE key = ? ORDER BY source, page_number", (key,)
+            ).fetchall()
+        return [{"source": source, "page_number": page_number or None} for source, page_number in rows]
+
+    def _near_duplicate(self, conn: sqlite3.Connection, perceptual: int, difference: int):
+        where = " OR ".join(f"band{band} = ?" for band in range(HASH_BANDS))
+        for key, path, other_p, other_d in conn.execute(
+            f"SELECT key, path, phash, dhash FROM images WHERE {where}", _bands(perceptual)
+        ):
+            if hamming(perceptual, int(other_p, 16)) <= self.max_distance \
+                    and hamming(difference, int(other_d, 16)) <= self.max_distance:
+                return key, path
+        return None
+
+    def _file(self, path: str, key: str, keep_original: bool) -> str:
+        target_dir = os.path.join(self.root, key[:2])
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, key + os.path.splitext(path)[1].lower())
+        if keep_original:
+            shutil.copyfile(path, target)
+        else:
+            shutil.move(path, target)
+        return target
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE: a lookup and the writes based on it see no other process in between
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, "image_index.sqlite")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use: parsers are created in every worker, many never see an image
+        if self.conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            # Autocommit; writes are grouped by _transaction
+            self.conn = sqlite3.connect(self._index_path(), check_same_thread=False, timeout=30,
+                                        isolation_level=None)
+            # WAL lets the parser processes read while one of them writes
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            bands = ", ".join(f"band{band} INTEGER NOT NULL" for band in range(HASH_BANDS))
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                f"key TEXT PRIMARY KEY, path TEXT NOT NULL, owner TEXT NOT NULL, phash TEXT NOT NULL, "
+                f"dhash TEXT NOT NULL, {bands})"
+            )
+            for band in range(HASH_BANDS):
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_band{band} ON images(band{band})")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS occurrences ("
+                "key TEXT NOT NULL, source TEXT NOT NULL, page_number INTEGER NOT NULL, "
+                "PRIMARY KEY (key, source, page_number))"
+            )
+        return self.conn
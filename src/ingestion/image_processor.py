@@ -1,39 +1,57 @@
-from PIL import Image
-import pytesseract
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from src.ingestion.image_hashing import ImageStore
+from src.ingestion.ocr import OCREngine
 
 class ImageProcessor:
-    def __init__(self):
-        # Verify pytesseract is installed and reachable
-        pass
+    def __init__(self, image_store: Optional[ImageStore] = None, ocr: Optional[OCREngine] = None):
+        """
+        :param image_store: Where image files are filed and their occurrences recorded;
+                            shared with DocumentParser when both use the same directory.
+        :param ocr: OCR settings: pre-check, cache, language (see OCREngine).
+        """
+        self.image_store = image_store or ImageStore()
+        self.ocr = ocr or OCREngine()
+        # OCR outcome and time of the last process_image call
+        self.last_report: Dict[str, Any] = {}
 
-    def process_image(self, file_path: str) -> Dict[str, Any]:
+    def process_image(self, file_path: str) -> Optional[Dict[str, Any]]:
         """
         Processes a standalone image (JPG/PNG) to extract text via OCR.
+        An image another file already has still gets its own chunk; its text then comes
+        from the OCR cache. Returns None if the image can't be read.
         """
         print(f"Processing Image: {file_path}...")
-        
+        self.last_report = {"ocr": {"images": 0, "cached": 0, "no_text": 0, "seconds": 0.0}}
         try:
-            image = Image.open(file_path)
-            
-            # Perform OCR to get text from the image
-            extracted_text = pytesseract.image_to_string(image)
-            
-            return {
-                "type": "image",
-                "content": extracted_text, # The text found in the image
-                "image_path": file_path,   # The path to the actual image file
-                "metadata": {
-                    "source": file_path,
-                    "filename": os.path.basename(file_path),
-                    "page_number": 1 # Standalone images are always page 1
-                }
-            }
+            result = self._prepare(file_path)
+            # The text found in the image
+            outcome = self.ocr.ocr(file_path, result["metadata"]["image_hash"])
         except Exception as e:
             print(f"Error processing image {file_path}: {e}")
             return None
 
+        result["content"] = outcome["text"]
+        self.last_report["ocr"].update(images=1, cached=int(outcome["cached"]), no_text=int(outcome["skipped"]),
+                                       seconds=outcome["seconds"])
+        return result
+
+    def _prepare(self, file_path: str) -> Dict[str, Any]:
+        # The user's own files are indexed whatever their size
+        stored = self.image_store.add(file_path, file_path, keep_original=True, min_side=0)
+        return {
+            "type": "image",
+            "content": "",
+            "image_path": stored["path"], # The path to the actual image file
+            "metadata": {
+                "source": file_path,
+                "filename": os.path.basename(file_path),
+                "page_number": 1, # Standalone images are always page 1
+                "image_hash": stored["key"],
+                "origin": "file", # an image file, not one extracted from a PDF (see lexical_text)
+            }
+        }
+
 if __name__ == "__main__":
     processor = ImageProcessor()
-    # processor.process_image("sample_documents/test_image.png")
\ No newline at end of file
+    # processor.process_image("sample_documents/test_image.png")
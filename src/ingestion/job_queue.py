@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+JOB_ACTIONS = ("ingest", "delete")
+
+class JobQueue:
+    def __init__(self, path: str = "ingest_jobs/jobs.sqlite", keep_finished: int = 10_000):
+        """
+        Persistent FIFO of ingestion jobs, so files that arrive while the service is
+        busy (or down) are still processed after a restart.
+        :param path: SQLite file holding the queue.
+        :param keep_finished: Finished jobs kept for status lookups; older ones are pruned.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.keep_finished = keep_finished
+        self.lock = threading.Lock()
+        self.finished_since_prune = 0
+        # Set whenever a job is queued, so workers can sleep instead of polling
+        self.available = threading.Event()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, path TEXT NOT NULL, action TEXT NOT NULL, origin TEXT NOT NULL,"
+            " status TEXT NOT NULL, error TEXT, chunks INTEGER,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+        # Jobs that were running when the process died start over
+        with self.lock:
+            recovered = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+        if recovered:
+            print(f"♻️ Re-queued {recovered} ingestion jobs interrupted by a restart")
+        if self.counts().get("queued"):
+            self.available.set()
+
+    def enqueue(self, path: str, action: str = "ingest", origin: str = "api") -> Dict[str, Any]:
+        """
+        Queues a file (by the path its chunks are stored under). A file that already has
+        a job waiting is not queued twice
+        (editors and copies fire several events per file); the waiting job is returned.
+        :param origin: Where the job came from ("upload", "watch", ...), for status reports.
+        """
+        if action not in JOB_ACTIONS:
+            raise ValueError(f"Unknown job action {action!r}; expected one of {JOB_ACTIONS}")
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE path = ? AND status = 'queued'", (path,)
+            ).fetchone()
+            if row:
+                # The latest event wins (e.g. created, then deleted before we got to it)
+                self.conn.execute("UPDATE jobs SET action = ? WHERE id = ?", (action, row[0]))
+                job_id = row[0]
+            else:
+                job_id = uuid.uuid4().hex
+                self.conn.execute(
+                    "INSERT INTO jobs (id, path, action, origin, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (job_id, path, action, origin, time.time())
+                )
+        self.available.set()
+        return self.get(job_id)
+
+    def claim(self, max_jobs: int = 16) -> List[Dict[str, Any]]:
+        """
+        Marks up to max_jobs of the oldest queued jobs as running and returns them.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT ?", (max_jobs,)
+                ).fetchall()
+                ids = [row[0] for row in rows]
+                self.conn.executemany(
+                    "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                    [(time.time(), job_id) for job_id in ids]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            if not ids:
+                self.available.clear()
+        return [self.get(job_id) for job_id in ids]
+
+    def finish(self, job_id: str, chunks: Optional[int] = None, error: Optional[str] = None):
+        """
+        Records a job's outcome: done (with its chunk count) or failed (with the error).
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, chunks = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error else "done", chunks, error, time.time(), job_id)
+            )
+            self.finished_since_prune += 1
+            if self.finished_since_prune >= 100:
+                self._prune()
+                self.finished_since_prune = 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Most recent jobs first, optionally only those with the given status.
+        """
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        params: list = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [_job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in JOB_STATUSES} | dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _prune(self):
+        # Caller holds the lock
+        self.conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND id NOT IN ("
+            " SELECT id FROM jobs WHERE status IN ('done', 'failed') ORDER BY finished_at DESC LIMIT ?)",
+            (self.keep_finished,)
+        )
+
+_COLUMNS = "id, path, action, origin, status, error, chunks, created_at, started_at, finished_at"
+
+def _job(row) -> Dict[str, Any]:
+    job = dict(zip(_COLUMNS.split(", "), row))
+    if job["finished_at"] and job["started_at"]:
+        job["seconds"] = job["finished_at"] - job["started_at"]
+    return job
@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+from typing import List, Dict, Any, Optional
+
+# Bump whenever parsing output (or chunk ID scheme) changes, so existing files get re-ingested
+PARSER_VERSION = "2"
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+def manifest_path(persist_dir: str) -> str:
+    """
+    Where the manifest for a given vector store directory lives.
+    """
+    return os.path.join(persist_dir, MANIFEST_FILENAME)
+
+def corpus_version(persist_dir: str) -> Optional[int]:
+    """
+    Cheap token that changes whenever an ingest run rewrites the manifest
+    (None if nothing was ingested yet). Used to invalidate downstream caches.
+    """
+    try:
+        return os.stat(manifest_path(persist_dir)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def file_sha256(file_path: str) -> str:
+    """
+    Content hash of a file, read in blocks so large PDFs don't load into memory.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_id(file_path: str, file_hash: str, chunk_index: int) -> str:
+    """
+    Deterministic chunk ID: the same file at the same content always maps to the same IDs.
+    The path is part of it, so byte-identical copies of a file don't overwrite each other.
+    """
+    path_key = hashlib.sha256(os.path.normpath(file_path).encode("utf-8")).hexdigest()[:16]
+    return f"{path_key}:{file_hash}:{chunk_index}"
+
+class IngestManifest:
+    def __init__(self, path: str, model_name: str, parser_version: str = PARSER_VERSION):
+        """
+        Tracks which files are already in the vector store and at which content hash.
+        :param path: JSON file the manifest is persisted to.
+        :param model_name: Embedding model in use; changing it invalidates every entry.
+        """
+        self.path = path
+        self.model_name = model_name
+        self.parser_version = parser_version
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def is_current(self, file_path: str, file_hash: str) -> bool:
+        """
+        True if this exact content was already ingested with the current parser and model.
+        """
+        entry = self.files.get(file_path)
+        return (
+            entry is not None
+            and entry["sha256"] == file_hash
+            and entry["parser_version"] == self.parser_version
+            and entry["model_name"] == self.model_name
+        )
+
+    def record(self, file_path: str, file_hash: str, chunk_ids: List[str]):
+        self.files[file_path] = {
+            "sha256": file_hash,
+            "parser_version": self.parser_version,
+            "model_name": self.model_name,
+            "chunk_ids": chunk_ids,
+        }
+
+    def forget(self, file_path: str) -> Optional[Dict[str, Any]]:
+        return self.files.pop(file_path, None)
+
+    def removed_files(self, data_dir: str, current_paths: List[str]) -> List[str]:
+        """
+        Files recorded under data_dir that are no longer on disk.
+        """
+        data_dir = os.path.normpath(data_dir)
+        current = set(current_paths)
+        return [
+            path for path in self.files
+            if os.path.dirname(os.path.normpath(path)) == data_dir and path not in current
+        ]
+
+    def save(self):
+        # Write to a temp file first so an interrupted run never leaves a corrupt manifest
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,126 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, Optional, Callable
+import numpy as np
+from PIL import Image, ImageOps
+
+# Part of every cache key: bump when normalize() or the pre-check change what OCR sees
+OCR_VERSION = 1
+
+def likely_has_text(image: Image.Image,
+                    sample_width: int = 400,
+                    min_row_density: float = 0.06,
+                    min_text_rows: float = 0.02) -> bool:
+    """
+    Cheap guess at whether OCR can find anything: text is dense, regular stroke edges,
+    so some rows of a small grayscale copy cross many sharp brightness steps. Flat charts,
+    diagrams and blank images have few. Errs on the side of running OCR.
+    :param min_row_density: Share of a row's pixels that must be edges for the row to look like text.
+    :param min_text_rows: Share of rows that must look like text.
+    """
+    gray = image.convert("L")
+    if gray.width > sample_width:
+        gray = gray.resize((sample_width, max(1, gray.height * sample_width // gray.width)))
+    pixels = np.asarray(gray, dtype=np.int16)
+    if pixels.shape[1] < 2:
+        return False
+    edges = np.abs(np.diff(pixels, axis=1)) > 40
+    row_density = edges.mean(axis=1)
+    return float((row_density >= min_row_density).mean()) >= min_text_rows
+
+def normalize(image: Image.Image, min_width: int = 1000, max_width: int = 2500) -> Image.Image:
+    """
+    What Tesseract reads best: grayscale, stretched contrast, and letters roughly
+    300 DPI-sized. Small screenshots are upscaled, huge scans downscaled (Tesseract's
+    time grows with the pixel count, its accuracy doesn't).
+    """
+    gray = ImageOps.autocontrast(image.convert("L"))
+    width = min(max(gray.width, min_width), max_width)
+    if width != gray.width:
+        gray = gray.resize((width, max(1, gray.height * width // gray.width)), Image.LANCZOS)
+    return gray
+
+class OCRCache:
+    def __init__(self, path: str = "ocr_cache/ocr.sqlite"):
+        """
+        OCR text by image content hash (and OCR settings), so re-ingesting an image,
+        or the same image under another name, never runs Tesseract again.
+        """
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self._connect().execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str, seconds: float):
+        with self.lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO ocr (key, text, seconds) VALUES (?, ?, ?)", (key, text, seconds))
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, in the worker process that needs it
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            # WAL lets the parser processes read while one of them writes
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS ocr (key TEXT PRIMARY KEY, text TEXT NOT NULL, seconds REAL)")
+            self.conn.commit()
+        return self.conn
+
+class OCREngine:
+    def __init__(self,
+                 cache_path: Optional[str] = "ocr_cache/ocr.sqlite",
+                 lang: str = "eng",
+                 precheck: bool = True,
+                 ocr_function: Optional[Callable[..., str]] = None):
+        """
+        Tesseract with the expensive parts avoided where possible: images that show no
+        sign of text are skipped, the rest are normalized before OCR, and results are
+        cached by image hash. Parallelism comes from the parser worker processes, one
+        image each (Tesseract's own threads are limited to one per worker).
+        :param cache_path: SQLite OCR cache (None disables caching).
+        :param lang: Tesseract language(s), e.g. "eng+deu". Part of the cache key.
+        :param precheck: Skip images likely_has_text rejects.
+        :param ocr_function: Replaces pytesseract.image_to_string (same signature).
+        """
+        self.cache = OCRCache(cache_path) if cache_path else None
+        self.lang = lang
+        self.precheck = precheck
+        self.ocr_function = ocr_function
+
+    def ocr(self, image_path: str, image_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns {"text", "cached", "skipped", "seconds"} for one image: "skipped" when the
+        pre-check found no text, "seconds" the total time spent on it.
+        :param image_hash: Content hash of the image (e.g. from ImageStore), for the cache.
+        """
+        start = time.perf_counter()
+        key = f"{image_hash}:{self.lang}:{OCR_VERSION}" if image_hash and self.cache is not None else None
+        if key is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                return {"text": text, "cached": True, "skipped": False, "seconds": time.perf_counter() - start}
+
+        with Image.open(image_path) as image:
+            if self.precheck and not likely_has_text(image):
+                text, skipped = "", True
+            else:
+                text, skipped = self._image_to_string(normalize(image)), False
+        seconds = time.perf_counter() - start
+        if key is not None:
+            # "No text" is cached too: the pre-check's verdict won't change either
+            self.cache.put(key, text, seconds)
+        return {"text": text, "cached": False, "skipped": skipped, "seconds": seconds}
+
+    def _image_to_string(self, image: Image.Image) -> str:
+        if self.ocr_function is not None:
+            return self.ocr_function(image, lang=self.lang)
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=self.lang)
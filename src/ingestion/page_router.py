@@ -0,0 +1,96 @@
+from typing import List, Dict, Any, Optional
+
+STRATEGIES = ("fast", "hi_res")
+# What DocumentParser accepts: "auto" routes each page with PageRouter
+PDF_STRATEGIES = ("auto",) + STRATEGIES
+
+class PageRouter:
+    def __init__(self,
+                 min_text_chars: int = 200,
+                 table_rulings: int = 6,
+                 numeric_ratio: float = 0.3):
+        """
+        Decides per PDF page whether the cheap text-layer extraction ("fast") is enough or
+        the page needs layout detection ("hi_res"): scanned pages, pages with pictures and
+        pages that look like tables. Inspection reads the PDF's own drawing instructions,
+        without rendering, so it costs milliseconds per page.
+        :param min_text_chars: Below this many characters in the text layer, the page is
+                               treated as scanned (its text has to come from OCR).
+        :param table_rulings: Lines/rectangles on a page from which it probably holds a table.
+        :param numeric_ratio: Share of digits in the text from which it probably holds a
+                              table without rulings (financial statements, data sheets).
+        """
+        self.min_text_chars = min_text_chars
+        self.table_rulings = table_rulings
+        self.numeric_ratio = numeric_ratio
+
+    def route(self, profile: Dict[str, Any]) -> str:
+        """
+        "fast" or "hi_res" for one page profile (see inspect_pages).
+        """
+        if profile["chars"] < self.min_text_chars:
+            return "hi_res"
+        if profile["images"] > 0:
+            return "hi_res"
+        if profile["rulings"] >= self.table_rulings:
+            return "hi_res"
+        if profile["digits"] / profile["chars"] >= self.numeric_ratio:
+            return "hi_res"
+        return "fast"
+
+    def plan(self, file_path: str, pages: Optional[List[int]] = None) -> Dict[str, List[int]]:
+        """
+        Page numbers (1-based) per strategy. If the PDF can't be inspected, every page
+        goes to hi_res, which is what the parser did before routing existed.
+        :param pages: Only plan these pages (default: the whole document).
+        """
+        try:
+            profiles = inspect_pages(file_path, pages)
+        except Exception as e:
+            print(f"⚠️ Could not inspect {file_path} ({e}), parsing every page with hi_res")
+            return {"fast": [], "hi_res": pages or list(range(1, count_pages(file_path) + 1))}
+
+        plan: Dict[str, List[int]] = {strategy: [] for strategy in STRATEGIES}
+        for profile in profiles:
+            plan[self.route(profile)].append(profile["page"])
+        return plan
+
+def inspect_pages(file_path: str, pages: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Cheap per-page profile: characters (and digits) in the text layer, embedded images,
+    and ruling lines/rectangles.
+    :param pages: 1-based page numbers to inspect (default: all).
+    """
+    # pdfminer.six comes with unstructured's PDF support; imported here like unstructured
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTChar, LTImage, LTLine, LTRect, LTCurve, LTContainer
+
+    profiles = []
+    page_numbers = sorted(pages) if pages else None
+    # laparams=None skips layout analysis: we only count objects, we don't need text boxes
+    layouts = extract_pages(file_path, laparams=None,
+                            page_numbers=[page - 1 for page in page_numbers] if page_numbers else None)
+    for index, page in enumerate(layouts):
+        number = page_numbers[index] if page_numbers else index + 1
+        profile = {"page": number, "chars": 0, "digits": 0, "images": 0, "rulings": 0}
+        stack = list(page)
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, LTChar):
+                text = obj.get_text()
+                if not text.isspace():
+                    profile["chars"] += 1
+                    profile["digits"] += text.isdigit()
+            elif isinstance(obj, LTImage):
+                profile["images"] += 1
+            elif isinstance(obj, (LTLine, LTRect, LTCurve)):
+                profile["rulings"] += 1
+            elif isinstance(obj, LTContainer):
+                stack.extend(obj)
+        profiles.append(profile)
+    return profiles
+
+def count_pages(file_path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(file_path).pages)
@@ -0,0 +1,300 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from src.ingestion.chunking import TitleChunker
+
+PDF_EXTENSIONS = (".pdf",)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# PDFs longer than this are parsed in page ranges of this size, on several workers
+DEFAULT_SHARD_PAGES = 50
+
+# Parsers live once per worker process and are created on first use,
+# so a pool that only sees images never imports unstructured.
+_worker_state: Dict[str, Any] = {}
+
+def _init_worker(image_output_dir: str, pdf_strategy: str = "auto"):
+    _worker_state.clear()
+    _worker_state["image_output_dir"] = image_output_dir
+    _worker_state["pdf_strategy"] = pdf_strategy
+    # Tesseract is already run once per worker process; its own OpenMP threads on top
+    # would only fight over the same cores
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+def _get_pdf_parser():
+    if "pdf_parser" not in _worker_state:
+        from src.ingestion.document_parser import DocumentParser
+        _worker_state["pdf_parser"] = DocumentParser(image_output_dir=_worker_state["image_output_dir"],
+                                                      strategy=_worker_state.get("pdf_strategy", "auto"))
+    return _worker_state["pdf_parser"]
+
+def _get_img_processor():
+    if "img_processor" not in _worker_state:
+        from src.ingestion.image_processor import ImageProcessor
+        from src.ingestion.image_hashing import ImageStore
+        _worker_state["img_processor"] = ImageProcessor(ImageStore(root=_worker_state["image_output_dir"]))
+    return _worker_state["img_processor"]
+
+def is_supported(filename: str) -> bool:
+    """
+    True if the ingestion pipeline knows how to parse this file.
+    """
+    return filename.lower().endswith(PDF_EXTENSIONS + IMAGE_EXTENSIONS)
+
+def parse_file(filepath: str) -> List[Dict[str, Any]]:
+    """
+    Parses a single PDF or image into chunks. Runs inside a worker process.
+    """
+    if filepath.lower().endswith(PDF_EXTENSIONS):
+        return _get_pdf_parser().parse_pdf(filepath)
+
+    # process_image reports failures by returning None; make them errors, or an unreadable
+    # image would be recorded in the manifest with no chunks and never retried
+    result = _get_img_processor().process_image(filepath)
+    if result is None:
+        raise ValueError(f"Could not process image {filepath}")
+    return [result]
+
+def _parse_in_worker(filepath: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+    # Catch everything here so one bad file only fails its own result
+    start = time.perf_counter()
+    chunks, elements = [], []
+    try:
+        if pages is None:
+            chunks, error = parse_file(filepath), None
+        else:
+            # A shard returns elements: chunking happens in the parent, across shards
+            elements, error = _get_pdf_parser().extract_elements(filepath, pages), None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    # Pages and seconds per PDF strategy (see DocumentParser.last_report), OCR outcome and
+    # time for an image (ImageProcessor.last_report)
+    report = None
+    if not error:
+        is_pdf = filepath.lower().endswith(PDF_EXTENSIONS)
+        report = _worker_state["pdf_parser" if is_pdf else "img_processor"].last_report
+    return {"filepath": filepath, "chunks": chunks, "elements": elements, "error": error,
+            "seconds": time.perf_counter() - start, "report": report, "final": True}
+
+def _count_pages(filepath: str) -> int:
+    from src.ingestion.page_router import count_pages
+    return count_pages(filepath)
+
+class _ShardStitcher:
+    """
+    Puts the shards of one PDF back in page order and chunks them with a single
+    TitleChunker, so chunks spanning a shard seam come out exactly as they would
+    from parsing the whole document at once.
+    """
+    def __init__(self, filepath: str, shard_count: int):
+        self.filepath = filepath
+        self.shard_count = shard_count
+        self.chunker = TitleChunker(filepath)
+        self.next_shard = 0
+        self.waiting: Dict[int, Dict[str, Any]] = {}  # shards that finished ahead of their turn
+        self.failed = False
+
+    def add(self, index: int, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Takes one shard's result and returns the results ready to hand out.
+        """
+        if self.failed:
+            return []  # the file was already reported as failed
+        if result["error"]:
+            self.failed = True
+            self.waiting.clear()
+            return [{"filepath": self.filepath, "chunks": [], "error": result["error"],
+                     "seconds": result["seconds"], "report": None, "final": True}]
+
+        self.waiting[index] = result
+        ready = []
+        while self.next_shard in self.waiting:
+            shard = self.waiting.pop(self.next_shard)
+            self.next_shard += 1
+            final = self.next_shard == self.shard_count
+            chunks = self.chunker.add(shard["elements"])
+            if final:
+                chunks += self.chunker.flush()
+            ready.append({"filepath": self.filepath, "chunks": chunks, "error": None,
+                          "seconds": shard["seconds"], "report": shard["report"], "final": final})
+        return ready
+
+_DONE = object()
+
+class ParallelParser:
+    def __init__(self,
+                 num_workers: Optional[int] = None,
+                 queue_size: int = 8,
+                 image_output_dir: str = "src/assets/extracted_images",
+                 keep_pool: bool = False,
+                 pdf_strategy: str = "auto",
+                 shard_pages: Optional[int] = DEFAULT_SHARD_PAGES):
+        """
+        Parses files across a process pool and hands results to the caller
+        through a bounded queue.
+        :param num_workers: Worker processes to use (defaults to the number of cores).
+        :param queue_size: Parsed files allowed to wait for the embedding stage
+                           before parsing pauses.
+        :param keep_pool: Keep the worker processes (and the parsers loaded in them) alive
+                          between parse_files calls, for services that parse a few files
+                          at a time. Call close() when done.
+        :param pdf_strategy: "auto" (route each page), "fast" or "hi_res"; see DocumentParser.
+        :param shard_pages: PDFs longer than this are split into page ranges of this size,
+                            parsed in parallel and handed out shard by shard, so indexing
+                            starts early and memory is bounded by the shard size
+                            (None parses every file whole).
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.queue_size = max(1, queue_size)
+        self.image_output_dir = image_output_dir
+        self.keep_pool = keep_pool
+        self.pdf_strategy = pdf_strategy
+        self.shard_pages = shard_pages
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def parse_files(self, filepaths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Yields {"filepath", "chunks", "error", "seconds", "report", "final"} for each file, in
+        completion order. A file that fails to parse yields an empty chunk list and its error
+        message instead of stopping the run. "seconds" is the worker time spent on the file;
+        "report" has a parsed PDF's pages and seconds per strategy, or an image's OCR time.
+        A sharded PDF yields one result per shard, in page order, with "final" set on the last
+        one; if a shard fails, the file ends with an error result instead and the chunks of
+        earlier shards should be discarded.
+        """
+        results: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        producer = threading.Thread(
+            target=self._produce, args=(list(filepaths), results, stop), daemon=True
+        )
+        producer.start()
+
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # Lets the producer exit if the consumer stopped early
+            stop.set()
+            producer.join()
+
+    def _produce(self, filepaths: List[str], results: queue.Queue, stop: threading.Event):
+        # Never keep more files in flight than workers + queue slots, so a slow
+        # embedding stage throttles parsing instead of piling up chunks in memory
+        max_in_flight = self.num_workers + self.queue_size
+
+        pool = self.pool or self._new_pool()
+        try:
+            in_flight: Dict[Future, Tuple[str, Optional[List[int]], int]] = {}
+            stitchers: Dict[str, _ShardStitcher] = {}
+
+            for filepath, pages, index in self._tasks(filepaths, stitchers):
+                if filepath in stitchers and stitchers[filepath].failed:
+                    continue  # an earlier shard failed, the file is done
+                while len(in_flight) >= max_in_flight:
+                    if not self._drain(in_flight, stitchers, results, stop):
+                        return
+                try:
+                    future = pool.submit(_parse_in_worker, filepath, pages)
+                except BrokenProcessPool:
+                    # A worker died hard; the files it had in flight are reported as
+                    # failed by _drain, and the rest of the run gets a fresh pool
+                    print("⚠️ Parsing worker crashed, restarting the process pool")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._new_pool()
+                    future = pool.submit(_parse_in_worker, filepath, pages)
+                in_flight[future] = (filepath, pages, index)
+
+            while in_flight:
+                if not self._drain(in_flight, stitchers, results, stop):
+                    return
+        except Exception as e:
+            print(f"Parsing pool failed: {e}")
+            # Never hand a possibly broken pool to the next call
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = None
+        finally:
+            if self.keep_pool:
+                self.pool = pool
+            elif pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            self._put(results, _DONE, stop)
+
+    def close(self):
+        """
+        Shuts down a kept worker pool.
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.num_workers,
+                                   initializer=_init_worker,
+                                   initargs=(self.image_output_dir, self.pdf_strategy))
+
+    def _tasks(self, filepaths: List[str], stitchers: Dict[str, _ShardStitcher]):
+        # (filepath, pages, shard index) per unit of work; pages is None for a whole file.
+        # Generated lazily, so a long PDF's page count is read just before its shards go out.
+        for filepath in filepaths:
+            page_count = 0
+            if self.shard_pages and filepath.lower().endswith(PDF_EXTENSIONS):
+                try:
+                    page_count = _count_pages(filepath)
+                except Exception:
+                    page_count = 0  # the whole-file parse reports the problem
+            if page_count <= (self.shard_pages or 0):
+                yield filepath, None, 0
+                continue
+
+            shards = [list(range(first, min(first + self.shard_pages, page_count + 1)))
+                      for first in range(1, page_count + 1, self.shard_pages)]
+            stitchers[filepath] = _ShardStitcher(filepath, len(shards))
+            for index, pages in enumerate(shards):
+                yield filepath, pages, index
+
+    def _drain(self, in_flight: Dict[Future, Tuple[str, Optional[List[int]], int]],
+               stitchers: Dict[str, _ShardStitcher], results: queue.Queue, stop: threading.Event) -> bool:
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in done:
+            filepath, pages, index = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. a native crash); report it against this file
+                result = {"filepath": filepath, "chunks": [], "elements": [], "error": f"{type(e).__name__}: {e}",
+                          "seconds": 0.0, "report": None, "final": True}
+            if pages is None:
+                ready = [result]
+            else:
+                if result["error"]:
+                    result["error"] = f"pages {pages[0]}-{pages[-1]}: {result['error']}"
+                stitcher = stitchers[filepath]
+                ready = stitcher.add(index, result)
+                if stitcher.failed:
+                    # Later shards of the file are no use any more; drop those not started
+                    for other, (other_path, _, _) in in_flight.items():
+                        if other_path == filepath:
+                            other.cancel()
+            for item in ready:
+                item.pop("elements", None)
+                if not self._put(results, item, stop):
+                    return False
+        return True
+
+    @staticmethod
+    def _put(results: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        # Blocks while the queue is full, unless the consumer has gone away
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
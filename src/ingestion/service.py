@@ -0,0 +1,227 @@
+import os
+import re
+import time
+import shutil
+import argparse
+import threading
+from typing import List, Dict, Any, Optional, BinaryIO, Iterable
+from src.ingestion.job_queue import JobQueue
+from src.ingestion.watcher import DirectoryWatcher
+from src.ingestion.parallel_parser import ParallelParser, is_supported, PDF_EXTENSIONS
+from src.ingestion.manifest import file_sha256
+from src.ingestion.page_router import STRATEGIES
+from src.monitoring.tracing import record
+
+class UnsupportedFile(ValueError):
+    """
+    Raised for uploads the pipeline can't parse.
+    """
+
+class IngestionService:
+    def __init__(self,
+                 writer,
+                 watch_dirs: Iterable[str] = (),
+                 upload_dir: str = "uploads",
+                 queue_path: str = "ingest_jobs/jobs.sqlite",
+                 num_workers: int = 2,
+                 max_batch_jobs: int = 16,
+                 poll_interval: float = 2.0):
+        """
+        Long-running ingestion: files from watched directories and uploads go into a
+        persistent job queue, and a background worker parses, embeds and indexes them.
+        Each batch of jobs is committed together, which is when its files become searchable.
+        :param writer: IndexWriter (src/ingest.py) for the store(s) the API searches.
+        :param watch_dirs: Directories whose supported files are kept in the index.
+        :param upload_dir: Where POST /ingest uploads are saved before ingestion.
+        :param num_workers: Parser processes, kept alive between jobs.
+        :param max_batch_jobs: Jobs parsed and committed together when a backlog builds up.
+        """
+        self.writer = writer
+        self.upload_dir = upload_dir
+        self.queue = JobQueue(queue_path)
+        self.parser = ParallelParser(num_workers=num_workers, keep_pool=True)
+        self.max_batch_jobs = max_batch_jobs
+        self.watch_dirs = list(watch_dirs)
+        self.watcher = DirectoryWatcher(self.watch_dirs, self._on_change, poll_interval=poll_interval) \
+            if self.watch_dirs else None
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.last_commit: Optional[Dict[str, Any]] = None
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def start(self):
+        # Files deleted while the service was down are only noticed by comparing with the manifest
+        for directory in self.watch_dirs:
+            directory = _source_path(directory)
+            current = [os.path.join(directory, name) for name in os.listdir(directory) if is_supported(name)]
+            for path in self.writer.manifest.removed_files(directory, current):
+                self.queue.enqueue(path, action="delete", origin="watch")
+
+        self.thread = threading.Thread(target=self._run, name="ingestion-service", daemon=True)
+        self.thread.start()
+        if self.watcher is not None:
+            self.watcher.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.queue.available.set()  # wake the worker
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.thread is not None:
+            self.thread.join()
+        self.parser.close()
+        self.queue.close()
+
+    def submit_upload(self, filename: str, fileobj: BinaryIO) -> Dict[str, Any]:
+        """
+        Saves an uploaded file and queues it. Returns the job.
+        """
+        # Never trust a client-supplied path: keep the base name, drop anything unusual
+        name = re.sub(r"[^\w.\- ]", "_", os.path.basename(filename or "")).strip() or "upload"
+        if not is_supported(name):
+            raise UnsupportedFile(f"Unsupported file type: {name}")
+
+        path = os.path.join(self.upload_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.part"
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(fileobj, f, length=1024 * 1024)
+        os.replace(tmp_path, path)  # a watcher never sees a half-written upload
+        return self.queue.enqueue(_source_path(path), origin="upload")
+
+    def submit_path(self, path: str, action: str = "ingest", origin: str = "api") -> Dict[str, Any]:
+        return self.queue.enqueue(_source_path(path), action=action, origin=origin)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": self.queue.counts(),
+            "watching": self.watch_dirs,
+            "watch_mode": self.watcher.mode if self.watcher else None,
+            "last_commit": self.last_commit,
+        }
+
+    def _on_change(self, path: str, action: str):
+        self.submit_path(path, action=action, origin="watch")
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            jobs = self.queue.claim(self.max_batch_jobs)
+            if not jobs:
+                self.queue.available.wait(timeout=1.0)
+                continue
+            try:
+                self._process(jobs)
+            except Exception as e:
+                # Whatever wasn't finished fails with the batch; the service keeps going
+                print(f"❌ Ingestion batch failed: {e}")
+                for job in jobs:
+                    if self.queue.get(job["id"])["status"] == "running":
+                        self.queue.finish(job["id"], error=f"{type(e).__name__}: {e}")
+
+    def _process(self, jobs: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        outcomes: Dict[str, Dict[str, Any]] = {}  # job id -> finish() arguments
+        to_parse: Dict[str, tuple] = {}
+
+        # 1. Deletions, vanished files and unchanged content need no parsing
+        for job in jobs:
+            path = job["path"]
+            if job["action"] == "delete" or not os.path.exists(path):
+                self.writer.remove_file(path)
+                outcomes[job["id"]] = {"chunks": 0}
+                continue
+            file_hash = file_sha256(path)
+            if self.writer.manifest.is_current(path, file_hash):
+                outcomes[job["id"]] = {"chunks": len(self.writer.manifest.files[path]["chunk_ids"])}
+                continue
+            to_parse[path] = (job, file_hash)
+
+        # 2. Parse on the kept worker pool, embed and store in batches
+        #    (a large PDF arrives shard by shard)
+        started = set()
+        for parsed in self.parser.parse_files(list(to_parse)):
+            path = parsed["filepath"]
+            job, file_hash = to_parse[path]
+            stage = "parse" if path.lower().endswith(PDF_EXTENSIONS) else "ocr"
+            record(f"ingest.{stage}", parsed["seconds"])
+            report = parsed.get("report") or {}
+            for strategy in STRATEGIES:
+                if strategy in report and report[strategy]["pages"]:
+                    record(f"ingest.parse.{strategy}", report[strategy]["seconds"])
+            if report.get("ocr", {}).get("images"):
+                record("ingest.ocr.image", report["ocr"]["seconds"])
+            if parsed["error"]:
+                if path in started:
+                    self.writer.remove_file(path)  # no half-indexed files
+                outcomes[job["id"]] = {"error": parsed["error"]}
+                continue
+            self.writer.add_file(path, file_hash, parsed["chunks"], append=path in started)
+            started.add(path)
+            outcomes[job["id"]] = {"chunks": outcomes.get(job["id"], {}).get("chunks", 0) + len(parsed["chunks"])}
+
+        # 3. Publish, then report the jobs done: "done" means searchable
+        if any(job["action"] == "delete" or job["path"] in to_parse for job in jobs) or self.writer.pending:
+            self.writer.commit()
+        for job in jobs:
+            self.queue.finish(job["id"], **outcomes.get(job["id"], {"error": "not processed"}))
+
+        elapsed = time.perf_counter() - start
+        chunks = sum(outcome.get("chunks") or 0 for outcome in outcomes.values())
+        self.last_commit = {"at": time.time(), "jobs": len(jobs), "seconds": elapsed}
+        print(f"✅ Ingested {len(jobs)} queued files ({len(to_parse)} parsed, {chunks} chunks) in {elapsed:.2f}s")
+
+def _source_path(path: str) -> str:
+    # The same form the one-shot ingest script stores (relative to the working directory
+    # when possible), so both agree on which chunks belong to which file
+    relative = os.path.relpath(os.path.abspath(path))
+    return path if relative.startswith("..") else relative
+
+def build_writer(vector_store: str = "chroma",
+                 persist_dir: Optional[str] = None,
+                 dual_index: bool = False,
+                 backend: str = "torch",
+                 num_threads: Optional[int] = None,
+                 vector_precision: Optional[str] = None,
+                 embedder=None,
+                 text_embedder=None):
+    """
+    An IndexWriter for the given store configuration. Pass the API's embedding models to
+    share them instead of loading a second copy.
+    """
+    # Imported here: src.ingest pulls in the embedding and vector store stacks
+    from src.ingest import IndexWriter
+    from src.embeddings.model_loader import EmbeddingModel, DEFAULT_TEXT_MODEL
+    from src.vector_store.base import TEXT_COLLECTION, create_vector_store
+
+    store_options = {"compact_precision": vector_precision} if vector_store == "chroma" else {}
+    db = create_vector_store(vector_store, persist_dir=persist_dir, **store_options)
+    embedder = embedder or EmbeddingModel(backend=backend, num_threads=num_threads, as_numpy=True)
+    text_db = None
+    if dual_index:
+        text_db = create_vector_store(vector_store, collection_name=TEXT_COLLECTION,
+                                      persist_dir=persist_dir, **store_options)
+        text_embedder = text_embedder or EmbeddingModel(DEFAULT_TEXT_MODEL, num_threads=num_threads, as_numpy=True)
+    return IndexWriter(db, embedder, text_db=text_db, text_embedder=text_embedder)
+
+if __name__ == "__main__":
+    # Standalone service, for deployments that ingest on a different machine or process.
+    # The API sees new files once they are committed (the NumPy store reloads on its own;
+    # a Chroma-backed API should run the service in-process instead, see RAG_WATCH_DIRS).
+    arg_parser = argparse.ArgumentParser(description="Watch directories and ingest new files continuously.")
+    arg_parser.add_argument("--watch", nargs="+", default=["sample_documents"])
+    arg_parser.add_argument("--vector-store", default="chroma")
+    arg_parser.add_argument("--persist-dir", default=None)
+    arg_parser.add_argument("--dual-index", action="store_true")
+    arg_parser.add_argument("--workers", type=int, default=2)
+    arg_parser.add_argument("--poll-interval", type=float, default=2.0)
+    args = arg_parser.parse_args()
+
+    service = IngestionService(
+        build_writer(args.vector_store, args.persist_dir, dual_index=args.dual_index),
+        watch_dirs=args.watch, num_workers=args.workers, poll_interval=args.poll_interval
+    )
+    service.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        service.stop()
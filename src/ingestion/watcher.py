@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from src.ingestion.parallel_parser import is_supported
+
+class DirectoryWatcher:
+    def __init__(self,
+                 directories: Iterable[str],
+                 on_change: Callable[[str, str], None],
+                 poll_interval: float = 2.0,
+                 settle_seconds: float = 1.0,
+                 use_events: bool = True):
+        """
+        Watches directories for supported files that appear, change or disappear, and calls
+        on_change(path, "ingest" | "delete") once per file when it has stopped changing.
+        Uses OS file events (inotify, via watchdog) when available, and falls back to
+        scanning the directories every poll_interval seconds.
+        :param settle_seconds: How long a file's size and mtime must stay the same before it
+                               is reported, so half-copied files are not parsed.
+        :param use_events: Set to False to force polling (e.g. network mounts without inotify).
+        """
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        # path -> (size, mtime_ns) when last seen, and when that state was first seen
+        self.pending: Dict[str, Tuple[Optional[Tuple[int, int]], float]] = {}
+        self.known: Dict[str, Tuple[int, int]] = {}
+        self.observer = None
+        self.thread: Optional[threading.Thread] = None
+
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+        if use_events:
+            self.observer = _start_observer(self.directories, self._mark)
+        self.mode = "events" if self.observer is not None else "polling"
+
+    def start(self):
+        # Everything already on disk is reported once; the service skips unchanged files
+        self._scan()
+        self.thread = threading.Thread(target=self._run, name="directory-watcher", daemon=True)
+        self.thread.start()
+        print(f"👀 Watching {', '.join(self.directories)} ({self.mode})")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        last_scan = time.monotonic()
+        while not self.stop_event.wait(min(0.25, self.settle_seconds)):
+            # With OS events, an occasional rescan still catches anything an event missed
+            rescan_every = self.poll_interval if self.observer is None else max(60.0, self.poll_interval)
+            if time.monotonic() - last_scan >= rescan_every:
+                self._scan()
+                last_scan = time.monotonic()
+            self._report_settled()
+
+    def _scan(self):
+        seen = set()
+        for directory in self.directories:
+            try:
+                names = os.listdir(directory)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                path = os.path.join(directory, name)
+                if not is_supported(name) or not os.path.isfile(path):
+                    continue
+                seen.add(path)
+                if self.known.get(path) != _state(path):
+                    self._mark(path)
+        for path in set(self.known) - seen:
+            self._mark(path)
+
+    def _mark(self, path: str):
+        if not is_supported(path):
+            return
+        state = _state(path)
+        with self.lock:
+            # Seeing the same state again (rescan, duplicate event) must not restart the settle clock
+            if path not in self.pending or self.pending[path][0] != state:
+                self.pending[path] = (state, time.monotonic())
+
+    def _report_settled(self):
+        now = time.monotonic()
+        ready = []
+        with self.lock:
+            for path, (state, since) in list(self.pending.items()):
+                current = _state(path)
+                if current != state:
+                    # Still being written: restart the settle clock
+                    self.pending[path] = (current, now)
+                elif now - since >= self.settle_seconds:
+                    del self.pending[path]
+                    ready.append((path, current))
+
+        for path, state in ready:
+            if state is None:
+                if self.known.pop(path, None) is not None:
+                    self.on_change(path, "delete")
+            elif self.known.get(path) != state:
+                self.known[path] = state
+                self.on_change(path, "ingest")
+
+def _state(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def _start_observer(directories, mark: Callable[[str], None]):
+    # watchdog is optional: without it (or without inotify) we poll
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.is_directory:
+                return
+            mark(os.path.abspath(event.src_path))
+            if getattr(event, "dest_path", None):  # moves/renames report both ends
+                mark(os.path.abspath(event.dest_path))
+
+    try:
+        observer = Observer()
+        for directory in directories:
+            observer.schedule(_Handler(), directory, recursive=False)
+        observer.start()
+        return observer
+    except Exception as e:
+        print(f"⚠️ File events unavailable ({e}), falling back to polling")
+        return None
@@ -0,0 +1,136 @@
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; spans range from sub-millisecond cache lookups to minute-long LLaVA answers
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# (metric name, help text, type, {label tuple: value}) as produced by a collector
+Family = Tuple[str, str, str, Dict[Tuple[Tuple[str, str], ...], float]]
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        """
+        A Prometheus histogram: cumulative bucket counts, sum and count per label set.
+        :param label_names: Labels every observation must provide, e.g. ("stage",).
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], List[float]] = {}  # label values -> bucket counts, +Inf, sum, count
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0.0] * (len(self.buckets) + 3)
+            series[bisect.bisect_left(self.buckets, value)] += 1  # index len(buckets) is +Inf
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {key: list(values) for key, values in self.series.items()}
+        for key, values in sorted(series.items()):
+            labels = list(zip(self.label_names, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(labels + [('le', le)])} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(labels)} {values[-1]:g}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(list(zip(self.label_names, key)))} {value:g}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Holds the process's metrics and renders them in the Prometheus text format.
+        Values that already live elsewhere (queue depths, cache stats) are not copied
+        here but read at scrape time by collectors.
+        """
+        self.metrics: Dict[str, object] = {}
+        self.collectors: List[Callable[[], Iterable[Family]]] = []
+        self.lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, label_names: Iterable[str] = (),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, label_names, buckets))
+
+    def counter(self, name: str, help_text: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text, label_names))
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]):
+        """
+        Registers a function called on every scrape, returning metric families.
+        """
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                # A broken collector must not take the whole scrape down with it
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, help_text, metric_type, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in sorted(samples.items()):
+                    lines.append(f"{name}{_labels(list(labels))} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name: str, factory):
+        # Idempotent, so modules can declare their metrics at import time
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = factory()
+            return self.metrics[name]
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def gauge(name: str, help_text: str, samples: Dict[Tuple[Tuple[str, str], ...], float]) -> Family:
+    """
+    Builds a gauge family for a collector, e.g. gauge("queue_depth", "...", {(("stage", "retrieval"),): 3}).
+    Pass {(): value} for an unlabelled gauge.
+    """
+    return name, help_text, "gauge", samples
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from src.monitoring.metrics import REGISTRY
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_seconds",
+    "Time spent in each pipeline stage (retrieval.*, generation.*, ingest.*, queue waits).",
+    label_names=("stage",),
+)
+
+# Per-request timing collection: set by collect_timings() on the request's task and
+# carried into stage thread pools by StageLimiter (which copies the context)
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_timings", default=None)
+
+def record(stage: str, seconds: float):
+    """
+    Records a duration measured elsewhere, e.g. by a worker process.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _current_timings.get()
+    if timings is not None:
+        # Milliseconds, summed when a stage runs more than once in a request
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Times the enclosed block as one occurrence of a stage, e.g.
+    `with span("retrieval.embed"): vectors = model.embed_text(texts)`.
+    Failed blocks are timed too.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+@contextmanager
+def collect_timings(enabled: bool = True) -> Iterator[Optional[Dict[str, float]]]:
+    """
+    Collects the milliseconds of every span recorded in this context (and in
+    work it hands to StageLimiter pools) into the yielded dict; yields None when disabled.
+    Work done by shared background threads (e.g. the query micro-batcher) only reaches
+    the histograms, since it serves several requests at once.
+    """
+    if not enabled:
+        yield None
+        return
+    timings: Dict[str, float] = {}
+    token = _current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings["total"] = (time.perf_counter() - start) * 1000
+        _current_timings.reset(token)
@@ -0,0 +1,248 @@
+import os
+import re
+import math
+import pickle
+import threading
+from array import array
+from collections import Counter
+from typing import List, Dict, Tuple, Optional, Iterable
+import numpy as np
+
+BM25_FILENAME = "bm25_index.pkl"
+
+def bm25_path(persist_dir: str) -> str:
+    """
+    Where the lexical index for a given vector store directory lives.
+    """
+    return os.path.join(persist_dir, BM25_FILENAME)
+
+def lexical_text(chunk: Dict) -> str:
+    """
+    The text a chunk is keyword-searchable by: plain-text summaries for tables
+    (not their HTML), OCR text for image files, nothing for images extracted from PDFs
+    (their content is a placeholder).
+    """
+    if chunk['type'] == 'table':
+        return chunk.get('text_summary') or chunk.get('content') or ""
+    if chunk['type'] == 'image':
+        return (chunk.get('content') or "") if chunk['metadata'].get('origin') == 'file' else ""
+    return chunk.get('content') or ""
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Kept deliberately short: BM25's idf already discounts common words
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_postings_per_term: int = 20_000):
+        """
+        In-memory inverted index with Okapi BM25 scoring.
+        Postings are append-only arrays. On first use after a change, a term's postings
+        are compiled into NumPy arrays of precomputed BM25 impacts, sorted best first, so
+        scoring a query is a handful of vectorized adds into a dense accumulator.
+        Removed chunks are masked out and physically dropped by compact().
+        :param max_postings_per_term: Only the highest-impact postings of very common terms
+                                      are scored (impact-ordered pruning); this is what keeps
+                                      queries fast on millions of chunks.
+        """
+        self.k1 = k1
+        self.b = b
+        self.max_postings_per_term = max_postings_per_term
+        self.chunk_ids: List[Optional[str]] = []   # internal doc number -> chunk ID
+        self.doc_numbers: Dict[str, int] = {}      # chunk ID -> internal doc number
+        self.doc_lengths = array("f")
+        self.alive = bytearray()
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.total_length = 0.0
+        self.live_docs = 0
+        self._compiled: Dict[str, Tuple[np.ndarray, np.ndarray, int]] = {}
+        self._scores = np.zeros(0, dtype=np.float32)
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.live_docs
+
+    def add(self, chunk_ids: List[str], texts: List[str]):
+        """
+        Indexes (or re-indexes) chunks. Re-adding an existing chunk ID replaces it.
+        """
+        with self.lock:
+            self.remove([cid for cid in chunk_ids if cid in self.doc_numbers])
+
+            for chunk_id, text in zip(chunk_ids, texts):
+                terms = Counter(tokenize(text or ""))
+                if not terms:
+                    continue
+
+                doc = len(self.chunk_ids)
+                length = sum(terms.values())
+                self.chunk_ids.append(chunk_id)
+                self.doc_numbers[chunk_id] = doc
+                self.doc_lengths.append(length)
+                self.alive.append(1)
+                self.total_length += length
+                self.live_docs += 1
+
+                for term, tf in terms.items():
+                    docs, tfs = self.postings.setdefault(term, (array("i"), array("f")))
+                    docs.append(doc)
+                    tfs.append(tf)
+                    self._compiled.pop(term, None)
+
+    def remove(self, chunk_ids: List[str]):
+        with self.lock:
+            for chunk_id in chunk_ids:
+                doc = self.doc_numbers.pop(chunk_id, None)
+                if doc is None:
+                    continue
+                self.alive[doc] = 0
+                self.chunk_ids[doc] = None
+                self.total_length -= self.doc_lengths[doc]
+                self.live_docs -= 1
+            if chunk_ids:
+                self._compiled = {}
+
+            # Keep dead postings from dominating memory and query time
+            if len(self.chunk_ids) > 1000 and self.live_docs < 0.8 * len(self.chunk_ids):
+                self.compact()
+
+    def search(self, query: str, top_k: int = 10, allowed_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Returns up to top_k (chunk_id, score) pairs, best first.
+        :param allowed_ids: Only these chunks can be returned (metadata pre-filtering). They are
+                            masked before the top-k cut, though very common terms are still
+                            pruned to their max_postings_per_term best postings first.
+        """
+        with self.lock:
+            terms = set(tokenize(query))
+            if not terms or self.live_docs == 0:
+                return []
+
+            if len(self._scores) < len(self.chunk_ids):
+                self._scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+            scores = self._scores
+
+            # 1. Accumulate idf * impact per document (doc numbers are unique within a term)
+            touched = []
+            for term in terms:
+                compiled = self._compile(term)
+                if compiled is None:
+                    continue
+                docs, impacts, df = compiled
+                idf = math.log(1 + (self.live_docs - df + 0.5) / (df + 0.5))
+                scores[docs] += idf * impacts
+                touched.append(docs)
+
+            if not touched:
+                return []
+
+            # 2. Top-k among touched documents, then reset the accumulator for the next query
+            candidates = np.concatenate(touched)
+            if allowed_ids is not None:
+                # Checked per candidate (bounded by the pruned postings), not per allowed ID,
+                # so a broad filter over millions of chunks costs no more than a narrow one
+                allowed_ids = allowed_ids if isinstance(allowed_ids, (set, frozenset)) else set(allowed_ids)
+                chunk_ids = self.chunk_ids
+                allowed = np.fromiter((chunk_ids[doc] in allowed_ids for doc in candidates.tolist()),
+                                      dtype=bool, count=len(candidates))
+                scores[candidates[~allowed]] = 0.0
+                candidates = candidates[allowed]
+                if len(candidates) == 0:
+                    return []
+            candidate_scores = scores[candidates]
+            k = min(top_k * 4, len(candidates))
+            best = np.argpartition(-candidate_scores, k - 1)[:k]
+            best = best[np.argsort(-candidate_scores[best])]
+            scores[candidates] = 0.0
+
+            results = []
+            seen = set()
+            for i in best:
+                doc = int(candidates[i])
+                if doc in seen:
+                    continue  # a document matching several terms appears once per term
+                seen.add(doc)
+                results.append((self.chunk_ids[doc], float(candidate_scores[i])))
+                if len(results) == top_k:
+                    break
+            return results
+
+    def compact(self):
+        """
+        Drops removed chunks from the postings and renumbers the survivors.
+        """
+        with self.lock:
+            remap = np.full(len(self.chunk_ids), -1, dtype=np.int64)
+            survivors = [doc for doc, flag in enumerate(self.alive) if flag]
+            remap[survivors] = np.arange(len(survivors))
+
+            postings = {}
+            for term, (docs, tfs) in self.postings.items():
+                docs_np = np.frombuffer(docs, dtype=np.int32)
+                keep = remap[docs_np] >= 0
+                if keep.any():
+                    postings[term] = (
+                        array("i", remap[docs_np[keep]].astype(np.int32).tobytes()),
+                        array("f", np.frombuffer(tfs, dtype=np.float32)[keep].tobytes()),
+                    )
+
+            self.chunk_ids = [self.chunk_ids[doc] for doc in survivors]
+            self.doc_numbers = {chunk_id: doc for doc, chunk_id in enumerate(self.chunk_ids)}
+            self.doc_lengths = array("f", [self.doc_lengths[doc] for doc in survivors])
+            self.alive = bytearray(b"\x01" * len(survivors))
+            self.postings = postings
+            self._compiled = {}
+
+    def save(self, path: str):
+        with self.lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            state = {key: value for key, value in self.__dict__.items()
+                     if key not in ("lock", "_compiled", "_scores")}
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Loads a saved index, or returns an empty one if the file doesn't exist yet.
+        """
+        index = cls()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                index.__dict__.update(pickle.load(f))
+        return index
+
+    def _compile(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray, int]]:
+        compiled = self._compiled.get(term)
+        if compiled is None:
+            posting = self.postings.get(term)
+            if posting is None:
+                return None
+
+            docs = np.frombuffer(posting[0], dtype=np.int32)
+            tfs = np.frombuffer(posting[1], dtype=np.float32)
+            live = np.frombuffer(self.alive, dtype=np.uint8)[docs] == 1
+            docs, tfs = docs[live], tfs[live]
+            if len(docs) == 0:
+                return None
+
+            # The length-normalized tf part of BM25 doesn't depend on the query
+            avg_length = self.total_length / max(self.live_docs, 1)
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.float32)[docs]
+            impacts = tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * lengths / avg_length))
+
+            df = len(docs)
+            if df > self.max_postings_per_term:
+                keep = np.argpartition(-impacts, self.max_postings_per_term - 1)[:self.max_postings_per_term]
+                docs, impacts = docs[keep], impacts[keep]
+
+            compiled = (docs.copy(), impacts.astype(np.float32), df)
+            self._compiled[term] = compiled
+        return compiled
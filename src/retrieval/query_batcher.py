@@ -0,0 +1,111 @@
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional
+from src.monitoring.metrics import REGISTRY
+from src.monitoring.tracing import span
+
+BATCH_SIZES = REGISTRY.histogram("rag_query_batch_size", "Queries per micro-batch.",
+                                 buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+
+_STOP = object()
+
+class QueryBatcher:
+    def __init__(self, embedding_model, vector_db, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Collects queries arriving from concurrent callers for a few milliseconds,
+        embeds them with one encode call and searches them with one vector-store query
+        (one per distinct metadata filter).
+        :param max_batch_size: Largest number of queries handled together.
+        :param max_wait_ms: How long the first query of a batch waits for company.
+        """
+        self.embedding_model = embedding_model
+        self.vector_db = vector_db
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests: queue.Queue = queue.Queue()
+        self.batches_run = 0
+        self.queries_run = 0
+
+        self.worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self.worker.start()
+
+    def search(self, query: str, n_results: int, where: Optional[Dict[str, Any]] = None) -> Dict[str, List[Any]]:
+        """
+        Blocking search for one query. Returns the same batch-shaped dict as
+        VectorStore.query_similar, so callers don't need to know about batching.
+        """
+        return self.submit(query, n_results, where).result()
+
+    def submit(self, query: str, n_results: int, where: Optional[Dict[str, Any]] = None) -> Future:
+        future: Future = Future()
+        self.requests.put((query, n_results, where, future))
+        return future
+
+    def close(self):
+        self.requests.put(_STOP)
+        self.worker.join()
+
+    def _run(self):
+        while True:
+            first = self.requests.get()
+            if first is _STOP:
+                return
+
+            # Gather whatever else arrives before the deadline (or until the batch is full)
+            batch = [first]
+            stop_after = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop_after = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+            if stop_after:
+                return
+
+    def _process(self, batch):
+        try:
+            # 1. One encode call for every query in the batch
+            BATCH_SIZES.observe(len(batch))
+            with span("retrieval.embed"):
+                embeddings = self.embedding_model.embed_text([query for query, _, _, _ in batch])
+
+            # 2. One multi-query search per distinct filter, deep enough for its largest request
+            groups: Dict[str, List[int]] = {}
+            for i, (_, _, where, _) in enumerate(batch):
+                groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+
+            for members in groups.values():
+                where = batch[members[0]][2]
+                n_results = max(batch[i][1] for i in members)
+                with span("retrieval.search"):
+                    raw_results = self.vector_db.query_similar_batch(
+                        [embeddings[i] for i in members], n_results=n_results, where=where
+                    )
+
+                # 3. Hand each caller its own row, trimmed to what it asked for
+                for row, i in enumerate(members):
+                    _, n, _, future = batch[i]
+                    future.set_result({
+                        key: [raw_results[key][row][:n]]
+                        for key in ("ids", "documents", "metadatas", "distances")
+                    })
+
+            self.batches_run += 1
+            self.queries_run += len(batch)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
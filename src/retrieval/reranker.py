@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+DEFAULT_RERANKER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+class CrossEncoderReranker:
+    def __init__(self,
+                 model_name: str = DEFAULT_RERANKER,
+                 batch_size: int = 32,
+                 max_length: int = 256,
+                 budget_ms: Optional[float] = 150.0,
+                 num_threads: Optional[int] = None):
+        """
+        Second-stage re-ranker: a cross-encoder reads the query and each candidate chunk
+        together, which ranks far better than comparing two independent embeddings.
+        Only text chunks are re-scored; images keep their first-stage positions.
+        :param batch_size: (query, chunk) pairs scored per forward pass.
+        :param max_length: Tokens of query + chunk the model reads; longer chunks are truncated.
+        :param budget_ms: Per-request time budget. Fewer candidates are scored when the
+                          measured cost says all of them won't fit, and the first-stage
+                          order is kept if the budget runs out mid-way. None = no budget.
+        :param num_threads: CPU threads for inference (None = library default).
+        """
+        # Imported here so importing this module doesn't pull in torch
+        from sentence_transformers import CrossEncoder
+
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+
+        print(f"Loading re-ranker: {model_name}...")
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        # Running estimate of seconds per scored pair, used to size the pool to the budget
+        self.seconds_per_pair: Optional[float] = None
+        self.lock = threading.Lock()
+        self.reranked = 0
+        self.truncated = 0
+        self.fallbacks = 0
+
+    def warm_up(self):
+        # A full batch, so the first per-pair cost estimate isn't dominated by call overhead
+        self._score([("warm up", "warm up")] * self.batch_size)
+
+    def rerank(self, query: str, items: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Re-orders first-stage candidates (best first) and returns the best top_k.
+        Each re-scored item gets its cross-encoder logit as 'rerank_score'.
+        """
+        # 1. Text slots get re-ranked among themselves; image slots stay where they are
+        text_slots = [i for i, item in enumerate(items) if item['metadata'].get('type') != 'image']
+        if len(text_slots) < 2:
+            return items[:top_k]
+
+        # 2. Score as many candidates (in first-stage order) as the budget allows
+        deadline = None if self.budget_ms is None else time.perf_counter() + self.budget_ms / 1000
+        n = len(text_slots)
+        if self.budget_ms is not None and self.seconds_per_pair:
+            n = min(n, int(self.budget_ms / 1000 / self.seconds_per_pair))
+        if n < 2:
+            self._count("fallbacks")
+            return items[:top_k]
+
+        pairs = [(query, items[i]['content'] or "") for i in text_slots[:n]]
+        scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            if deadline is not None and time.perf_counter() > deadline:
+                # Out of time: the first-stage order is better than a half-scored one
+                self._count("fallbacks")
+                return items[:top_k]
+            scores.extend(self._score(pairs[start:start + self.batch_size]))
+
+        # 3. Re-scored candidates first, unscored ones after them in their original order
+        scored = sorted(zip(text_slots[:n], scores), key=lambda pair: pair[1], reverse=True)
+        reordered_text = []
+        for i, score in scored:
+            items[i]['rerank_score'] = float(score)
+            reordered_text.append(items[i])
+        reordered_text.extend(items[i] for i in text_slots[n:])
+
+        result = list(items)
+        for slot, item in zip(text_slots, reordered_text):
+            result[slot] = item
+        self._count("truncated" if n < len(text_slots) else "reranked")
+        return result[:top_k]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "model": self.model_name,
+                "reranked": self.reranked,
+                "truncated": self.truncated,
+                "fallbacks": self.fallbacks,
+                "ms_per_pair": self.seconds_per_pair * 1000 if self.seconds_per_pair else None,
+            }
+
+    def _score(self, pairs) -> List[float]:
+        start = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        per_pair = (time.perf_counter() - start) / len(pairs)
+        with self.lock:
+            # Exponential moving average, so a slow outlier doesn't shrink every later pool
+            self.seconds_per_pair = per_pair if self.seconds_per_pair is None \
+                else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+        return list(scores)
+
+    def _count(self, outcome: str):
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
@@ -1,57 +1,352 @@
-from typing import List, Dict, Any
-from src.embeddings.model_loader import EmbeddingModel
-from src.vector_store.chroma_manager import ChromaManager
+import os
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+from src.embeddings.model_loader import EmbeddingModel, DEFAULT_TEXT_MODEL, DEFAULT_CACHE_PATH
+from src.vector_store.base import VectorStore, TEXT_COLLECTION, create_vector_store
+from src.vector_store.filters import build_where, MatchingIdsCache
+from src.ingestion.manifest import corpus_version
+from src.retrieval.query_batcher import QueryBatcher
+from src.retrieval.bm25_index import BM25Index, bm25_path
+from src.retrieval.reranker import CrossEncoderReranker, DEFAULT_RERANKER
+from src.monitoring.tracing import span
 
 class Retriever:
-    def __init__(self):
+    def __init__(self,
+                 batch_queries: bool = True,
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 hybrid: bool = True,
+                 lexical_weight: float = 0.5,
+                 rrf_k: int = 60,
+                 dual_index: bool = False,
+                 text_model_name: str = DEFAULT_TEXT_MODEL,
+                 calibration: Optional[Dict[str, Tuple[float, float]]] = None,
+                 embedding_backend: str = "torch",
+                 num_threads: Optional[int] = None,
+                 vector_precision: Optional[str] = None,
+                 vector_store: str = "chroma",
+                 persist_dir: Optional[str] = None,
+                 embedding_cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 rerank: bool = False,
+                 rerank_candidates: int = 50,
+                 rerank_budget_ms: Optional[float] = 150.0,
+                 reranker_model: str = DEFAULT_RERANKER):
         """
         Initializes the Retriever with the embedding model and vector store.
+        :param batch_queries: Micro-batch concurrent queries into one encode + one search.
+        :param max_batch_size: Largest micro-batch.
+        :param max_wait_ms: How long a query waits for others to join its batch.
+        :param hybrid: Also search the BM25 index built at ingestion and fuse both rankings.
+        :param lexical_weight: Share of the fused score given to BM25 (0 = vector only, 1 = BM25 only).
+        :param rrf_k: Reciprocal rank fusion constant; larger values flatten rank differences.
+        :param dual_index: Search text chunks in the text-model collection and images in the
+                           CLIP collection (both filled by `python -m src.ingest --dual-index`).
+        :param text_model_name: Text model used for the text collection.
+        :param calibration: Per-modality (scale, offset) applied to cosine similarities before
+                            the two result lists are merged. CLIP text-to-image similarities sit
+                            around 0.2-0.35 while text-model similarities for relevant chunks sit
+                            around 0.4-0.7, hence the default 2x on images; tune per corpus.
+        :param embedding_backend: Inference backend of the CLIP model ("torch", "onnx", "onnx-int8").
+                                  Must match the one used at ingestion closely enough; int8 vectors
+                                  stay above ~0.98 cosine of the fp32 ones, so mixing is fine.
+        :param num_threads: CPU threads per embedding model.
+        :param vector_precision: "float16" or "int8" to search compact in-process copies of the
+                                 vectors (with float32 rescoring) instead of Chroma's HNSW index.
+        :param vector_store: "chroma" or "numpy"; must match the store ingestion wrote to.
+        :param persist_dir: Vector store directory, if not the backend's default.
+        :param embedding_cache_path: SQLite embedding cache for query vectors (None disables it).
+        :param rerank: Re-score the candidates with a cross-encoder before the top-k cut.
+        :param rerank_candidates: First-stage candidates fetched (per index) for the re-ranker.
+        :param rerank_budget_ms: Re-ranking time budget per query; past it, the first-stage order is used.
+        :param reranker_model: Cross-encoder used for re-ranking.
         """
-        self.embedding_model = EmbeddingModel()
-        self.vector_db = ChromaManager()
+        store_options = {"compact_precision": vector_precision} if vector_store == "chroma" else {}
+        self.embedding_model = EmbeddingModel(backend=embedding_backend, cache_path=embedding_cache_path,
+                                              num_threads=num_threads, as_numpy=True)
+        self.vector_db = create_vector_store(vector_store, persist_dir=persist_dir, **store_options)
+        self.dual_index = dual_index
+        self.calibration = calibration or {"text": (1.0, 0.0), "image": (2.0, 0.0)}
+        self.text_embedding_model = None
+        self.text_db = None
+        if dual_index:
+            self.text_embedding_model = EmbeddingModel(text_model_name, cache_path=embedding_cache_path,
+                                                       num_threads=num_threads, as_numpy=True)
+            self.text_db = create_vector_store(vector_store, collection_name=TEXT_COLLECTION,
+                                               persist_dir=persist_dir, **store_options)
+            # Runs the two index searches side by side when they aren't micro-batched
+            self.search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retriever-search")
+        self.hybrid = hybrid
+        self.reranker = None
+        self.rerank_candidates = rerank_candidates
+        if rerank:
+            self.reranker = CrossEncoderReranker(reranker_model, budget_ms=rerank_budget_ms,
+                                                 num_threads=num_threads)
+        self.lexical_weight = lexical_weight
+        self.rrf_k = rrf_k
+        self.lexical_index_path = bm25_path(self.vector_db.persist_dir)
+        self.lexical_index = None
+        self.lexical_index_mtime = None
+        self.lexical_lock = threading.Lock()
+        self.lexical_reload_lock = threading.Lock()
+        self.matching_ids_cache = MatchingIdsCache()
+        self.batcher = None
+        self.text_batcher = None
+        if batch_queries:
+            self.batcher = QueryBatcher(
+                self.embedding_model, self.vector_db,
+                max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+            )
+            if dual_index:
+                self.text_batcher = QueryBatcher(
+                    self.text_embedding_model, self.text_db,
+                    max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+                )
 
-    def retrieve(self, query: str, top_k: int = 5) -> Dict[str, List[Any]]:
+    def warm_up(self):
+        """
+        Touches every lazily initialized piece so the first query is not the slow one.
+        """
+        self.embedding_model.warm_up()
+        self.vector_db.count()
+        if self.reranker:
+            self.reranker.warm_up()
+        if self.dual_index:
+            self.text_embedding_model.warm_up(images=False)
+            self.text_db.count()
+
+    def close(self):
+        for batcher in (self.batcher, self.text_batcher):
+            if batcher:
+                batcher.close()
+
+    def retrieve(self, query: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None) -> Dict[str, List[Any]]:
         """
         Performs cross-modal retrieval.
         1. Embeds the text query.
         2. Searches the vector DB for the nearest neighbors (images OR text).
         3. Formats the results for the generator.
+        :param filters: Restricts the search to matching chunks, e.g. {"filename": "report.pdf",
+                        "type": ["text", "table"], "page_min": 3}; see build_where for the keys.
+                        Applied inside both the vector and the BM25 search, before the top-k cut.
         """
         print(f"Retrieving for query: '{query}'")
+        where = build_where(filters)
+
+        # 1 + 2. Convert text query to vector and query the database(s)
+        if self.dual_index:
+            # A text model that sees whole chunks needs less over-fetching than CLIP
+            depth = self._depth(top_k)
+            text_search = self._search(self.text_batcher, self.text_embedding_model, self.text_db, query, depth, where)
+            image_search = self._search(self.batcher, self.embedding_model, self.vector_db, query, depth, where)
+            # Embedding + search, including any wait for a micro-batch to fill
+            with span("retrieval.vector"):
+                retrieved_items = (
+                    self._parse_results(text_search.result(), "text")
+                    + self._parse_results(image_search.result(), "image")
+                )
+        else:
+            # We query for slightly more than top_k to allow for filtering if needed
+            search = self._search(self.batcher, self.embedding_model, self.vector_db, query, self._depth(top_k * 2), where)
+            with span("retrieval.vector"):
+                retrieved_items = self._parse_results(search.result())
+
+        return self._finish(query, retrieved_items, top_k, where)
+
+    def retrieve_batch(self,
+                       queries: List[str],
+                       top_k: int = 5,
+                       filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, List[Any]]]:
+        """
+        Retrieval for many queries at once (offline evaluation, bulk jobs): one encode call
+        and one multi-query vector search per index for the whole list, bypassing the
+        micro-batcher. Returns one context per query, in order.
+        """
+        if not queries:
+            return []
+        print(f"Retrieving for {len(queries)} queries in one batch")
+        where = build_where(filters)
+
+        if self.dual_index:
+            depth = self._depth(top_k)
+            text_raw = self._embed_and_search(self.text_embedding_model, self.text_db, queries, depth, where)
+            image_raw = self._embed_and_search(self.embedding_model, self.vector_db, queries, depth, where)
+            retrieved = [
+                self._parse_results(_result_row(text_raw, i), "text")
+                + self._parse_results(_result_row(image_raw, i), "image")
+                for i in range(len(queries))
+            ]
+        else:
+            raw = self._embed_and_search(self.embedding_model, self.vector_db, queries, self._depth(top_k * 2), where)
+            retrieved = [self._parse_results(_result_row(raw, i)) for i in range(len(queries))]
+
+        return [self._finish(query, items, top_k, where) for query, items in zip(queries, retrieved)]
+
+    def _finish(self, query: str, retrieved_items: List[Dict], top_k: int,
+                where: Optional[Dict[str, Any]] = None) -> Dict[str, List[Any]]:
+        # 4. Re-Ranking / Filtering (The "Fusion" Logic)
+        # We sort by score descending to get the most relevant first
+        retrieved_items.sort(key=lambda x: x['score'], reverse=True)
+
+        # CLIP only sees the first 77 tokens of a chunk, so keyword matches
+        # anywhere in the chunk come from BM25 and are merged in by rank
+        if self.hybrid:
+            with span("retrieval.lexical"):
+                lexical_hits = self._lexical_search(query, self._depth(top_k * 2), where)
+            if lexical_hits:
+                with span("retrieval.fuse"):
+                    retrieved_items = self._fuse(retrieved_items, lexical_hits)
+        
+        # A cross-encoder reads query and chunk together: slower, but much better at the top
+        if self.reranker:
+            with span("retrieval.rerank"):
+                final_results = self.reranker.rerank(query, retrieved_items, top_k)
+        else:
+            # Return only the requested top_k
+            final_results = retrieved_items[:top_k]
         
-        # 1. Convert text query to vector
-        query_embedding = self.embedding_model.embed_text(query)
+        return self._categorize_results(final_results)
 
-        # 2. Query the database
-        # We query for slightly more than top_k to allow for filtering if needed
-        raw_results = self.vector_db.query_similar(query_embedding, n_results=top_k * 2)
+    def _depth(self, n: int) -> int:
+        # How many first-stage candidates to fetch: a re-ranker needs a wider pool to choose from
+        return max(n, self.rerank_candidates) if self.reranker else n
 
-        # 3. Parse and Fuse Results
+    def _search(self, batcher, model: EmbeddingModel, db: VectorStore, query: str, n_results: int,
+                where: Optional[Dict[str, Any]] = None) -> Future:
+        if batcher:
+            # Concurrent callers share one encode call and one vector-store query
+            return batcher.submit(query, n_results, where)
+
+        if not self.dual_index:
+            future: Future = Future()
+            future.set_result(self._embed_and_search(model, db, [query], n_results, where))
+            return future
+        # (in the caller's context, so the spans count towards its request's timings)
+        return self.search_pool.submit(contextvars.copy_context().run,
+                                       self._embed_and_search, model, db, [query], n_results, where)
+
+    @staticmethod
+    def _embed_and_search(model: EmbeddingModel, db: VectorStore, queries: List[str], n_results: int,
+                          where: Optional[Dict[str, Any]] = None) -> Dict[str, List[List[Any]]]:
+        with span("retrieval.embed"):
+            embeddings = model.embed_text(queries)
+        with span("retrieval.search"):
+            return db.query_similar_batch(embeddings, n_results=n_results, where=where)
+
+    def _parse_results(self, raw_results: Dict[str, List[Any]], modality: Optional[str] = None) -> List[Dict]:
+        # 3. Parse Results
         # Chroma returns lists of lists (batch format), so we take the first index [0]
         ids = raw_results['ids'][0]
         documents = raw_results['documents'][0]
         metadatas = raw_results['metadatas'][0]
         distances = raw_results['distances'][0]
 
+        scale, offset = self.calibration[modality] if modality else (1.0, 0.0)
         retrieved_items = []
-        
+
         for i in range(len(ids)):
             item = {
                 "id": ids[i],
                 "content": documents[i], # Text content or Image description
                 "metadata": metadatas[i], # Contains 'image_path', 'page_number', etc.
-                "score": 1 - distances[i] # Convert distance to similarity score (approx)
+                "score": scale * (1 - distances[i]) + offset # Convert distance to similarity score (approx)
             }
             retrieved_items.append(item)
 
-        # 4. Re-Ranking / Filtering (The "Fusion" Logic)
-        # We sort by score descending to get the most relevant first
-        retrieved_items.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Return only the requested top_k
-        final_results = retrieved_items[:top_k]
-        
-        return self._categorize_results(final_results)
+        return retrieved_items
+
+    def _lexical_search(self, query: str, n_results: int,
+                        where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        # Pick up a rebuilt index after an ingest run without restarting the API
+        try:
+            mtime = os.stat(self.lexical_index_path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        if mtime != self.lexical_index_mtime:
+            if self.lexical_index is None:
+                # Nothing to serve from yet: the first queries wait for the load
+                with self.lexical_lock:
+                    if self.lexical_index is None and mtime != self.lexical_index_mtime:
+                        self._load_lexical_index(mtime)
+            elif self.lexical_reload_lock.acquire(blocking=False):
+                # Unpickling a large index takes seconds: queries keep using the old one
+                # while a background thread loads the new one and swaps it in
+                threading.Thread(target=self._reload_lexical_index, args=(mtime,),
+                                 name="bm25-reload", daemon=True).start()
+        index = self.lexical_index
+
+        # Without a loadable index, hybrid search falls back to the vector results
+        if index is None or len(index) == 0:
+            return []
+        return index.search(query, top_k=n_results, allowed_ids=self._allowed_ids(where))
+
+    def _load_lexical_index(self, mtime: int):
+        try:
+            index = BM25Index.load(self.lexical_index_path)
+        except Exception as e:
+            # Keep serving the last good index (if any); the file is tried again once it
+            # changes, not by every query
+            print(f"⚠️ Could not load BM25 index {self.lexical_index_path}: {e}")
+            self.lexical_index_mtime = mtime
+            return
+        # One reference assignment each: readers see the old index or the new one
+        self.lexical_index = index
+        self.lexical_index_mtime = mtime
+
+    def _reload_lexical_index(self, mtime: int):
+        # Runs with lexical_reload_lock held (taken by the query that noticed the change)
+        try:
+            self._load_lexical_index(mtime)
+        finally:
+            self.lexical_reload_lock.release()
+
+    def _allowed_ids(self, where: Optional[Dict[str, Any]]) -> Optional[frozenset]:
+        # BM25 has no metadata of its own; the stores' indexed metadata says what matches.
+        # Cached per corpus version: broad filters match a large share of the corpus
+        if not where:
+            return None
+
+        def matching():
+            allowed_ids = []
+            for db in (self.vector_db, self.text_db):
+                if db is not None:
+                    allowed_ids.extend(db.matching_ids(where))
+            return allowed_ids
+
+        return self.matching_ids_cache.get(where, corpus_version(self.vector_db.persist_dir), matching)
+
+    def _fuse(self, vector_items: List[Dict], lexical_hits: List[Tuple[str, float]]) -> List[Dict]:
+        """
+        Reciprocal rank fusion: score = sum of weight / (rrf_k + rank) over both rankings.
+        """
+        fused: Dict[str, Dict] = {}
+        scores: Dict[str, float] = {}
+
+        for rank, item in enumerate(vector_items, start=1):
+            fused[item['id']] = item
+            scores[item['id']] = (1 - self.lexical_weight) / (self.rrf_k + rank)
+
+        for rank, (chunk_id, _) in enumerate(lexical_hits, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + self.lexical_weight / (self.rrf_k + rank)
+
+        # Chunks only BM25 found still need their text and metadata
+        missing = [chunk_id for chunk_id, _ in lexical_hits if chunk_id not in fused]
+        for db in (self.text_db, self.vector_db):
+            if not missing or db is None:
+                continue
+            stored = db.get_by_ids(missing)
+            for chunk_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas']):
+                fused[chunk_id] = {"id": chunk_id, "content": document, "metadata": metadata}
+            missing = [chunk_id for chunk_id in missing if chunk_id not in fused]
+
+        results = []
+        for chunk_id, item in fused.items():
+            item['score'] = scores[chunk_id]
+            results.append(item)
+        results.sort(key=lambda x: x['score'], reverse=True)
+        return results
 
     def _categorize_results(self, results: List[Dict]) -> Dict[str, List[Any]]:
         """
@@ -62,7 +357,9 @@ class Retriever:
             "images": []
         }
 
-        for item in results:
+        for rank, item in enumerate(results, start=1):
+            # Final position across both lists (scores of re-ranked and other items don't compare)
+            item['rank'] = rank
             # Check metadata to see if it's an image or text
             # (We set this 'type' during ingestion)
             if item['metadata'].get('type') == 'image':
@@ -72,6 +369,10 @@ class Retriever:
 
         return categorized
 
+def _result_row(raw_results: Dict[str, List[Any]], i: int) -> Dict[str, List[Any]]:
+    # Row i of a multi-query result, in the single-query shape _parse_results expects
+    return {key: [raw_results[key][i]] for key in ("ids", "documents", "metadatas", "distances")}
+
 if __name__ == "__main__":
     # Test
     retriever = Retriever()
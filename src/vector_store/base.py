@@ -0,0 +1,104 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+VECTOR_STORES = ("chroma", "numpy")
+
+DEFAULT_COLLECTION = "multimodal_rag"
+# Dual-index mode: text/table chunks embedded with a text model live here,
+# while DEFAULT_COLLECTION only holds CLIP image vectors
+TEXT_COLLECTION = "multimodal_rag_text"
+
+class VectorStore(ABC):
+    """
+    What ingestion and retrieval need from a vector store. Results use Chroma's
+    batch layout ({"ids", "documents", "metadatas", "distances"} as lists of lists,
+    distance = 1 - cosine similarity), so every backend is interchangeable.
+    """
+    persist_dir: str
+
+    @abstractmethod
+    def upsert_data(self,
+                    ids: List[str],
+                    embeddings: Any,
+                    documents: List[str],
+                    metadatas: List[Dict[str, Any]]):
+        """
+        Insert or overwrite chunks by ID.
+        """
+
+    @abstractmethod
+    def delete_source(self, source: str):
+        """
+        Remove every chunk that was ingested from the given file path.
+        """
+
+    @abstractmethod
+    def get_by_ids(self, ids: List[str]) -> Dict[str, List[Any]]:
+        """
+        Fetch stored chunks ({"ids", "documents", "metadatas"}, no vectors) by ID.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """
+        Number of chunks in the store.
+        """
+
+    @abstractmethod
+    def query_similar_batch(self,
+                            query_embeddings: Any,
+                            n_results: int = 5,
+                            where: Optional[Dict[str, Any]] = None) -> Dict[str, List[List[Any]]]:
+        """
+        Search for several query vectors in one call. Row i of each result list
+        belongs to query_embeddings[i].
+        :param where: Metadata filter (see src/vector_store/filters.py), applied inside
+                      the search so every returned result matches it.
+        """
+
+    def query_similar(self,
+                      query_embedding: Any,
+                      n_results: int = 5,
+                      where: Optional[Dict[str, Any]] = None) -> Dict[str, List[List[Any]]]:
+        """
+        Search the store for the content most similar to one query vector.
+        """
+        return self.query_similar_batch([query_embedding], n_results=n_results, where=where)
+
+    @abstractmethod
+    def matching_ids(self, where: Dict[str, Any]) -> List[str]:
+        """
+        IDs of every chunk whose metadata matches the filter.
+        """
+
+    def persist(self):
+        """
+        Flushes anything the backend buffers in memory. Called once at the end of ingestion.
+        """
+
+    def compact_report(self, recall_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Memory footprint of compact vector storage, if the backend has any.
+        """
+        return {}
+
+def create_vector_store(backend: str = "chroma",
+                        collection_name: Optional[str] = None,
+                        persist_dir: Optional[str] = None,
+                        **options) -> VectorStore:
+    """
+    Opens the vector store a deployment is configured for.
+    :param backend: "chroma" (client/server-style database with an HNSW index) or "numpy"
+                    (in-process memory-mapped matrix, optionally indexed by FAISS).
+    :param options: Backend-specific settings, e.g. compact_precision for Chroma.
+    """
+    # Imported here so only the configured backend's dependencies are loaded
+    if backend == "chroma":
+        from src.vector_store.chroma_manager import ChromaManager
+        return ChromaManager(persist_dir=persist_dir or "chroma_db",
+                             collection_name=collection_name or DEFAULT_COLLECTION, **options)
+    if backend == "numpy":
+        from src.vector_store.numpy_store import NumpyVectorStore
+        return NumpyVectorStore(persist_dir=persist_dir or "numpy_db",
+                                collection_name=collection_name or DEFAULT_COLLECTION, **options)
+    raise ValueError(f"Unknown vector store {backend!r}; expected one of {VECTOR_STORES}")
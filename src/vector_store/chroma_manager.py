@@ -1,54 +1,232 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
+import os
+import threading
+from typing import List, Dict, Any, Optional
 import uuid
+import numpy as np
+from src.vector_store.base import VectorStore, DEFAULT_COLLECTION, TEXT_COLLECTION
+from src.vector_store.compact_index import CompactVectorIndex, INDEX_FILENAME
+from src.vector_store.filters import MatchingIdsCache
+from src.ingestion.manifest import corpus_version
 
-class ChromaManager:
-    def __init__(self, persist_dir: str = "chroma_db"):
+class ChromaManager(VectorStore):
+    def __init__(self,
+                 persist_dir: str = "chroma_db",
+                 collection_name: str = DEFAULT_COLLECTION,
+                 compact_precision: Optional[str] = None):
         """
         Initialize ChromaDB client.
         :param persist_dir: Where to save the database files on disk.
+        :param collection_name: Which collection this manager reads and writes.
+        :param compact_precision: "float16" or "int8" to answer similarity queries from an
+                                  in-process CompactVectorIndex instead of Chroma's float32
+                                  HNSW index. Chroma still stores documents and metadata.
         """
+        # Imported here so importing this module stays cheap
+        import chromadb
+
+        self.persist_dir = persist_dir
+        self.collection_name = collection_name
         self.client = chromadb.PersistentClient(path=persist_dir)
         
         # Create or get the collection. 
         # We use cosine similarity which is standard for embeddings.
         self.collection = self.client.get_or_create_collection(
-            name="multimodal_rag",
+            name=collection_name,
             metadata={"hnsw:space": "cosine"}
         )
 
+        self.compact_precision = compact_precision
+        self.compact_path = os.path.join(persist_dir, f"compact_{collection_name}")
+        self.compact_index: Optional[CompactVectorIndex] = None
+        self.compact_mtime = None
+        self.compact_checked_version = None
+        self.matching_ids_cache = MatchingIdsCache()
+        self.compact_lock = threading.Lock()
+
     def add_data(self, 
                  embeddings: List[List[float]], 
                  documents: List[str], 
-                 metadatas: List[Dict[str, Any]]):
+                 metadatas: List[Dict[str, Any]],
+                 ids: Optional[List[str]] = None):
         """
         Add data to the vector database.
         """
-        if not embeddings:
+        if len(embeddings) == 0:
             return
 
-        # Generate unique IDs for each chunk
-        ids = [str(uuid.uuid4()) for _ in range(len(embeddings))]
+        # Generate unique IDs for each chunk unless the caller has stable ones
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in range(len(embeddings))]
 
         self.collection.add(
-            embeddings=embeddings,
+            embeddings=_as_lists(embeddings),
             documents=documents, # The actual text content (or image description)
             metadatas=metadatas, # The rich metadata (page #, type, image_path)
             ids=ids
         )
         print(f"Added {len(ids)} items to ChromaDB.")
 
-    def query_similar(self, query_embedding: List[float], n_results: int = 5):
+    def upsert_data(self,
+                    ids: List[str],
+                    embeddings: List[List[float]],
+                    documents: List[str],
+                    metadatas: List[Dict[str, Any]]):
+        """
+        Insert or overwrite chunks by ID. Re-ingesting the same content is a no-op
+        in terms of collection size.
+        """
+        if len(embeddings) == 0:
+            return
+
+        self.collection.upsert(
+            ids=ids,
+            embeddings=_as_lists(embeddings),
+            documents=documents,
+            metadatas=metadatas
+        )
+        compact = self._compact(for_write=True)
+        if compact is not None:
+            compact.add(ids, np.asarray(embeddings, dtype=np.float32))
+        print(f"Upserted {len(ids)} items to ChromaDB.")
+
+    def delete_source(self, source: str):
+        """
+        Remove every chunk that was ingested from the given file path.
+        """
+        compact = self._compact(for_write=True)
+        if compact is not None:
+            compact.remove(self.collection.get(where={"source": source}, include=[])["ids"])
+        self.collection.delete(where={"source": source})
+
+    def get_by_ids(self, ids: List[str]):
+        """
+        Fetch stored chunks (documents + metadata, no vectors) by ID.
+        """
+        return self.collection.get(ids=ids, include=["documents", "metadatas"])
+
+    def count(self) -> int:
+        """
+        Number of chunks in the collection.
+        """
+        return self.collection.count()
+
+    def query_similar_batch(self,
+                            query_embeddings: List[List[float]],
+                            n_results: int = 5,
+                            where: Optional[Dict[str, Any]] = None):
         """
-        Search the database for the most similar content.
+        Search for several query vectors in one call. Row i of each result list
+        belongs to query_embeddings[i].
+        :param where: Metadata filter; Chroma applies it while searching its index.
         """
+        compact = self._compact()
+        if compact is not None:
+            return self._query_compact(compact, query_embeddings, n_results, where)
+
         results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
+            query_embeddings=_as_lists(query_embeddings),
+            n_results=n_results,
+            where=where
         )
         return results
 
+    def matching_ids(self, where: Dict[str, Any]) -> List[str]:
+        return self.collection.get(where=where, include=[])["ids"]
+
+    def persist(self):
+        """
+        Saves side indexes kept next to the collection (Chroma persists itself).
+        """
+        if self.compact_index is not None:
+            self.compact_index.save()
+            self.compact_mtime = os.stat(os.path.join(self.compact_path, "index.npz")).st_mtime_ns
+
+    def compact_report(self, recall_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Memory footprint of the compact index (empty if it's disabled).
+        :param recall_k: Also measure recall@k against exact float32 search.
+        """
+        compact = self._compact()
+        if compact is None:
+            return {}
+        report = compact.memory_report()
+        if recall_k:
+            report[f"recall_at_{recall_k}"] = compact.recall_at_k(k=recall_k)
+        return report
+
+    def _compact(self, for_write: bool = False) -> Optional[CompactVectorIndex]:
+        # Writers keep an existing compact index in step even when they don't search it
+        # (an ingest run without --vector-precision), so the API's copy never goes stale
+        index_file = os.path.join(self.compact_path, INDEX_FILENAME)
+        if self.compact_precision is None and not (for_write and os.path.exists(index_file)):
+            return None
+
+        with self.compact_lock:
+            # Pick up a rebuilt index after an ingest run without restarting the API
+            mtime = os.stat(index_file).st_mtime_ns if os.path.exists(index_file) else None
+            if self.compact_index is None or (mtime is not None and mtime != self.compact_mtime):
+                self.compact_index = CompactVectorIndex.load(self.compact_path,
+                                                             precision=self.compact_precision or "int8")
+                self.compact_mtime = mtime
+            # Whenever the corpus changes, make sure the index covers the whole collection
+            # (e.g. chunks written by an older ingest that didn't maintain it)
+            version = corpus_version(self.persist_dir)
+            if not for_write and (self.compact_checked_version is None or version != self.compact_checked_version):
+                self.compact_checked_version = version
+                if len(self.compact_index) != self.collection.count():
+                    self._sync_compact(self.compact_index)
+            return self.compact_index
+
+    def _sync_compact(self, compact: CompactVectorIndex, page_size: int = 10_000):
+        # Copies over vectors the index is missing and drops the ones Chroma no longer has
+        print(f"Syncing {compact.precision} compact index with {self.collection.name}...")
+        stored = []
+        offset = 0
+        while True:
+            page = self.collection.get(include=[], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            stored.extend(page["ids"])
+            offset += len(page["ids"])
+        stored_set = set(stored)
+        compact.remove([chunk_id for chunk_id in list(compact.rows) if chunk_id not in stored_set])
+        missing = [chunk_id for chunk_id in stored if chunk_id not in compact.rows]
+        for start in range(0, len(missing), page_size):
+            page = self.collection.get(ids=missing[start:start + page_size], include=["embeddings"])
+            compact.add(page["ids"], np.asarray(page["embeddings"], dtype=np.float32))
+        compact.save()
+        self.compact_mtime = os.stat(os.path.join(self.compact_path, INDEX_FILENAME)).st_mtime_ns
+
+    def _query_compact(self, compact: CompactVectorIndex, query_embeddings, n_results: int,
+                       where: Optional[Dict[str, Any]] = None):
+        # Filtered searches only score the chunks Chroma's metadata index says match
+        allowed_ids = self.matching_ids_cache.get(where, corpus_version(self.persist_dir),
+                                                  lambda: self.matching_ids(where)) if where else None
+        hits = compact.search(np.asarray(query_embeddings, dtype=np.float32), top_k=n_results,
+                              allowed_ids=allowed_ids)
+
+        # One metadata fetch for every hit of every query
+        unique_ids = list({chunk_id for row in hits for chunk_id, _ in row})
+        stored = self.collection.get(ids=unique_ids, include=["documents", "metadatas"]) if unique_ids else {
+            "ids": [], "documents": [], "metadatas": []
+        }
+        by_id = {chunk_id: (document, metadata)
+                 for chunk_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])}
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row in hits:
+            row = [(chunk_id, score) for chunk_id, score in row if chunk_id in by_id]
+            results["ids"].append([chunk_id for chunk_id, _ in row])
+            results["documents"].append([by_id[chunk_id][0] for chunk_id, _ in row])
+            results["metadatas"].append([by_id[chunk_id][1] for chunk_id, _ in row])
+            # Same convention as Chroma's cosine space: distance = 1 - similarity
+            results["distances"].append([1.0 - score for _, score in row])
+        return results
+
+def _as_lists(embeddings):
+    # Chroma's client takes plain lists; NumPy rows are converted only at this boundary
+    return [np.asarray(vector, dtype=np.float32).tolist() for vector in embeddings]
+
 if __name__ == "__main__":
     # Test
     db = ChromaManager()
@@ -0,0 +1,307 @@
+import os
+import threading
+from typing import List, Dict, Tuple, Optional, Any, Iterable
+import numpy as np
+
+PRECISIONS = ("float16", "int8")
+INDEX_FILENAME = "index.npz"
+
+# Rows scored per matrix product; bounds the float32 temporaries to ~130 MB at 512 dims
+_BLOCK_ROWS = 65_536
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+class CompactVectorIndex:
+    def __init__(self, path: str, precision: str = "int8", rescore_multiplier: int = 4):
+        """
+        In-process cosine-similarity index that keeps only compact codes in RAM:
+        float16 (2 bytes/dim) or int8 with one float32 scale per vector (~1 byte/dim).
+        A search scores every code blockwise, then re-scores the best
+        top_k * rescore_multiplier candidates against the exact float32 vectors,
+        which live in an append-only file on disk and are read through a memory map.
+        Removed vectors are masked out and physically dropped by compact().
+        :param path: Directory holding the index.
+        :param rescore_multiplier: Candidates re-scored per result; 1 disables rescoring.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+
+        self.path = path
+        self.precision = precision
+        self.rescore_multiplier = max(rescore_multiplier, 1)
+        self.dim: Optional[int] = None
+        self.size = 0                      # rows used, including removed ones
+        self.ids: List[Optional[str]] = []  # row -> chunk ID
+        self.rows: Dict[str, int] = {}      # chunk ID -> row
+        self.codes = np.zeros((0, 0), dtype=self._code_dtype)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=np.uint8)
+        self.generation = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._checked_tail = False
+        self.lock = threading.RLock()
+
+    @property
+    def _code_dtype(self):
+        return np.float16 if self.precision == "float16" else np.int8
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, f"vectors-{self.generation}.f32")
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        """
+        Indexes (or re-indexes) vectors. Re-adding an existing ID replaces it.
+        """
+        vectors = _unit_rows(vectors)
+        if len(ids) == 0:
+            return
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self.codes = np.zeros((0, self.dim), dtype=self._code_dtype)
+            self.remove([chunk_id for chunk_id in ids if chunk_id in self.rows])
+            self._reserve(self.size + len(ids))
+
+            start, end = self.size, self.size + len(ids)
+            if self.precision == "int8":
+                scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+                self.codes[start:end] = np.round(vectors / scales[:, None]).astype(np.int8)
+                self.scales[start:end] = scales
+            else:
+                self.codes[start:end] = vectors.astype(np.float16)
+            self.alive[start:end] = 1
+
+            # Full-precision copies only go to disk; they're read back for rescoring
+            os.makedirs(self.path, exist_ok=True)
+            if not self._checked_tail:
+                self._truncate_unsaved_tail()
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+
+            for row, chunk_id in enumerate(ids, start=start):
+                self.ids.append(chunk_id)
+                self.rows[chunk_id] = row
+            self.size = end
+            self._vectors = None
+
+    def remove(self, ids: List[str]):
+        with self.lock:
+            for chunk_id in ids:
+                row = self.rows.pop(chunk_id, None)
+                if row is not None:
+                    self.alive[row] = 0
+                    self.ids[row] = None
+
+            # Keep dead rows from dominating memory and search time
+            if self.size > 1000 and len(self.rows) < 0.8 * self.size:
+                self.compact()
+
+    def search(self,
+               queries: np.ndarray,
+               top_k: int = 10,
+               allowed_ids: Optional[Iterable[str]] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Returns, for each query vector, up to top_k (chunk_id, cosine similarity) pairs, best first.
+        :param allowed_ids: Only these chunks are scored (metadata pre-filtering).
+        """
+        queries = _unit_rows(queries)
+        with self.lock:
+            subset = None
+            if allowed_ids is not None:
+                subset = np.array(sorted(self.rows[chunk_id] for chunk_id in allowed_ids if chunk_id in self.rows),
+                                  dtype=np.int64)
+            live = len(self.rows) if subset is None else len(subset)
+            if live == 0:
+                return [[] for _ in queries]
+
+            depth = min(top_k * self.rescore_multiplier, live)
+            candidate_rows, candidate_scores = self._candidates(queries, depth, subset)
+            vectors = self._full_vectors() if self.rescore_multiplier > 1 else None
+
+            results = []
+            for query, rows, scores in zip(queries, candidate_rows, candidate_scores):
+                live = np.isfinite(scores)
+                rows, scores = rows[live], scores[live]
+                if vectors is not None and len(rows):
+                    # Sorted row order keeps the memory-mapped reads mostly sequential
+                    order = np.argsort(rows)
+                    rows = rows[order]
+                    scores = vectors[rows] @ query
+                best = np.argsort(-scores)[:top_k]
+                results.append([(self.ids[rows[i]], float(scores[i])) for i in best])
+            return results
+
+    def recall_at_k(self, queries: Optional[np.ndarray] = None, k: int = 10, sample_size: int = 200) -> float:
+        """
+        Share of the exact float32 top-k that the compact search also returns,
+        averaged over the query vectors (by default a sample of the stored vectors).
+        """
+        with self.lock:
+            if not self.rows:
+                return 1.0
+            vectors = self._full_vectors()
+            if queries is None:
+                live_rows = np.flatnonzero(self.alive[:self.size])
+                sample = np.random.default_rng(0).choice(live_rows, min(sample_size, len(live_rows)), replace=False)
+                queries = np.asarray(vectors[np.sort(sample)])
+            queries = _unit_rows(queries)
+            exact = []
+            for start in range(0, self.size, _BLOCK_ROWS):
+                scores = vectors[start:start + _BLOCK_ROWS] @ queries.T
+                scores[self.alive[start:start + _BLOCK_ROWS] == 0] = -np.inf
+                exact.append(scores)
+            exact_scores = np.concatenate(exact)
+
+            found = self.search(queries, top_k=k)
+            hits = 0
+            expected_total = 0
+            for i, results in enumerate(found):
+                expected = np.argsort(-exact_scores[:, i])[:min(k, len(self.rows))]
+                expected_ids = {self.ids[row] for row in expected}
+                hits += len(expected_ids & {chunk_id for chunk_id, _ in results})
+                expected_total += len(expected_ids)
+            return hits / max(expected_total, 1)
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        RAM held by the vector codes, and what that means per million vectors.
+        """
+        dim = self.dim or 0
+        bytes_per_vector = dim * np.dtype(self._code_dtype).itemsize + (4 if self.precision == "int8" else 0)
+        return {
+            "precision": self.precision,
+            "vectors": len(self.rows),
+            "dim": dim,
+            "bytes_per_vector": bytes_per_vector,
+            "ram_mb": bytes_per_vector * self.size / 2 ** 20,
+            "mb_per_million": bytes_per_vector * 1_000_000 / 2 ** 20,
+            "float32_mb_per_million": dim * 4 * 1_000_000 / 2 ** 20,
+        }
+
+    def compact(self):
+        """
+        Drops removed rows and rewrites the float32 file as a new generation.
+        """
+        with self.lock:
+            keep = np.flatnonzero(self.alive[:self.size])
+            vectors = np.asarray(self._full_vectors()[keep]) if self.size else np.zeros((0, self.dim or 0), np.float32)
+
+            self.generation += 1
+            os.makedirs(self.path, exist_ok=True)
+            with open(self.vectors_path, "wb") as f:
+                f.write(vectors.tobytes())
+
+            self.codes = self.codes[keep].copy()
+            self.scales = self.scales[keep].copy()
+            self.alive = np.ones(len(keep), dtype=np.uint8)
+            self.ids = [self.ids[row] for row in keep]
+            self.rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+            self.size = len(keep)
+            self._vectors = None
+
+    def save(self):
+        """
+        Writes the codes and ID table; the float32 file is already on disk.
+        Old generations are deleted once the new table points past them.
+        """
+        with self.lock:
+            os.makedirs(self.path, exist_ok=True)
+            index_path = os.path.join(self.path, INDEX_FILENAME)
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    codes=self.codes[:self.size],
+                    scales=self.scales[:self.size],
+                    alive=self.alive[:self.size],
+                    ids=np.array([chunk_id or "" for chunk_id in self.ids], dtype=str),
+                    meta=np.array([self.generation, self.dim or 0, self.size], dtype=np.int64),
+                    precision=np.array(self.precision),
+                )
+            os.replace(tmp_path, index_path)
+
+            for filename in os.listdir(self.path):
+                if filename.startswith("vectors-") and filename != os.path.basename(self.vectors_path):
+                    os.remove(os.path.join(self.path, filename))
+
+    @classmethod
+    def load(cls, path: str, precision: str = "int8", rescore_multiplier: int = 4) -> "CompactVectorIndex":
+        """
+        Loads a saved index, or returns an empty one if there is none yet.
+        A saved index keeps the precision it was built with.
+        """
+        index_path = os.path.join(path, INDEX_FILENAME)
+        if not os.path.exists(index_path):
+            return cls(path, precision=precision, rescore_multiplier=rescore_multiplier)
+
+        with np.load(index_path) as data:
+            index = cls(path, precision=str(data["precision"]), rescore_multiplier=rescore_multiplier)
+            index.generation, dim, index.size = (int(value) for value in data["meta"])
+            index.dim = dim or None
+            index.codes = data["codes"]
+            index.scales = data["scales"]
+            index.alive = data["alive"]
+            index.ids = [str(chunk_id) if flag else None for chunk_id, flag in zip(data["ids"], index.alive)]
+        index.rows = {chunk_id: row for row, chunk_id in enumerate(index.ids) if chunk_id is not None}
+        return index
+
+    def _candidates(self,
+                    queries: np.ndarray,
+                    depth: int,
+                    subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Approximate scores block by block, keeping each block's best `depth` rows per query
+        block_rows = []
+        block_scores = []
+        total = self.size if subset is None else len(subset)
+        for start in range(0, total, _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, total)
+            # Slices are views; a pre-filtered subset has to be gathered
+            rows = np.arange(start, end) if subset is None else subset[start:end]
+            selector = slice(start, end) if subset is None else rows
+            scores = self.codes[selector].astype(np.float32) @ queries.T
+            if self.precision == "int8":
+                scores *= self.scales[selector, None]
+            scores[self.alive[selector] == 0] = -np.inf
+
+            k = min(depth, end - start)
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+            block_rows.append(rows[top])
+            block_scores.append(np.take_along_axis(scores, top, axis=0))
+
+        rows = np.concatenate(block_rows)
+        scores = np.concatenate(block_scores)
+        k = min(depth, len(rows))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        return np.take_along_axis(rows, top, axis=0).T, np.take_along_axis(scores, top, axis=0).T
+
+    def _full_vectors(self) -> np.ndarray:
+        if self._vectors is None or len(self._vectors) != self.size:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.size, self.dim))
+        return self._vectors
+
+    def _reserve(self, rows: int):
+        capacity = len(self.codes)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        codes = np.zeros((capacity, self.dim), dtype=self._code_dtype)
+        codes[:self.size] = self.codes[:self.size]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:self.size] = self.scales[:self.size]
+        alive = np.zeros(capacity, dtype=np.uint8)
+        alive[:self.size] = self.alive[:self.size]
+        self.codes, self.scales, self.alive = codes, scales, alive
+
+    def _truncate_unsaved_tail(self):
+        # Rows appended by a run that never saved don't belong to any saved table
+        self._checked_tail = True
+        expected = self.size * (self.dim or 0) * 4
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) > expected:
+            os.truncate(self.vectors_path, expected)
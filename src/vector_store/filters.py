@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable
+from typing import List, Dict, Any, Optional, Tuple
+
+# Metadata fields stored on every chunk at ingestion that searches can be restricted by.
+# The NumPy store keeps each in its own indexed SQLite column; Chroma indexes all metadata.
+FILTER_FIELDS = {
+    "filename": "TEXT",
+    "source_dir": "TEXT",
+    "type": "TEXT",
+    "page_number": "INTEGER",
+    "ingested_at": "INTEGER",
+}
+
+_SQL_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Turns query filters into a Chroma-style `where` clause (None means no filtering).
+    Supported keys: filename, source_dir and type (a value or a list of values),
+    page_min / page_max, and ingested_after / ingested_before (datetimes or epoch seconds).
+    """
+    if not filters:
+        return None
+
+    clauses = []
+    for field in ("filename", "source_dir", "type"):
+        value = filters.get(field)
+        if value is None:
+            continue
+        values = [value] if isinstance(value, str) else list(value)
+        if not values:
+            raise ValueError(f"Filter {field!r} needs at least one value")
+        if field == "source_dir":
+            values = [os.path.normpath(v) for v in values]
+        clauses.append({field: values[0]} if len(values) == 1 else {field: {"$in": values}})
+
+    for key, field, operator in (("page_min", "page_number", "$gte"), ("page_max", "page_number", "$lte"),
+                                 ("ingested_after", "ingested_at", "$gte"),
+                                 ("ingested_before", "ingested_at", "$lte")):
+        value = filters.get(key)
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            value = value.timestamp()
+        clauses.append({field: {operator: int(value)}})
+
+    unknown = set(filters) - {"filename", "source_dir", "type", "page_min", "page_max",
+                              "ingested_after", "ingested_before"}
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+
+    if not clauses:
+        return None
+    # Chroma wants at least two operands for $and
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def where_to_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Translates a `where` clause into a parameterized SQL condition over the FILTER_FIELDS columns.
+    """
+    clauses = []
+    params: List[Any] = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_to_sql(operand) for operand in condition]
+            clauses.append("(" + f" {key[1:].upper()} ".join(sql for sql, _ in parts) + ")")
+            for _, part_params in parts:
+                params.extend(part_params)
+            continue
+
+        if key not in FILTER_FIELDS:
+            raise ValueError(f"Cannot filter on {key!r}; filterable fields are {', '.join(FILTER_FIELDS)}")
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, value in condition.items():
+            if operator in ("$in", "$nin"):
+                placeholders = ",".join("?" * len(value))
+                clauses.append(f"{key} {'IN' if operator == '$in' else 'NOT IN'} ({placeholders})")
+                params.extend(value)
+            else:
+                clauses.append(f"{key} {_SQL_OPERATORS[operator]} ?")
+                params.append(value)
+    return " AND ".join(clauses) or "1", params
+
+class MatchingIdsCache:
+    def __init__(self, max_entries: int = 64):
+        """
+        Remembers which chunk IDs match a `where` clause, per corpus version, so repeated
+        filtered queries don't re-read every matching row of the metadata index.
+        :param max_entries: Distinct filters kept (least recently used are dropped).
+        """
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, Any], frozenset]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, where: Dict[str, Any], version: Any, compute: Callable[[], List[str]]) -> frozenset:
+        key = (json.dumps(where, sort_keys=True, default=str), version)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        ids = frozenset(compute())
+        with self.lock:
+            self.entries[key] = ids
+            # Entries of older corpus versions are never asked for again; they age out
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return ids
@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
+from src.vector_store.base import VectorStore, DEFAULT_COLLECTION
+from src.vector_store.filters import FILTER_FIELDS, where_to_sql
+
+INDEX_MODES = ("auto", "flat", "hnsw")
+STATE_FILENAME = "index.json"
+
+# Rows scored per matrix product; bounds the temporaries when the matrix is paged in from disk
+_BLOCK_ROWS = 65_536
+
+class NumpyVectorStore(VectorStore):
+    def __init__(self,
+                 persist_dir: str = "numpy_db",
+                 collection_name: str = DEFAULT_COLLECTION,
+                 index: str = "auto",
+                 hnsw_min_vectors: int = 100_000,
+                 hnsw_m: int = 32,
+                 hnsw_ef_search: int = 128):
+        """
+        In-process vector store: unit-normalized float32 vectors in an append-only file
+        read through a memory map, with documents and metadata in a SQLite sidecar.
+        Small corpora are searched exactly (one BLAS matrix product per block); large
+        ones through a FAISS HNSW graph when faiss-cpu is installed.
+        :param index: "flat" (always exact), "hnsw" (needs faiss-cpu) or "auto"
+                      (HNSW once there are hnsw_min_vectors vectors, if FAISS is available).
+        :param hnsw_m: Graph degree; higher is more accurate and uses more memory.
+        :param hnsw_ef_search: Candidate list size per query; higher is more accurate and slower.
+        """
+        if index not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode {index!r}; expected one of {INDEX_MODES}")
+
+        self.persist_dir = persist_dir
+        self.collection_name = collection_name
+        self.path = os.path.join(persist_dir, collection_name)
+        self.index_mode = index
+        self.hnsw_min_vectors = hnsw_min_vectors
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_search = hnsw_ef_search
+        self.lock = threading.RLock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(self.path, "metadata.sqlite"), check_same_thread=False)
+        # WAL lets the API read while an ingest run writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL, source TEXT, document TEXT, metadata TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_source ON chunks(source)")
+
+        # Filterable metadata gets real, indexed columns so filtered queries don't scan JSON
+        columns = {name for _, name, *_ in self.conn.execute("PRAGMA table_info(chunks)")}
+        for field, sql_type in FILTER_FIELDS.items():
+            if field not in columns:
+                self.conn.execute(f"ALTER TABLE chunks ADD COLUMN {field} {sql_type}")
+                self.conn.execute(f"UPDATE chunks SET {field} = json_extract(metadata, '$.{field}')")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{field} ON chunks({field})")
+        self.conn.commit()
+
+        self.hnsw = None
+        self.hnsw_build_seconds: Optional[float] = None
+        self._load()
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, f"vectors-{self.generation}.f32")
+
+    @property
+    def hnsw_path(self) -> str:
+        return os.path.join(self.path, f"hnsw-{self.generation}.faiss")
+
+    def upsert_data(self,
+                    ids: List[str],
+                    embeddings: Any,
+                    documents: List[str],
+                    metadatas: List[Dict[str, Any]]):
+        """
+        Insert or overwrite chunks by ID. Vectors are appended; a replaced chunk's old row
+        is masked out until the next compaction.
+        """
+        if len(embeddings) == 0:
+            return
+        vectors = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            self._drop_rows(self._rows_of(ids))
+
+            # 1. Vectors first, so every row the sidecar points at exists on disk
+            start = self.rows
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            self._grow(start + len(ids))
+            self.ids[start:start + len(ids)] = ids
+            self.alive[start:start + len(ids)] = 1
+            self.rows = start + len(ids)
+            self.vectors = None
+
+            # 2. One transaction for the whole batch
+            fields = ", ".join(FILTER_FIELDS)
+            placeholders = ", ".join("?" * (5 + len(FILTER_FIELDS)))
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO chunks (id, row, source, document, metadata, {fields}) "
+                f"VALUES ({placeholders})",
+                [(chunk_id, start + i, metadata.get("source"), document, json.dumps(metadata),
+                  *(metadata.get(field) for field in FILTER_FIELDS))
+                 for i, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas))]
+            )
+            self.conn.commit()
+
+            if self.hnsw is not None:
+                self.hnsw.add(vectors)
+        print(f"Upserted {len(ids)} items to {self.collection_name}.")
+
+    def delete_source(self, source: str):
+        with self.lock:
+            rows = [row for (row,) in self.conn.execute("SELECT row FROM chunks WHERE source = ?", (source,))]
+            self.conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self.conn.commit()
+            self._drop_rows(rows)
+
+            # Keep dead rows from dominating the matrix (and the HNSW graph)
+            if self.rows > 1000 and self.live < 0.8 * self.rows:
+                self.compact()
+
+    def get_by_ids(self, ids: List[str]) -> Dict[str, List[Any]]:
+        found = {"ids": [], "documents": [], "metadatas": []}
+        if not ids:
+            return found
+        with self.lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                query = f"SELECT id, document, metadata FROM chunks WHERE id IN ({','.join('?' * len(chunk))})"
+                for chunk_id, document, metadata in self.conn.execute(query, chunk):
+                    found["ids"].append(chunk_id)
+                    found["documents"].append(document)
+                    found["metadatas"].append(json.loads(metadata))
+        return found
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def query_similar_batch(self,
+                            query_embeddings: Any,
+                            n_results: int = 5,
+                            where: Optional[Dict[str, Any]] = None) -> Dict[str, List[List[Any]]]:
+        """
+        Filtered queries only score the rows the sidecar's indexed columns select:
+        exactly when that's a small set, through the HNSW graph with an ID selector otherwise.
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        with self.lock:
+            self._reload_if_changed()
+            subset = self._matching_rows(where) if where else None
+            if self.live == 0 or (subset is not None and len(subset) == 0):
+                hits = [[] for _ in queries]
+            else:
+                self._ensure_hnsw()
+                if self.hnsw is not None and (subset is None or len(subset) > self.hnsw_min_vectors):
+                    hits = self._search_hnsw(queries, n_results, subset)
+                else:
+                    hits = self._search_flat(queries, n_results, subset)
+
+            # One sidecar lookup for every hit of every query
+            stored = self.get_by_ids(list({chunk_id for row in hits for chunk_id, _ in row}))
+
+        by_id = {chunk_id: (document, metadata)
+                 for chunk_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])}
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row in hits:
+            row = [(chunk_id, score) for chunk_id, score in row if chunk_id in by_id]
+            results["ids"].append([chunk_id for chunk_id, _ in row])
+            results["documents"].append([by_id[chunk_id][0] for chunk_id, _ in row])
+            results["metadatas"].append([by_id[chunk_id][1] for chunk_id, _ in row])
+            results["distances"].append([1.0 - score for _, score in row])
+        return results
+
+    def matching_ids(self, where: Dict[str, Any]) -> List[str]:
+        sql, params = where_to_sql(where)
+        with self.lock:
+            return [chunk_id for (chunk_id,) in self.conn.execute(f"SELECT id FROM chunks WHERE {sql}", params)]
+
+    def persist(self):
+        """
+        Publishes the current state to readers (the API reloads when index.json changes)
+        and saves the HNSW graph so it isn't rebuilt on the next start.
+        """
+        with self.lock:
+            if self.hnsw is not None:
+                import faiss
+                faiss.write_index(self.hnsw, self.hnsw_path)
+
+            state_path = os.path.join(self.path, STATE_FILENAME)
+            tmp_path = f"{state_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"dim": self.dim, "generation": self.generation, "rows": self.rows}, f)
+            os.replace(tmp_path, state_path)
+            self.state_mtime = os.stat(state_path).st_mtime_ns
+
+            # Earlier generations are unreachable now (open memory maps keep working)
+            current = {os.path.basename(self.vectors_path), os.path.basename(self.hnsw_path)}
+            for filename in os.listdir(self.path):
+                if filename.startswith(("vectors-", "hnsw-")) and filename not in current:
+                    os.remove(os.path.join(self.path, filename))
+
+    def compact(self):
+        """
+        Drops dead rows: rewrites the vectors as a new generation and renumbers the sidecar.
+        """
+        with self.lock:
+            keep = np.flatnonzero(self.alive[:self.rows])
+            vectors = np.asarray(self._matrix()[keep])
+
+            self.generation += 1
+            with open(self.vectors_path, "wb") as f:
+                f.write(vectors.tobytes())
+            ids = [self.ids[row] for row in keep]
+            self.conn.executemany("UPDATE chunks SET row = ? WHERE id = ?",
+                                  [(row, chunk_id) for row, chunk_id in enumerate(ids)])
+            self.conn.commit()
+
+            self.ids = np.array(ids, dtype=object)
+            self.alive = np.ones(len(ids), dtype=np.uint8)
+            self.rows = len(ids)
+            self.vectors = None
+            if self.hnsw is not None:
+                self.hnsw = None
+                self._ensure_hnsw()
+            # The sidecar already uses the new numbering, so publish it right away
+            self.persist()
+
+    def _load(self):
+        # Snapshot of the state last published by persist()
+        state_path = os.path.join(self.path, STATE_FILENAME)
+        state = {"dim": None, "generation": 0}
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            self.state_mtime = os.stat(state_path).st_mtime_ns
+        else:
+            self.state_mtime = None
+
+        self.dim = state["dim"]
+        self.generation = state["generation"]
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        self.rows = size // (self.dim * 4) if self.dim else 0
+
+        self.ids = np.full(self.rows, None, dtype=object)
+        self.alive = np.zeros(self.rows, dtype=np.uint8)
+        for chunk_id, row in self.conn.execute("SELECT id, row FROM chunks"):
+            if row < self.rows:
+                self.ids[row] = chunk_id
+                self.alive[row] = 1
+        self.vectors = None
+
+        self.hnsw = None
+        if self.index_mode != "flat" and os.path.exists(self.hnsw_path):
+            import faiss
+            hnsw = faiss.read_index(self.hnsw_path)
+            if hnsw.ntotal == self.rows:
+                hnsw.hnsw.efSearch = self.hnsw_ef_search
+                self.hnsw = hnsw
+
+    def _reload_if_changed(self):
+        # Pick up an ingest run's published state without restarting the API
+        state_path = os.path.join(self.path, STATE_FILENAME)
+        try:
+            mtime = os.stat(state_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.state_mtime:
+            self._load()
+
+    @property
+    def live(self) -> int:
+        return int(self.alive[:self.rows].sum())
+
+    def _matrix(self) -> np.ndarray:
+        if self.vectors is None or len(self.vectors) != self.rows:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim)) \
+                if self.rows else np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self.vectors
+
+    def _ensure_hnsw(self):
+        if self.hnsw is not None or self.index_mode == "flat":
+            return
+        if self.index_mode == "auto" and self.live < self.hnsw_min_vectors:
+            return
+        try:
+            import faiss
+        except ImportError:
+            if self.index_mode == "hnsw":
+                raise ImportError("index='hnsw' needs `pip install faiss-cpu`.")
+            return
+
+        # HNSW labels are insertion order, which is exactly the row number
+        start = time.perf_counter()
+        hnsw = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efSearch = self.hnsw_ef_search
+        matrix = self._matrix()
+        for block in range(0, self.rows, _BLOCK_ROWS):
+            hnsw.add(np.ascontiguousarray(matrix[block:block + _BLOCK_ROWS]))
+        self.hnsw = hnsw
+        self.hnsw_build_seconds = time.perf_counter() - start
+        print(f"Built HNSW graph over {self.rows} vectors in {self.hnsw_build_seconds:.1f}s")
+
+    def _matching_rows(self, where: Dict[str, Any]) -> np.ndarray:
+        sql, params = where_to_sql(where)
+        rows = [row for chunk_id, row in self.conn.execute(f"SELECT id, row FROM chunks WHERE {sql}", params)
+                # The sidecar can be ahead of this process's snapshot until the next reload
+                if row < self.rows and self.ids[row] == chunk_id]
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def _search_flat(self, queries: np.ndarray, n_results: int, subset: Optional[np.ndarray] = None):
+        matrix = self._matrix()
+        block_rows = []
+        block_scores = []
+        total = self.rows if subset is None else len(subset)
+        for start in range(0, total, _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, total)
+            # Slices of the memory map are views; a filtered subset has to be gathered
+            rows = np.arange(start, end) if subset is None else subset[start:end]
+            selector = slice(start, end) if subset is None else rows
+            scores = matrix[selector] @ queries.T
+            scores[self.alive[selector] == 0] = -np.inf
+            k = min(n_results, end - start)
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+            block_rows.append(rows[top])
+            block_scores.append(np.take_along_axis(scores, top, axis=0))
+
+        rows = np.concatenate(block_rows)
+        scores = np.concatenate(block_scores)
+        hits = []
+        for i in range(len(queries)):
+            order = np.argsort(-scores[:, i])[:n_results]
+            hits.append([(self.ids[rows[j, i]], float(scores[j, i])) for j in order if np.isfinite(scores[j, i])])
+        return hits
+
+    def _search_hnsw(self, queries: np.ndarray, n_results: int, subset: Optional[np.ndarray] = None):
+        import faiss
+
+        # Over-fetch a little: dead rows stay in the graph until the next compaction
+        depth = min(n_results + max(n_results, int(n_results * (self.rows - self.live) / max(self.live, 1))),
+                    self.rows)
+        params = None
+        if subset is not None:
+            # The graph walk itself skips rows outside the filter
+            params = faiss.SearchParametersHNSW(sel=faiss.IDSelectorBatch(subset), efSearch=self.hnsw_ef_search)
+        scores, rows = self.hnsw.search(queries, depth, params=params)
+        hits = []
+        for row_scores, row_ids in zip(scores, rows):
+            found = [(self.ids[row], float(score)) for score, row in zip(row_scores, row_ids)
+                     if row >= 0 and self.alive[row]]
+            hits.append(found[:n_results])
+        return hits
+
+    def _rows_of(self, ids: List[str]) -> List[int]:
+        rows = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            query = f"SELECT row FROM chunks WHERE id IN ({','.join('?' * len(chunk))})"
+            rows.extend(row for (row,) in self.conn.execute(query, chunk))
+        return rows
+
+    def _drop_rows(self, rows: List[int]):
+        for row in rows:
+            if row < self.rows:
+                self.alive[row] = 0
+                self.ids[row] = None
+
+    def _grow(self, rows: int):
+        capacity = len(self.alive)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        ids = np.full(capacity, None, dtype=object)
+        ids[:self.rows] = self.ids[:self.rows]
+        alive = np.zeros(capacity, dtype=np.uint8)
+        alive[:self.rows] = self.alive[:self.rows]
+        self.ids, self.alive = ids, alive
@@ -0,0 +1,58 @@
+import argparse
+import tempfile
+import time
+import numpy as np
+from src.vector_store.compact_index import CompactVectorIndex, PRECISIONS
+
+# Not collected by pytest (no test_ prefix): python -m tests.benchmark_compact_vectors
+
+def _clustered_vectors(n: int, dim: int, rng) -> np.ndarray:
+    # Embeddings cluster by topic; uniform random vectors would make quantization look better than it is
+    centers = rng.normal(size=(256, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def main(num_vectors: int, dim: int, num_queries: int, k: int):
+    rng = np.random.default_rng(0)
+    vectors = _clustered_vectors(num_vectors, dim, rng)
+    queries = _clustered_vectors(num_queries, dim, rng)
+    ids = [str(i) for i in range(num_vectors)]
+
+    # 1. Exact float32 baseline
+    start = time.perf_counter()
+    exact = np.argsort(-(vectors @ queries.T), axis=0)[:k].T
+    fp32_ms = (time.perf_counter() - start) * 1000 / num_queries
+    print(f"📏 {num_vectors} x {dim} vectors, {num_queries} queries, recall@{k} vs exact float32")
+    print(f"{'index':<22} {'MB/1M':>7} {'build s':>8} {'ms/query':>9} {'recall':>7}")
+    print(f"{'float32 (exact)':<22} {dim * 4 * 1e6 / 2 ** 20:>7.0f} {'-':>8} {fp32_ms:>9.2f} {1.0:>7.3f}")
+
+    # 2. Compact codes, with and without the float32 rescoring pass
+    for precision in PRECISIONS:
+        for rescore_multiplier in (1, 4):
+            with tempfile.TemporaryDirectory() as path:
+                index = CompactVectorIndex(path, precision=precision, rescore_multiplier=rescore_multiplier)
+                start = time.perf_counter()
+                index.add(ids, vectors)
+                build_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                found = index.search(queries, top_k=k)
+                query_ms = (time.perf_counter() - start) * 1000 / num_queries
+
+                recall = np.mean([
+                    len({int(chunk_id) for chunk_id, _ in hits} & set(expected.tolist())) / k
+                    for hits, expected in zip(found, exact)
+                ])
+                label = f"{precision} " + ("+ rescore" if rescore_multiplier > 1 else "only")
+                report = index.memory_report()
+                print(f"{label:<22} {report['mb_per_million']:>7.0f} {build_seconds:>8.2f} "
+                      f"{query_ms:>9.2f} {recall:>7.3f}")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Memory and recall of compact vector storage.")
+    arg_parser.add_argument("--vectors", type=int, default=200_000)
+    arg_parser.add_argument("--dim", type=int, default=512)
+    arg_parser.add_argument("--queries", type=int, default=100)
+    arg_parser.add_argument("--k", type=int, default=10)
+    args = arg_parser.parse_args()
+    main(args.vectors, args.dim, args.queries, args.k)
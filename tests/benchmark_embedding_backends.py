@@ -0,0 +1,78 @@
+import argparse
+import multiprocessing
+import resource
+import time
+import numpy as np
+from PIL import Image
+
+# Not collected by pytest (no test_ prefix): python -m tests.benchmark_embedding_backends
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _run_backend(backend: str, num_threads: int, rounds: int, results):
+    from src.embeddings.model_loader import EmbeddingModel
+
+    baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    model = EmbeddingModel(cache_path=None, backend=backend, num_threads=num_threads)
+    load_seconds = time.perf_counter() - start
+    model.warm_up()
+
+    queries = [f"what does report {i} say about supply chain growth?" for i in range(rounds)]
+    images = [Image.new("RGB", (640, 480), color=(i * 7 % 255, 120, 60)) for i in range(32)]
+
+    # 1. Single-query latency (the API's hot path)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.model.encode([query], batch_size=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # 2. Batch throughput (the ingestion path)
+    start = time.perf_counter()
+    model.model.encode(queries, batch_size=32)
+    text_per_sec = len(queries) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    model.model.encode(images, batch_size=32)
+    images_per_sec = len(images) / (time.perf_counter() - start)
+
+    results[backend] = {
+        "load_seconds": load_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+        "text_per_sec": text_per_sec,
+        "images_per_sec": images_per_sec,
+        "peak_rss_mb": _peak_rss_mb(),
+        "model_rss_mb": _peak_rss_mb() - baseline_rss,
+    }
+
+def main(backends, num_threads: int, rounds: int):
+    manager = multiprocessing.Manager()
+    results = manager.dict()
+
+    # One process per backend, so peak RSS isn't polluted by the previous one
+    for backend in backends:
+        print(f"⏱️ Benchmarking {backend}...")
+        process = multiprocessing.Process(target=_run_backend, args=(backend, num_threads, rounds, results))
+        process.start()
+        process.join()
+        if backend not in results:
+            print(f"⚠️ {backend} failed (exit code {process.exitcode})")
+
+    print(f"\n📊 EMBEDDING BACKENDS ({num_threads} threads)")
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'text/s':>8} {'img/s':>7} {'RSS MB':>8}")
+    for backend in backends:
+        r = results.get(backend)
+        if r:
+            print(f"{backend:<10} {r['load_seconds']:>7.1f} {r['query_p50_ms']:>8.1f} {r['query_p95_ms']:>8.1f} "
+                  f"{r['text_per_sec']:>8.1f} {r['images_per_sec']:>7.1f} {r['peak_rss_mb']:>8.0f}")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare CLIP inference backends on CPU.")
+    arg_parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    arg_parser.add_argument("--threads", type=int, default=4)
+    arg_parser.add_argument("--rounds", type=int, default=200)
+    args = arg_parser.parse_args()
+    main(args.backends, args.threads, args.rounds)
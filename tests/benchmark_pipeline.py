@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+import numpy as np
+from create_test_data import create_corpus
+from src.embeddings.onnx_backend import BACKENDS
+from src.vector_store.base import VECTOR_STORES
+
+# Not collected by pytest (no test_ prefix). End-to-end benchmark with regression check:
+#   python -m tests.benchmark_pipeline --docs 2000 --images 400 --output bench.json
+#   python -m tests.benchmark_pipeline --docs 2000 --images 400 --baseline bench.json  # exits 1 on regression
+
+# Metrics compared against a baseline: path in the results JSON -> (better direction, kind).
+# Speed and memory are noisy and get --tolerance; quality is deterministic and gets --quality-tolerance
+REGRESSION_METRICS = {
+    "ingest.docs_per_sec": ("higher", "speed"),
+    "retrieval.p50_ms": ("lower", "speed"),
+    "retrieval.p95_ms": ("lower", "speed"),
+    "concurrency.qps": ("higher", "speed"),
+    "concurrency.p95_ms": ("lower", "speed"),
+    "quality.recall_at_k": ("higher", "quality"),
+    "quality.mrr": ("higher", "quality"),
+    "memory.peak_rss_mb": ("lower", "speed"),
+}
+
+class StubGenerator:
+    """
+    Stands in for LLaVA so the benchmark measures our pipeline rather than Ollama.
+    """
+    def warm_up(self):
+        pass
+
+    def generate_answer(self, query: str, context: Dict[str, List[Any]]) -> str:
+        return f"Stub answer from {len(context['text_chunks'])} text chunks and {len(context['images'])} images."
+
+    async def stream_answer(self, query: str, context: Dict[str, List[Any]]):
+        yield self.generate_answer(query, context)
+
+def _percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    return {f"p{p}_ms": float(np.percentile(latencies_ms, p)) for p in (50, 95, 99)}
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is KiB on Linux and bytes on macOS; "children" is the largest parse worker
+    scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "peak_worker_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+def _ranked_files(context: Dict[str, List[Any]]) -> List[str]:
+    # The context splits text from images; merge them back in rank order, one entry per file
+    items = sorted(context['text_chunks'] + context['images'], key=lambda item: item['rank'])
+    ranked = []
+    for item in items:
+        filename = item['metadata'].get('filename')
+        if filename not in ranked:
+            ranked.append(filename)
+    return ranked
+
+def _lookup(results: Dict[str, Any], path: str) -> Optional[float]:
+    for key in path.split("."):
+        if not isinstance(results, dict) or key not in results:
+            return None
+        results = results[key]
+    return results
+
+def find_regressions(results: Dict[str, Any],
+                     baseline: Dict[str, Any],
+                     tolerance: float = 0.15,
+                     quality_tolerance: float = 0.01) -> List[str]:
+    """
+    Compares a run against a baseline run and returns one message per metric that got
+    worse by more than the allowed relative change.
+    """
+    regressions = []
+    print(f"{'metric':<24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for path, (better, kind) in REGRESSION_METRICS.items():
+        current, previous = _lookup(results, path), _lookup(baseline, path)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / abs(previous)
+        allowed = quality_tolerance if kind == "quality" else tolerance
+        worse = change < -allowed if better == "higher" else change > allowed
+        print(f"{path:<24} {previous:>10.3f} {current:>10.3f} {change * 100:>7.1f}% {'❌' if worse else ''}")
+        if worse:
+            regressions.append(f"{path}: {previous:.3f} -> {current:.3f} ({change * 100:+.1f}%, "
+                               f"allowed {allowed * 100:.0f}%)")
+    return regressions
+
+def run_ingest(corpus_dir: str, persist_dir: str, args) -> Dict[str, Any]:
+    from src.ingest import main as ingest
+
+    # Cold embedding cache and a full run, so every file is parsed and embedded
+    return ingest(data_dir=corpus_dir, batch_size=args.batch_size, num_workers=args.workers,
+                  incremental=False, backend=args.backend, vector_store=args.vector_store,
+                  persist_dir=persist_dir, embedding_cache_path=None)
+
+def run_retrieval(retriever, ground_truth: List[Dict[str, str]], top_k: int) -> Dict[str, Any]:
+    latencies = []
+    ranks = []
+    for item in ground_truth:
+        start = time.perf_counter()
+        context = retriever.retrieve(item["query"], top_k=top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranked = _ranked_files(context)
+        ranks.append(ranked.index(item["expected_doc"]) + 1 if item["expected_doc"] in ranked else None)
+
+    hits = [rank for rank in ranks if rank is not None]
+    quality = {
+        "k": top_k,
+        "recall_at_k": len(hits) / len(ranks),
+        "mrr": sum(1 / rank for rank in hits) / len(ranks),
+    }
+    return {"retrieval": {"queries": len(latencies), **_percentiles(latencies)}, "quality": quality}
+
+def run_concurrency(retriever, queries: List[str], num_requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Drives the real /query endpoint (stage limiters, micro-batching, answer cache)
+    from many threads, with the stub generator behind it.
+    """
+    os.environ["RAG_WARMUP"] = "0"  # components are swapped in below, nothing to warm
+    from fastapi.testclient import TestClient
+    from src.api import main as api
+
+    api.retriever_component.factory = lambda: retriever
+    api.generator_component.factory = StubGenerator
+
+    def one_request(i: int):
+        start = time.perf_counter()
+        response = client.post("/query", json={"query": queries[i % len(queries)]})
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    with TestClient(api.app) as client:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one_request, range(num_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = [ms for ms, status in outcomes if status == 200]
+    return {
+        "threads": concurrency,
+        "requests": num_requests,
+        "errors": num_requests - len(latencies),
+        "qps": len(latencies) / elapsed,
+        **(_percentiles(latencies) if latencies else {}),
+    }
+
+def main(args) -> int:
+    from src.retrieval.retriever import Retriever
+
+    # 1. Corpus: generated once per configuration and reused across runs
+    corpus_dir = os.path.join(args.corpus_root, f"{args.docs}x{args.images}-p{args.pages}-s{args.seed}")
+    truth_path = os.path.join(corpus_dir, "ground_truth.json")
+    if os.path.exists(truth_path):
+        with open(truth_path) as f:
+            ground_truth = json.load(f)
+        print(f"📂 Reusing corpus {corpus_dir}")
+    else:
+        ground_truth = create_corpus(corpus_dir, num_docs=args.docs, num_images=args.images,
+                                     pages=args.pages, seed=args.seed)
+    queries = random.Random(args.seed).sample(ground_truth, min(args.queries, len(ground_truth)))
+
+    results: Dict[str, Any] = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "cpus": os.cpu_count()},
+    }
+
+    with tempfile.TemporaryDirectory() as persist_dir:
+        # 2. Ingestion, with per-stage timings
+        results["ingest"] = run_ingest(corpus_dir, persist_dir, args)
+
+        # 3. Retrieval one query at a time: latency and quality against the ground truth
+        retriever = Retriever(vector_store=args.vector_store, embedding_backend=args.backend,
+                              persist_dir=persist_dir, embedding_cache_path=None, rerank=args.rerank)
+        retriever.warm_up()
+        results.update(run_retrieval(retriever, queries, args.k))
+
+        # 4. Throughput of the API under concurrent load
+        results["concurrency"] = run_concurrency(retriever, [item["query"] for item in queries],
+                                                 args.requests, args.concurrency)
+    results["memory"] = _peak_rss_mb()
+
+    ingest, retrieval, concurrency, quality = (results[key] for key in ("ingest", "retrieval", "concurrency", "quality"))
+    stages = ingest["stage_seconds"]
+    print(f"\n📊 Ingest: {ingest['docs']} docs at {ingest['docs_per_sec']:.2f} docs/sec "
+          f"(parse {stages['parse']:.1f}s, OCR {stages['ocr']:.1f}s, "
+          f"embed {stages['embed']:.1f}s, store {stages['store']:.1f}s)")
+    print(f"🔎 Retrieval: p50 {retrieval['p50_ms']:.1f} ms, p95 {retrieval['p95_ms']:.1f} ms, "
+          f"p99 {retrieval['p99_ms']:.1f} ms; recall@{quality['k']} {quality['recall_at_k']:.3f}, "
+          f"MRR {quality['mrr']:.3f}")
+    print(f"🚦 /query x{concurrency['threads']} threads: {concurrency['qps']:.1f} QPS, "
+          f"{concurrency['errors']} errors")
+    print(f"🧠 Peak RSS {results['memory']['peak_rss_mb']:.0f} MB "
+          f"(largest parse worker {results['memory']['peak_worker_rss_mb']:.0f} MB)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    # 5. Regression gate for CI
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance, args.quality_tolerance)
+        if regressions:
+            print("\n❌ Regressions against the baseline:\n" + "\n".join(f"  - {r}" for r in regressions))
+            return 1
+        print("\n✅ No regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="End-to-end ingestion and retrieval benchmark.")
+    arg_parser.add_argument("--docs", type=int, default=1000)
+    arg_parser.add_argument("--images", type=int, default=200)
+    arg_parser.add_argument("--pages", type=int, default=2)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--corpus-root", default="benchmark_corpus")
+    arg_parser.add_argument("--workers", type=int, default=None)
+    arg_parser.add_argument("--batch-size", type=int, default=64)
+    arg_parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    arg_parser.add_argument("--vector-store", choices=VECTOR_STORES, default="chroma")
+    arg_parser.add_argument("--queries", type=int, default=200, help="Ground-truth queries to score")
+    arg_parser.add_argument("--k", type=int, default=5)
+    arg_parser.add_argument("--rerank", action="store_true", help="Enable the cross-encoder re-ranker")
+    arg_parser.add_argument("--requests", type=int, default=500, help="Requests in the concurrency run")
+    arg_parser.add_argument("--concurrency", type=int, default=16)
+    arg_parser.add_argument("--output", default=None, help="Write results as JSON")
+    arg_parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run to compare against")
+    arg_parser.add_argument("--tolerance", type=float, default=0.15,
+                            help="Allowed relative slowdown for speed and memory metrics")
+    arg_parser.add_argument("--quality-tolerance", type=float, default=0.01,
+                            help="Allowed relative drop in recall and MRR")
+    sys.exit(main(arg_parser.parse_args()))
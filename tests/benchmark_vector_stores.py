@@ -0,0 +1,75 @@
+import argparse
+import tempfile
+import time
+import numpy as np
+from src.vector_store.base import create_vector_store
+
+# Not collected by pytest (no test_ prefix): python -m tests.benchmark_vector_stores
+
+CONFIGS = {
+    "chroma": ("chroma", {}),
+    "numpy-flat": ("numpy", {"index": "flat"}),
+    "numpy-hnsw": ("numpy", {"index": "hnsw"}),
+}
+
+def _clustered_vectors(n: int, dim: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(256, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def main(configs, num_vectors: int, dim: int, num_queries: int, k: int, batch_size: int):
+    rng = np.random.default_rng(0)
+    vectors = _clustered_vectors(num_vectors, dim, rng)
+    queries = _clustered_vectors(num_queries, dim, rng)
+    exact = np.argsort(-(vectors @ queries.T), axis=0)[:k].T
+    ids = [str(i) for i in range(num_vectors)]
+
+    print(f"📏 {num_vectors} x {dim} vectors, {num_queries} queries, top {k}")
+    print(f"{'store':<12} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch ms/q':>11} {'recall':>7}")
+    for name in configs:
+        backend, options = CONFIGS[name]
+        with tempfile.TemporaryDirectory() as persist_dir:
+            try:
+                store = create_vector_store(backend, persist_dir=persist_dir, **options)
+
+                # 1. Build: the same batched upserts ingestion does, plus whatever indexing follows
+                start = time.perf_counter()
+                for i in range(0, num_vectors, batch_size):
+                    store.upsert_data(ids[i:i + batch_size], vectors[i:i + batch_size],
+                                      [""] * len(ids[i:i + batch_size]),
+                                      [{"source": "bench"} for _ in ids[i:i + batch_size]])
+                store.persist()
+                store.query_similar(queries[0], n_results=k)  # FAISS graphs are built on first query
+                build_seconds = time.perf_counter() - start
+            except ImportError as e:
+                print(f"{name:<12} skipped ({e})")
+                continue
+
+            # 2. One query at a time (the API path without micro-batching)
+            latencies = []
+            found = []
+            for query in queries:
+                start = time.perf_counter()
+                found.append(store.query_similar(query, n_results=k)["ids"][0])
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            # 3. All queries in one call (the micro-batched path)
+            start = time.perf_counter()
+            store.query_similar_batch(queries, n_results=k)
+            batch_ms = (time.perf_counter() - start) * 1000 / num_queries
+
+            recall = np.mean([len({int(i) for i in hits} & set(expected.tolist())) / k
+                              for hits, expected in zip(found, exact)])
+            print(f"{name:<12} {build_seconds:>8.1f} {np.percentile(latencies, 50):>8.2f} "
+                  f"{np.percentile(latencies, 95):>8.2f} {batch_ms:>11.2f} {recall:>7.3f}")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare vector store backends behind the same API.")
+    arg_parser.add_argument("--stores", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    arg_parser.add_argument("--vectors", type=int, default=50_000)
+    arg_parser.add_argument("--dim", type=int, default=512)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--k", type=int, default=10)
+    arg_parser.add_argument("--batch-size", type=int, default=1000)
+    args = arg_parser.parse_args()
+    main(args.stores, args.vectors, args.dim, args.queries, args.k, args.batch_size)
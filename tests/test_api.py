@@ -1,3 +1,5 @@
+import os
+import json
 from fastapi.testclient import TestClient
 from src.api.main import app
 
@@ -29,4 +31,173 @@ def test_query_endpoint_structure():
     if response.status_code == 200:
         data = response.json()
         assert "answer" in data
-        assert "sources" in data
\ No newline at end of file
+        assert "sources" in data
+
+def test_query_stream_endpoint_structure():
+    """
+    Verifies /query/stream speaks Server-Sent Events and sends the sources first.
+    """
+    payload = {"query": "This is a test query"}
+
+    response = client.post("/query/stream", json=payload)
+
+    assert response.status_code in [200, 500]
+
+    if response.status_code == 200:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.startswith("event: sources")
+
+
+def test_readiness_reports_components():
+    """
+    Verifies /ready reports each component, separately from /health.
+    """
+    response = client.get("/ready")
+
+    assert response.status_code in [200, 503]
+    data = response.json()
+    assert set(data["components"]) == {"retriever", "generator"}
+    assert data["ready"] == (response.status_code == 200)
+
+def test_batch_query_streams_ndjson():
+    """
+    Verifies /query/batch returns one NDJSON line per query plus a closing summary line,
+    whether or not retrieval works in this environment.
+    """
+    payload = {"queries": ["first question", "second question"], "retrieval_only": True}
+
+    response = client.post("/query/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1]
+    assert all("sources" in line or "error" in line for line in lines[:-1])
+    assert lines[-1]["done"] and lines[-1]["queries"] == 2
+
+def test_batch_query_caps_top_k():
+    """
+    Verifies /query/batch rejects top_k values /query would never use (422).
+    """
+    from src.api.main import QUERY_TOP_K
+
+    for top_k in (0, QUERY_TOP_K + 1, 10_000):
+        response = client.post("/query/batch", json={"queries": ["q"], "top_k": top_k, "retrieval_only": True})
+        assert response.status_code == 422
+
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    """
+    Verifies /metrics serves stage histograms and pipeline gauges in Prometheus format.
+    """
+    client.get("/health")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'rag_request_seconds_count{route="/health",status="200"}' in response.text
+    assert 'rag_stage_waiting{stage="generation"} 0' in response.text
+    assert "# TYPE rag_component_ready gauge" in response.text
+
+def test_uploaded_file_becomes_searchable(tmp_path):
+    """
+    Verifies POST /ingest queues an upload, the background service indexes it, and the
+    job reports done once its chunks are in the vector store.
+    """
+    import time
+    import numpy as np
+    from src.api.main import ingestion_component
+    from src.ingest import IndexWriter
+    from src.ingestion.service import IngestionService
+    from src.vector_store.base import create_vector_store
+
+    class _Embedder:
+        model_name = "fake"
+
+        def embed_text(self, texts):
+            return np.array([[1.0, 0.0] for _ in texts])
+
+        def embed_images(self, image_paths):
+            return np.array([[0.0, 1.0] for _ in image_paths])
+
+    class _Parser:
+        # Stands in for the worker pool (unstructured/tesseract aren't needed here)
+        def parse_files(self, filepaths):
+            for path in filepaths:
+                chunk = {"type": "text", "content": "quarterly revenue grew",
+                         "metadata": {"source": path, "filename": os.path.basename(path), "page_number": 1}}
+                yield {"filepath": path, "chunks": [chunk], "error": None, "seconds": 0.0}
+
+        def close(self):
+            pass
+
+    store = create_vector_store("numpy", persist_dir=str(tmp_path / "db"), index="flat")
+
+    def build():
+        service = IngestionService(IndexWriter(store, _Embedder()), upload_dir=str(tmp_path / "uploads"),
+                                   queue_path=str(tmp_path / "jobs.sqlite"))
+        service.parser = _Parser()
+        service.start()
+        return service
+
+    original_factory = ingestion_component.factory
+    ingestion_component.factory = build
+    try:
+        response = client.post("/ingest", files={"file": ("../report.pdf", b"%PDF-1.4", "application/pdf")})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] in ("queued", "running") and job["origin"] == "upload"
+        assert os.path.exists(tmp_path / "uploads" / "report.pdf")  # no path traversal
+
+        deadline = time.monotonic() + 10
+        while job["status"] not in ("done", "failed") and time.monotonic() < deadline:
+            time.sleep(0.05)
+            job = client.get(f"/ingest/jobs/{job['id']}").json()
+        assert job["status"] == "done" and job["chunks"] == 1
+
+        hits = store.query_similar([1.0, 0.0], n_results=1)
+        assert hits["metadatas"][0][0]["source"] == job["path"]
+        assert client.get("/ingest/jobs").json()["counts"]["done"] == 1
+        assert client.get("/ingest/jobs/unknown").status_code == 404
+        assert client.post("/ingest", files={"file": ("notes.txt", b"hi", "text/plain")}).status_code == 415
+    finally:
+        if ingestion_component.instance is not None:
+            ingestion_component.instance.stop()
+        ingestion_component.instance = None
+        ingestion_component.status = "cold"
+        ingestion_component.factory = original_factory
+
+def test_failed_warm_up_is_retried_and_warm_up_can_be_disabled(monkeypatch):
+    """
+    Verifies a failed warm-up leaves the component usable and retryable instead of
+    pinned as failed, and that with RAG_WARMUP=0 a built component counts as ready.
+    """
+    import src.api.main as api
+    from src.api.components import LazyComponent
+
+    attempts = []
+
+    def flaky_warm_up(instance):
+        attempts.append(instance)
+        if len(attempts) == 1:
+            raise ConnectionError("ollama not up yet")
+
+    component = LazyComponent("flaky", lambda: "model", warm_up=flaky_warm_up)
+    assert component.warm_up() is False
+    assert component.status == "loaded" and "ollama" in component.error
+    assert component.warm_up() is True
+    assert component.is_warm and component.error is None
+
+    cold = LazyComponent("cold", lambda: "model", warm_up=flaky_warm_up)
+    cold.get()
+    monkeypatch.setattr(api, "WARM_UP", True)
+    assert not api._is_ready(cold)
+    monkeypatch.setattr(api, "WARM_UP", False)
+    assert api._is_ready(cold)
+
+def test_empty_filter_list_is_a_validation_error():
+    """
+    Verifies an empty filter list is rejected with 422 instead of failing inside retrieval.
+    """
+    response = client.post("/query", json={"query": "q", "filters": {"type": []}})
+    assert response.status_code == 422
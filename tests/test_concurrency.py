@@ -0,0 +1,35 @@
+import time
+import asyncio
+from src.api.concurrency import StageLimiter, StageSaturated
+
+def test_stage_limiter_rejects_when_queue_is_full():
+    """
+    Checks that callers beyond concurrency + queue get StageSaturated instead of waiting.
+    """
+    stage = StageLimiter("generation", max_concurrency=1, max_queue=1)
+
+    async def scenario():
+        calls = [asyncio.create_task(stage.run(time.sleep, 0.2)) for _ in range(3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert sum(isinstance(r, StageSaturated) for r in results) == 1
+    assert stage.stats()["rejected"] == 1
+    stage.shutdown()
+
+def test_stage_limiter_keeps_event_loop_responsive():
+    """
+    Checks that blocking work runs off the loop, so other coroutines keep running.
+    """
+    stage = StageLimiter("retrieval", max_concurrency=2, max_queue=4)
+
+    async def scenario():
+        ticks = 0
+        blocking = asyncio.create_task(stage.run(time.sleep, 0.3))
+        while not blocking.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        return ticks
+
+    assert asyncio.run(scenario()) > 5
+    stage.shutdown()
@@ -0,0 +1,89 @@
+import numpy as np
+from src.embeddings.embedding_cache import EmbeddingCache
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    """
+    Checks that vectors survive a restart and that hits/misses are counted.
+    """
+    path = str(tmp_path / "cache.sqlite")
+    key = EmbeddingCache.make_key("clip-ViT-B-32", "text", b"hello")
+
+    cache = EmbeddingCache(path)
+    assert cache.get_many([key]) == {}
+    cache.put_many({key: [0.5, 0.25]})
+
+    reopened = EmbeddingCache(path)
+    found = reopened.get_many([key])
+    assert np.allclose(found[key], [0.5, 0.25])
+
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 0
+
+def test_cache_keys_depend_on_model_and_modality():
+    """
+    Checks that the same bytes never collide across models or modalities.
+    """
+    keys = {
+        EmbeddingCache.make_key("clip-ViT-B-32", "text", b"x"),
+        EmbeddingCache.make_key("clip-ViT-B-32", "image", b"x"),
+        EmbeddingCache.make_key("other-model", "text", b"x"),
+    }
+    assert len(keys) == 3
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """
+    Checks that the disk layer stays under its size cap.
+    """
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=10, memory_entries=2)
+    for i in range(25):
+        cache.put_many({f"key-{i}": [float(i)]})
+
+    stats = cache.stats()
+    assert stats["disk_entries"] <= 10
+    assert stats["evictions"] > 0
+    assert "key-24" in cache.get_many(["key-24"])
+
+def test_long_text_is_windowed_and_max_pooled():
+    """
+    Checks that long texts are split into windows and pooled back into one unit vector each.
+    """
+    from src.embeddings.model_loader import EmbeddingModel
+
+    model = EmbeddingModel.__new__(EmbeddingModel)  # skip loading a real model
+    model.as_numpy = True
+    seen_windows = []
+
+    def fake_embed_text(windows):
+        seen_windows.extend(windows)
+        return [[1.0, 0.0] if "needle" in w else [0.0, 1.0] for w in windows]
+
+    model.embed_text = fake_embed_text
+    long_text = "hay " * 500 + "needle"
+    vectors = model.embed_long_text([long_text, "short"], window_chars=1000, overlap_chars=200)
+
+    assert len(vectors) == 2
+    assert len(seen_windows) == 4  # three windows for the long text, one for the short one
+    assert np.allclose(vectors[0], [2 ** -0.5, 2 ** -0.5])  # the needle survives pooling
+    assert np.allclose(vectors[1], [0.0, 1.0])
+
+def test_disk_hits_do_not_write_on_every_lookup(tmp_path):
+    """
+    Checks that a disk hit only refreshes recency for rows that went stale, and that
+    the refresh is written with the next batch instead of in the lookup.
+    """
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path).put_many({"fresh": [1.0], "stale": [2.0]})
+    writer = EmbeddingCache(path)
+    writer.conn.execute("UPDATE embeddings SET last_used = 0 WHERE key = 'stale'")
+    writer.conn.commit()
+
+    cache = EmbeddingCache(path, touch_interval=600)
+    cache.get_many(["fresh", "stale"])
+    assert not cache.conn.in_transaction
+    assert set(cache.pending_touches) == {"stale"}
+
+    cache.put_many({"new": [3.0]})
+    assert cache.pending_touches == {}
+    last_used = cache.conn.execute("SELECT last_used FROM embeddings WHERE key = 'stale'").fetchone()[0]
+    assert last_used > 0
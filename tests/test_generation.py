@@ -0,0 +1,107 @@
+from PIL import Image
+from src.generation.answer_cache import AnswerCache
+from src.generation.context_packer import ContextPacker
+from src.generation.image_preprocessor import ImagePreprocessor
+
+def _context(*ids):
+    return {"text_chunks": [{"id": i} for i in ids], "images": []}
+
+def test_answer_cache_exact_and_normalized_hits():
+    """
+    Checks that the same question over the same context is served from the cache.
+    """
+    cache = AnswerCache(model_name="llava")
+    cache.put("What is the Q3 revenue?", _context("a", "b"), "42")
+
+    assert cache.get("  what is the q3   revenue ", _context("b", "a")) == "42"
+    assert cache.get("What is the Q3 revenue?", _context("a", "c")) is None
+    assert cache.stats()["exact_hits"] == 1
+
+def test_answer_cache_semantic_hit_requires_same_context():
+    """
+    Checks that paraphrases reuse an answer only when retrieval returned the same chunks.
+    """
+    cache = AnswerCache(model_name="llava", semantic_threshold=0.9)
+    cache.put("q3 revenue", _context("a"), "42", query_embedding=[1.0, 0.0])
+
+    assert cache.get("revenue in q3", _context("a"), query_embedding=[0.99, 0.05]) == "42"
+    assert cache.get("revenue in q3", _context("b"), query_embedding=[0.99, 0.05]) is None
+    assert cache.get("something else", _context("a"), query_embedding=[0.0, 1.0]) is None
+
+def test_answer_cache_ttl_size_and_corpus_invalidation():
+    """
+    Checks expiry, the size cap and invalidation when the corpus changes.
+    """
+    cache = AnswerCache(model_name="llava", max_entries=2, ttl_seconds=0)
+    cache.put("q", _context("a"), "old", corpus_version=1)
+    assert cache.get("q", _context("a"), corpus_version=1) is None  # expired
+
+    cache = AnswerCache(model_name="llava", max_entries=2)
+    for i in range(3):
+        cache.put(f"q{i}", _context("a"), str(i), corpus_version=1)
+    assert cache.stats()["entries"] == 2
+
+    assert cache.get("q2", _context("a"), corpus_version=1) == "2"
+    assert cache.get("q2", _context("a"), corpus_version=2) is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_context_packer_budget_dedup_and_table_summaries():
+    """
+    Checks that tables use their plain-text summary, overlapping chunks are dropped
+    and the least relevant chunk is truncated to the token budget.
+    """
+    passage = "Revenue grew twelve percent in the third quarter driven by exports. " * 3
+    chunks = [
+        {"content": "<table><tr><td>Q3</td><td>42</td></tr></table>",
+         "metadata": {"type": "table", "text_summary": "Q3 revenue 42"}},
+        {"content": passage, "metadata": {"type": "text"}},
+        {"content": passage.upper(), "metadata": {"type": "text"}},  # same words, re-chunked
+        {"content": "Costs fell. " + "Staffing details follow here. " * 40, "metadata": {"type": "text"}},
+    ]
+
+    texts, stats = ContextPacker(max_tokens=100, min_chunk_tokens=10).pack(chunks)
+
+    assert texts[0] == "Q3 revenue 42"
+    assert texts[1] == passage.strip()
+    assert stats["duplicates"] == 1 and stats["truncated"] == 1
+    assert stats["tokens_out"] <= 100 < stats["tokens_in"]
+
+def test_image_preprocessor_downscales_once(tmp_path):
+    """
+    Checks that large images are downscaled into the cache and reused on the next request.
+    """
+    source = tmp_path / "page.png"
+    Image.new("RGB", (2000, 1000), color="white").save(source)
+    preprocessor = ImagePreprocessor(max_side=500, cache_dir=str(tmp_path / "cache"))
+
+    prepared = preprocessor.prepare(str(source))
+
+    assert prepared != str(source)
+    with Image.open(prepared) as image:
+        assert image.size == (500, 250)
+    assert preprocessor.prepare(str(source)) == prepared
+    assert preprocessor.stats()["cache_hits"] == 1
+
+def test_stream_answer_builds_prompt_off_the_event_loop(tmp_path):
+    """
+    Checks that prompt building (image downscaling, packing) runs on a worker thread,
+    not on the event loop driving the stream.
+    """
+    import asyncio
+    import threading
+    from src.generation.generator import Generator, NO_CONTEXT_ANSWER
+
+    generator = Generator(image_cache_dir=str(tmp_path / "image_cache"))
+    threads = []
+
+    def build_prompt(query, context):
+        threads.append(threading.current_thread())
+        return None, []
+
+    generator._build_prompt = build_prompt
+
+    async def collect():
+        return [token async for token in generator.stream_answer("q", {"text_chunks": [], "images": []})]
+
+    assert asyncio.run(collect()) == [NO_CONTEXT_ANSWER]
+    assert threads and threads[0] is not threading.main_thread()
@@ -2,6 +2,7 @@ import os
 import pytest
 from src.ingestion.document_parser import DocumentParser
 from src.ingestion.image_processor import ImageProcessor
+from src.ingestion.image_hashing import ImageStore
 
 def test_parser_initialization():
     """
@@ -30,4 +31,677 @@ def test_parse_dummy_file():
     """
     processor = ImageProcessor()
     result = processor.process_image("non_existent_file.png")
-    assert result is None  # It should return None, not crash
\ No newline at end of file
+    assert result is None  # It should return None, not crash
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.text_calls = 0
+        self.image_calls = 0
+
+    def embed_text(self, texts):
+        self.text_calls += 1
+        return [[0.1, 0.2] for _ in texts]
+
+    def embed_images(self, image_paths):
+        self.image_calls += 1
+        return [[0.3, 0.4] for _ in image_paths]
+
+
+class _RecordingDB:
+    def __init__(self):
+        self.writes = []
+
+    def upsert_data(self, ids, embeddings, documents, metadatas):
+        self.writes.append(len(embeddings))
+
+
+def test_pipeline_batches_embeds_and_writes():
+    """
+    Checks that chunks from several files are embedded and written once per batch.
+    """
+    from src.ingest import IngestionPipeline
+
+    embedder = _CountingEmbedder()
+    db = _RecordingDB()
+    pipeline = IngestionPipeline(db, embedder, batch_size=4)
+
+    text_chunk = {"type": "text", "content": "hello", "metadata": {"filename": "a.pdf", "page_number": 1}}
+    image_chunk = {"type": "image", "content": "", "image_path": "x.png",
+                   "metadata": {"filename": "b.png", "page_number": 1}}
+
+    pipeline.add_chunks([text_chunk] * 3)
+    pipeline.add_chunks([image_chunk] * 3)
+    pipeline.flush()
+
+    assert db.writes == [4, 2]
+    assert pipeline.chunks_saved == 6
+    assert embedder.text_calls == 1
+    assert embedder.image_calls == 2
+    assert set(pipeline.stage_seconds) == {"embed", "store"}
+
+
+def test_parallel_parser_isolates_failures():
+    """
+    Checks that files which can't be parsed still produce a result and don't stop the run.
+    """
+    from src.ingestion.parallel_parser import ParallelParser
+
+    parser = ParallelParser(num_workers=2, queue_size=1)
+    results = list(parser.parse_files(["missing_a.png", "missing_b.jpg", "missing_c.png"]))
+
+    assert sorted(r["filepath"] for r in results) == ["missing_a.png", "missing_b.jpg", "missing_c.png"]
+    assert all(r["chunks"] == [] for r in results)
+    assert all(r["error"] for r in results)
+
+
+def test_manifest_skips_unchanged_files(tmp_path):
+    """
+    Checks that the manifest recognises unchanged content and invalidates on model change.
+    """
+    from src.ingestion.manifest import IngestManifest, file_sha256, chunk_id
+
+    doc = tmp_path / "doc.pdf"
+    doc.write_bytes(b"version one")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    manifest = IngestManifest(manifest_path, model_name="clip-ViT-B-32")
+    file_hash = file_sha256(str(doc))
+    assert not manifest.is_current(str(doc), file_hash)
+
+    manifest.record(str(doc), file_hash, [chunk_id(str(doc), file_hash, 0)])
+    manifest.save()
+
+    reloaded = IngestManifest(manifest_path, model_name="clip-ViT-B-32")
+    assert reloaded.is_current(str(doc), file_hash)
+    assert chunk_id(str(doc), file_hash, 0) == chunk_id(str(doc), file_sha256(str(doc)), 0)
+    assert chunk_id(str(doc), file_hash, 0) != chunk_id(str(tmp_path / "copy.pdf"), file_hash, 0)
+
+    doc.write_bytes(b"version two")
+    assert not reloaded.is_current(str(doc), file_sha256(str(doc)))
+    assert not IngestManifest(manifest_path, model_name="other-model").is_current(str(doc), file_hash)
+
+    doc.unlink()
+    assert reloaded.removed_files(str(tmp_path), []) == [str(doc)]
+
+def test_incremental_ingest_keeps_identical_files_apart(tmp_path):
+    """
+    Checks that byte-identical files get their own chunks, and that deleting or
+    changing one of them leaves the other intact and current.
+    """
+    import numpy as np
+    from src.ingest import IndexWriter
+    from src.ingestion.manifest import file_sha256
+    from src.vector_store.base import create_vector_store
+
+    class _Embedder:
+        model_name = "fake"
+
+        def embed_text(self, texts):
+            return np.array([[1.0, 0.0] for _ in texts])
+
+        def embed_images(self, image_paths):
+            return np.array([[0.0, 1.0] for _ in image_paths])
+
+    def chunks_of(path):
+        return [{"type": "image", "content": "", "image_path": path,
+                 "metadata": {"source": path, "filename": os.path.basename(path), "page_number": 1}}]
+
+    first, second = str(tmp_path / "diagram_1.jpg"), str(tmp_path / "diagram_2.jpg")
+    for path in (first, second):
+        with open(path, "wb") as f:
+            f.write(b"same bytes")
+
+    store = create_vector_store("numpy", persist_dir=str(tmp_path / "db"), index="flat")
+    writer = IndexWriter(store, _Embedder(), image_store=ImageStore(root=str(tmp_path / "images")))
+    for path in (first, second):
+        writer.add_file(path, file_sha256(path), chunks_of(path))
+    writer.commit()
+    assert store.count() == 2
+
+    # Deleting one copy keeps the other's chunk
+    os.remove(second)
+    writer.remove_file(second)
+    writer.commit()
+    assert store.count() == 1
+    assert store.query_similar([0.0, 1.0], n_results=1)["metadatas"][0][0]["source"] == first
+    assert writer.manifest.is_current(first, file_sha256(first))
+
+    # Changing the remaining file replaces its chunk instead of adding one
+    with open(first, "wb") as f:
+        f.write(b"new bytes")
+    assert not writer.manifest.is_current(first, file_sha256(first))
+    writer.add_file(first, file_sha256(first), chunks_of(first))
+    writer.commit()
+    assert store.count() == 1
+    assert writer.manifest.is_current(first, file_sha256(first))
+    assert store.get_by_ids(writer.manifest.files[first]["chunk_ids"])["ids"] == writer.manifest.files[first]["chunk_ids"]
+
+def test_stored_metadata_has_filterable_fields():
+    """
+    Checks that chunks are stored with their type and the fields filters rely on, without None values.
+    """
+    from src.ingest import stored_metadata
+
+    chunk = {
+        "type": "image",
+        "content": "",
+        "image_path": "extracted_images/fig-1.jpg",
+        "metadata": {"source": "docs/tenant_a/report.pdf", "filename": "report.pdf", "page_number": None},
+    }
+    metadata = stored_metadata(chunk, ingested_at=1_700_000_000)
+
+    assert metadata["type"] == "image"
+    assert metadata["source_dir"] == os.path.normpath("docs/tenant_a")
+    assert metadata["image_path"] == "extracted_images/fig-1.jpg"
+    assert metadata["ingested_at"] == 1_700_000_000
+    assert "page_number" not in metadata and "text_summary" not in metadata
+
+def test_job_queue_coalesces_and_survives_restart(tmp_path):
+    """
+    Checks that repeated events for a file share one job, and that queued and
+    interrupted (running) jobs are picked up again after a restart.
+    """
+    from src.ingestion.job_queue import JobQueue
+
+    path = str(tmp_path / "jobs.sqlite")
+    jobs = JobQueue(path)
+    first = jobs.enqueue("docs/a.pdf", origin="watch")
+    assert jobs.enqueue("docs/a.pdf", origin="watch")["id"] == first["id"]
+    assert jobs.enqueue("docs/a.pdf", action="delete")["action"] == "delete"
+    jobs.enqueue("docs/b.pdf", origin="upload")
+
+    claimed = jobs.claim(max_jobs=1)
+    assert [job["path"] for job in claimed] == ["docs/a.pdf"]
+    jobs.close()  # the process dies with a.pdf still running
+
+    restarted = JobQueue(path)
+    assert restarted.counts()["queued"] == 2
+    assert restarted.available.is_set()
+    claimed = restarted.claim()
+    assert sorted(job["path"] for job in claimed) == ["docs/a.pdf", "docs/b.pdf"]
+
+    restarted.finish(claimed[0]["id"], chunks=3)
+    restarted.finish(claimed[1]["id"], error="boom")
+    assert restarted.get(claimed[0]["id"])["status"] == "done"
+    assert restarted.get(claimed[1]["id"])["status"] == "failed"
+    assert restarted.claim() == [] and not restarted.available.is_set()
+    restarted.close()
+
+def test_directory_watcher_polling_reports_settled_changes(tmp_path):
+    """
+    Checks that the polling fallback reports new files once they stop changing,
+    and deleted files, and ignores unsupported ones.
+    """
+    import threading
+    from src.ingestion.watcher import DirectoryWatcher
+
+    events = []
+    changed = threading.Event()
+
+    def on_change(path, action):
+        events.append((os.path.basename(path), action))
+        changed.set()
+
+    watcher = DirectoryWatcher([str(tmp_path)], on_change, poll_interval=0.1, settle_seconds=0.2, use_events=False)
+    assert watcher.mode == "polling"
+    watcher.start()
+    try:
+        (tmp_path / "notes.txt").write_text("not ingested")
+        (tmp_path / "scan.png").write_bytes(b"fake png")
+        assert changed.wait(5)
+        assert events == [("scan.png", "ingest")]
+
+        changed.clear()
+        (tmp_path / "scan.png").unlink()
+        assert changed.wait(5)
+        assert events[-1] == ("scan.png", "delete")
+    finally:
+        watcher.stop()
+
+def test_page_router_sends_only_plain_text_pages_to_fast():
+    """
+    Checks the per-page routing rules: scanned, picture, table-like and numeric
+    pages need hi_res; ordinary text pages are fine with fast.
+    """
+    from src.ingestion.page_router import PageRouter
+
+    router = PageRouter()
+    page = {"page": 1, "chars": 1500, "digits": 40, "images": 0, "rulings": 0}
+    assert router.route(page) == "fast"
+    assert router.route({**page, "chars": 20, "digits": 0}) == "hi_res"  # scanned
+    assert router.route({**page, "images": 1}) == "hi_res"
+    assert router.route({**page, "rulings": 12}) == "hi_res"  # ruled table
+    assert router.route({**page, "digits": 900}) == "hi_res"  # numeric table
+
+def _greedy_chunk_by_title(elements, max_characters, new_after_n_chars, combine_text_under_n_chars):
+    # Stand-in for unstructured's chunk_by_title (not installed everywhere) that makes the
+    # same kind of forward-only decisions: new section at a Title, size limits, tables alone
+    chunks, texts, ids, pages = [], [], [], []
+
+    def close():
+        if texts:
+            chunks.append(({"type": "text", "content": "\n\n".join(texts), "page_number": pages[0]}, list(ids)))
+        texts.clear(), ids.clear(), pages.clear()
+
+    for element in elements:
+        text, length = element["text"], len("\n\n".join(texts))
+        if element["category"] == "Table":
+            close()
+            chunks.append(({"type": "table", "content": element["text_as_html"], "text_summary": text,
+                            "page_number": element["page_number"]}, [element["id"]]))
+            continue
+        if texts and ((element["category"] == "Title" and length >= combine_text_under_n_chars)
+                      or length >= new_after_n_chars or length + 2 + len(text) > max_characters):
+            close()
+        texts.append(text), ids.append(element["id"]), pages.append(element["page_number"])
+    close()
+    return chunks
+
+@pytest.fixture
+def greedy_chunking(monkeypatch):
+    from src.ingestion import chunking
+    monkeypatch.setattr(chunking, "_chunk_by_title", _greedy_chunk_by_title)
+
+def test_document_parser_merges_fast_and_hi_res_pages(tmp_path, monkeypatch, greedy_chunking):
+    """
+    Checks that pages parsed with different strategies come back as one chunk list
+    in page order, and that the per-strategy report counts the pages.
+    """
+    parser = DocumentParser(image_output_dir=str(tmp_path))
+    monkeypatch.setattr(parser.router, "plan", lambda file_path, pages=None: {"fast": [1, 3], "hi_res": [2]})
+    parsed_pages = {
+        "fast": [
+            {"category": "Title", "text": "Intro", "page_number": 1},
+            {"category": "NarrativeText", "text": "First page.", "page_number": 1},
+            {"category": "NarrativeText", "text": "Third page.", "page_number": 3},
+        ],
+        "hi_res": [
+            {"category": "Table", "text": "a b", "text_as_html": "<table></table>", "page_number": 2},
+            {"category": "Image", "text": "", "image_path": "fig.png", "page_number": 2},
+        ],
+    }
+    calls = []
+
+    def fake_partition(file_path, pages, strategy, whole_file):
+        calls.append((strategy, pages, whole_file))
+        return parsed_pages[strategy]
+
+    monkeypatch.setattr(parser, "_partition", fake_partition)
+
+    chunks = parser.parse_pdf("report.pdf")
+
+    assert calls == [("fast", [1, 3], False), ("hi_res", [2], False)]
+    assert [(chunk["type"], chunk["metadata"]["page_number"]) for chunk in chunks] == [
+        ("text", 1), ("table", 2), ("text", 3), ("image", 2)
+    ]
+    assert chunks[0]["content"] == "Intro\n\nFirst page."
+    assert chunks[1]["content"] == "<table></table>"
+    assert parser.last_report["pages"] == 3
+    assert parser.last_report["fast"]["pages"] == 2
+    assert parser.last_report["hi_res"]["pages"] == 1
+
+def _section_elements(first_page, last_page):
+    # A titled section every third page, with paragraphs long enough to fill chunks
+    elements = []
+    for page in range(first_page, last_page + 1):
+        if page % 3 == 1:
+            elements.append({"category": "Title", "text": f"Section {page}", "page_number": page})
+        elements.append({"category": "NarrativeText", "text": f"Page {page} " + "word " * 100, "page_number": page})
+        if page == 11:
+            elements.append({"category": "Table", "text": "1 2", "text_as_html": "<table/>", "page_number": page})
+    return elements
+
+def test_sharded_chunks_match_whole_document_across_seams(greedy_chunking):
+    """
+    Checks that shards finishing out of order are stitched into exactly the chunks
+    (content, boundaries and page numbers) a single pass over the document gives,
+    including the chunk that starts before a seam and continues after it.
+    """
+    from src.ingestion.chunking import chunk_elements
+    from src.ingestion.parallel_parser import _ShardStitcher
+
+    expected = chunk_elements(_section_elements(1, 12), "manual.pdf")
+
+    stitcher = _ShardStitcher("manual.pdf", shard_count=3)
+    shards = {index: {"elements": _section_elements(first, first + 3), "error": None, "seconds": 1.0, "report": None}
+              for index, first in enumerate((1, 5, 9))}
+    results = stitcher.add(2, shards[2]) + stitcher.add(0, shards[0])
+    assert [result["final"] for result in results] == [False]  # shard 2 waits for shard 1
+    results += stitcher.add(1, shards[1])
+    assert [result["final"] for result in results] == [False, False, True]
+
+    chunks = [chunk for result in results for chunk in result["chunks"]]
+    assert chunks == expected
+    # Short sections are combined, so the first chunk runs from page 1 across the seam after page 4
+    seam_chunk = chunks[0]
+    assert "Page 4 " in seam_chunk["content"] and "Page 5 " in seam_chunk["content"]
+    assert seam_chunk["metadata"]["page_number"] == 1
+    assert results[0]["chunks"] == []
+    assert [(chunk["type"], chunk["metadata"]["page_number"]) for chunk in chunks] == [
+        ("text", 1), ("text", 7), ("table", 11), ("text", 12)
+    ]
+
+def test_title_chunker_holds_back_every_piece_of_a_split_element():
+    """
+    Checks that when the last element was split over several chunks, none of its
+    pieces is handed out before the element can no longer grow.
+    """
+    from src.ingestion.chunking import TitleChunker
+
+    def split_chunks(elements, **options):
+        # One chunk per 10 characters of each element
+        return [({"type": "text", "content": element["text"][start:start + 10], "page_number": element["page_number"]},
+                 [element["id"]])
+                for element in elements for start in range(0, len(element["text"]), 10)]
+
+    chunker = TitleChunker("doc.pdf", chunk_function=split_chunks)
+    first = chunker.add([{"category": "NarrativeText", "text": "a" * 10, "page_number": 1},
+                         {"category": "NarrativeText", "text": "b" * 25, "page_number": 1}])
+    assert [chunk["content"] for chunk in first] == ["a" * 10]
+    rest = chunker.add([{"category": "NarrativeText", "text": "c" * 5, "page_number": 2}]) + chunker.flush()
+    assert [chunk["content"] for chunk in rest] == ["b" * 10, "b" * 10, "b" * 5, "c" * 5]
+
+def test_sharded_chunk_by_title_matches_whole_document():
+    """
+    Same seam check with unstructured's own chunk_by_title, where it is installed.
+    """
+    pytest.importorskip("unstructured.chunking.title")
+    from src.ingestion.chunking import TitleChunker, chunk_elements
+
+    elements = _section_elements(1, 12)
+    chunker = TitleChunker("manual.pdf")
+    sharded = []
+    for first in (1, 5, 9):
+        sharded += chunker.add([element for element in elements if first <= element["page_number"] < first + 4])
+    sharded += chunker.flush()
+    assert sharded == chunk_elements(elements, "manual.pdf")
+
+def test_failed_shard_fails_the_file_once(monkeypatch, greedy_chunking):
+    """
+    Checks that a large PDF is split into page ranges, and that a failing shard ends
+    the file with one error and no further results.
+    """
+    from src.ingestion import parallel_parser
+    from src.ingestion.parallel_parser import ParallelParser, _ShardStitcher
+
+    monkeypatch.setattr(parallel_parser, "_count_pages", lambda filepath: 120 if filepath == "big.pdf" else 3)
+    stitchers = {}
+    tasks = list(ParallelParser(num_workers=1, shard_pages=50)._tasks(["big.pdf", "small.pdf"], stitchers))
+    assert [(path, pages and (pages[0], pages[-1]), index) for path, pages, index in tasks] == [
+        ("big.pdf", (1, 50), 0), ("big.pdf", (51, 100), 1), ("big.pdf", (101, 120), 2), ("small.pdf", None, 0)
+    ]
+
+    stitcher = _ShardStitcher("big.pdf", shard_count=3)
+    ok = {"elements": _section_elements(1, 2), "error": None, "seconds": 1.0, "report": None}
+    assert [result["final"] for result in stitcher.add(0, ok)] == [False]
+    failed = stitcher.add(1, {"elements": [], "error": "ValueError: bad page", "seconds": 1.0, "report": None})
+    assert [(result["error"], result["final"]) for result in failed] == [("ValueError: bad page", True)]
+    assert stitcher.add(2, ok) == []
+
+def test_index_writer_appends_shards_and_drops_failed_files(tmp_path):
+    """
+    Checks that shards of one file are numbered as one file, and that removing a
+    file halfway through drops the shards already buffered or stored.
+    """
+    import numpy as np
+    from src.ingest import IndexWriter
+    from src.vector_store.base import create_vector_store
+
+    class _Embedder:
+        model_name = "fake"
+
+        def embed_text(self, texts):
+            return np.array([[1.0, 0.0] for _ in texts])
+
+    def shard(path, *pages):
+        return [{"type": "text", "content": f"page {page}",
+                 "metadata": {"source": path, "filename": path, "page_number": page}} for page in pages]
+
+    store = create_vector_store("numpy", persist_dir=str(tmp_path / "db"), index="flat")
+    writer = IndexWriter(store, _Embedder(), batch_size=2, image_store=ImageStore(root=str(tmp_path / "images")))
+    writer.add_file("big.pdf", "hash", shard("big.pdf", 1, 2))
+    writer.add_file("big.pdf", "hash", shard("big.pdf", 51), append=True)
+    writer.add_file("broken.pdf", "hash", shard("broken.pdf", 1, 2, 3))
+    writer.remove_file("broken.pdf")  # a later shard failed
+    writer.commit()
+
+    assert store.count() == 3
+    assert len(set(writer.manifest.files["big.pdf"]["chunk_ids"])) == 3
+    assert "broken.pdf" not in writer.manifest.files
+
+def _chart(path, size=(200, 120), bars=(30, 80, 50, 100)):
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    width = size[0] // (len(bars) + 1)
+    for index, height in enumerate(bars):
+        left = width // 2 + index * width
+        draw.rectangle([left, size[1] - height * size[1] // 120, left + width // 2, size[1]], fill="navy")
+    image.save(path)
+    return str(path)
+
+def test_image_store_files_near_duplicates_once(tmp_path):
+    """
+    Checks that a rescaled re-encoding of an image from another document is filed
+    under the first copy, that a different image is not, that tiny images are dropped,
+    and that every occurrence is recorded.
+    """
+    from PIL import Image
+
+    store = ImageStore(root=str(tmp_path / "store"))
+    first = store.add(_chart(tmp_path / "a.png"), "report_2023.pdf", 3)
+    assert first["shared"] is False and os.path.exists(first["path"])
+    assert not os.path.exists(tmp_path / "a.png")  # moved into the store
+
+    with Image.open(first["path"]) as image:
+        image.convert("RGB").resize((300, 180)).save(tmp_path / "b.jpg", quality=70)
+    again = store.add(str(tmp_path / "b.jpg"), "report_2024.pdf", 1)
+    assert again["shared"] is True and again["key"] == first["key"] and again["path"] == first["path"]
+    assert not os.path.exists(tmp_path / "b.jpg")
+
+    other = store.add(_chart(tmp_path / "c.png", bars=(100, 20, 90, 10)), "report_2024.pdf", 2)
+    assert other["shared"] is False and other["key"] != first["key"]
+
+    Image.new("RGB", (12, 12), "red").save(tmp_path / "bullet.png")
+    assert store.add(str(tmp_path / "bullet.png"), "report_2024.pdf", 2) is None
+
+    assert store.occurrences(first["key"]) == [
+        {"source": "report_2023.pdf", "page_number": 3}, {"source": "report_2024.pdf", "page_number": 1}
+    ]
+
+def test_image_processor_indexes_every_copy_but_ocrs_once(tmp_path):
+    """
+    Checks that a copy of an image file gets its own chunk, with the OCR text of the
+    first copy taken from the cache.
+    """
+    import shutil
+    from src.ingestion.ocr import OCREngine
+
+    calls = []
+    ocr = OCREngine(cache_path=str(tmp_path / "ocr.sqlite"), precheck=False,
+                    ocr_function=lambda image, lang: calls.append(1) or "Q3 revenue")
+    processor = ImageProcessor(ImageStore(root=str(tmp_path / "store")), ocr)
+    original = _chart(tmp_path / "chart.png")
+    copy = str(tmp_path / "chart_copy.png")
+    shutil.copyfile(original, copy)
+
+    result = processor.process_image(original)
+    assert result["content"] == "Q3 revenue" and result["metadata"]["origin"] == "file"
+    assert result["metadata"]["image_hash"] and os.path.exists(original)
+    duplicate = processor.process_image(copy)
+    assert duplicate["content"] == "Q3 revenue" and duplicate["metadata"]["source"] == copy
+    assert duplicate["image_path"] == result["image_path"]
+    assert processor.last_report["ocr"]["cached"] == 1 and len(calls) == 1
+
+def _image_writer(tmp_path, image_store):
+    import numpy as np
+    from src.ingest import IndexWriter
+    from src.vector_store.base import create_vector_store
+
+    class _Embedder:
+        model_name = "fake"
+
+        def embed_text(self, texts):
+            return np.array([[1.0, 0.0] for _ in texts])
+
+        def embed_images(self, image_paths):
+            return np.array([[0.0, 1.0] for _ in image_paths])
+
+    store = create_vector_store("numpy", persist_dir=str(tmp_path / "db"), index="flat")
+    return IndexWriter(store, _Embedder(), image_store=image_store)
+
+def test_deleting_an_images_first_source_keeps_it_for_the_others(tmp_path):
+    """
+    Checks that when the file an image was first filed for is deleted, the other
+    files with that image keep their chunks and the stored copy, and that the image
+    is deleted once no file has it.
+    """
+    import shutil
+    from src.ingestion.manifest import file_sha256
+    from src.ingestion.ocr import OCREngine
+
+    images = ImageStore(root=str(tmp_path / "store"))
+    processor = ImageProcessor(images, OCREngine(cache_path=None, precheck=False,
+                                                 ocr_function=lambda image, lang: "Q3 revenue"))
+    writer = _image_writer(tmp_path, images)
+    first = _chart(tmp_path / "chart_1.png")
+    copy = str(tmp_path / "chart_3.png")
+    shutil.copyfile(first, copy)
+    chunks = {path: processor.process_image(path) for path in (first, copy)}
+    key = chunks[first]["metadata"]["image_hash"]
+    for path, chunk in chunks.items():
+        writer.add_file(path, file_sha256(path), [chunk])
+    writer.commit()
+    assert writer.db.count() == 2
+    assert images.owner(key) == first
+
+    os.remove(first)
+    writer.remove_file(first)
+    writer.commit()
+    remaining = writer.db.query_similar([0.0, 1.0], n_results=2)["metadatas"][0]
+    assert [metadata["source"] for metadata in remaining] == [copy]
+    assert os.path.exists(remaining[0]["image_path"])
+    assert images.occurrences(key) == [{"source": copy, "page_number": None}]
+    assert images.owner(key) == copy
+
+    os.remove(copy)
+    writer.remove_file(copy)
+    writer.commit()
+    assert writer.db.count() == 0
+    assert images.occurrences(key) == [] and not os.path.exists(remaining[0]["image_path"])
+
+def test_image_file_ocr_text_is_keyword_searchable(tmp_path):
+    """
+    Checks that an ingested image file can be found by the words OCR read in it, and
+    that an image extracted from a PDF is not indexed by its placeholder text.
+    """
+    from src.ingestion.manifest import file_sha256
+    from src.ingestion.ocr import OCREngine
+    from src.retrieval.bm25_index import BM25Index, bm25_path
+
+    images = ImageStore(root=str(tmp_path / "store"))
+    processor = ImageProcessor(images, OCREngine(cache_path=None, precheck=False,
+                                                 ocr_function=lambda image, lang: "Quarterly revenue by region"))
+    writer = _image_writer(tmp_path, images)
+    path = _chart(tmp_path / "revenue.png")
+    writer.add_file(path, file_sha256(path), [processor.process_image(path)])
+    writer.add_file("report.pdf", "hash", [{
+        "type": "image", "content": "Image extracted from page.", "image_path": path,
+        "metadata": {"source": "report.pdf", "filename": "report.pdf", "page_number": 2},
+    }])
+    writer.commit()
+
+    index = BM25Index.load(bm25_path(writer.db.persist_dir))
+    assert [chunk_id for chunk_id, _ in index.search("revenue region", 5)] == writer.manifest.files[path]["chunk_ids"]
+    assert index.search("extracted page", 5) == []
+
+def test_ingest_script_reports_image_files(tmp_path, monkeypatch):
+    """
+    Checks that the ingest script's per-file report handling copes with image files,
+    whose report has OCR figures but no PDF strategies.
+    """
+    import numpy as np
+    import src.ingest as ingest
+    from src.ingestion import parallel_parser
+    from src.ingestion.ocr import OCREngine
+
+    class _Embedder:
+        model_name = "fake"
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def embed_text(self, texts):
+            return np.array([[1.0, 0.0] for _ in texts])
+
+        def embed_images(self, image_paths):
+            return np.array([[0.0, 1.0] for _ in image_paths])
+
+        def cache_stats(self):
+            return {}
+
+    class _Parser:
+        # Parses in this process, the way a worker would
+        num_workers = 1
+        image_output_dir = str(tmp_path / "store")
+
+        def __init__(self, **kwargs):
+            pass
+
+        def parse_files(self, filepaths):
+            for filepath in filepaths:
+                yield parallel_parser._parse_in_worker(filepath)
+
+    monkeypatch.setattr(parallel_parser, "_worker_state", {"img_processor": ImageProcessor(
+        ImageStore(root=_Parser.image_output_dir),
+        OCREngine(cache_path=None, precheck=False, ocr_function=lambda image, lang: "Q3 revenue"),
+    )})
+    monkeypatch.setattr(ingest, "EmbeddingModel", _Embedder)
+    monkeypatch.setattr(ingest, "ParallelParser", _Parser)
+    data_dir = tmp_path / "docs"
+    data_dir.mkdir()
+    _chart(data_dir / "chart.png")
+
+    stats = ingest.main(data_dir=str(data_dir), vector_store="numpy", persist_dir=str(tmp_path / "db"),
+                        embedding_cache_path=None)
+
+    assert (stats["docs"], stats["chunks"], stats["failures"]) == (1, 1, 0)
+    assert stats["ocr"]["images"] == 1
+    assert all(totals["pages"] == 0 for totals in stats["parse_strategies"].values())
+
+def test_ocr_engine_prechecks_normalizes_and_caches(tmp_path):
+    """
+    Checks that text-free images never reach OCR, that OCR sees a normalized grayscale
+    image, and that results are cached by image hash.
+    """
+    from PIL import Image, ImageDraw
+    from src.ingestion.ocr import OCREngine, likely_has_text
+
+    page = Image.new("RGB", (400, 200), "white")
+    draw = ImageDraw.Draw(page)
+    for line in range(8):
+        draw.text((10, 10 + line * 22), "Quarterly revenue grew 12% year over year", fill="black")
+    page.save(tmp_path / "page.png")
+    _chart(tmp_path / "chart.png")
+    Image.new("RGB", (300, 300), "white").save(tmp_path / "blank.png")
+
+    with Image.open(tmp_path / "page.png") as image:
+        assert likely_has_text(image)
+    for name in ("chart.png", "blank.png"):
+        with Image.open(tmp_path / name) as image:
+            assert not likely_has_text(image)
+
+    seen = []
+
+    def fake_ocr(image, lang):
+        seen.append((image.mode, image.width))
+        return f"text {len(seen)}"
+
+    engine = OCREngine(cache_path=str(tmp_path / "ocr.sqlite"), ocr_function=fake_ocr)
+    first = engine.ocr(str(tmp_path / "page.png"), image_hash="abc")
+    assert (first["text"], first["cached"], first["skipped"]) == ("text 1", False, False)
+    assert seen == [("L", 1000)]  # grayscale, upscaled for Tesseract
+    assert engine.ocr(str(tmp_path / "page.png"), image_hash="abc")["cached"] is True
+    assert engine.ocr(str(tmp_path / "chart.png"))["skipped"] is True
+    assert len(seen) == 1
@@ -0,0 +1,46 @@
+import asyncio
+from src.api.concurrency import StageLimiter
+from src.monitoring.metrics import MetricsRegistry, gauge
+from src.monitoring.tracing import span, collect_timings, STAGE_SECONDS
+
+def test_histogram_renders_prometheus_buckets():
+    """
+    Checks cumulative buckets, sum and count in the text exposition format.
+    """
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo.", label_names=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="embed")
+    registry.add_collector(lambda: [gauge("demo_depth", "Depth.", {(("queue", "a"),): 2})])
+
+    text = registry.render()
+
+    assert 'demo_seconds_bucket{stage="embed",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{stage="embed",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{stage="embed",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="embed"} 4' in text
+    assert 'demo_depth{queue="a"} 2' in text
+
+def test_spans_reach_request_timings_through_stage_pools():
+    """
+    Checks that spans recorded on a StageLimiter thread land in the calling request's
+    timings, and that nothing is collected outside collect_timings.
+    """
+    limiter = StageLimiter("demo", max_concurrency=1, max_queue=1)
+
+    def work():
+        with span("demo.work"):
+            return 42
+
+    async def request():
+        with collect_timings() as timings:
+            assert await limiter.run(work) == 42
+        return timings
+
+    timings = asyncio.run(request())
+    limiter.shutdown()
+
+    assert set(timings) == {"demo.queue", "demo.work", "total"}
+    assert ("demo.work",) in STAGE_SECONDS.series
+    with span("demo.untracked"):
+        pass  # no collector active: histogram only, no error
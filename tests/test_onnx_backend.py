@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+pytest.importorskip("sentence_transformers")
+
+from src.embeddings.model_loader import EmbeddingModel
+
+TEXTS = ["quarterly revenue grew in every region", "a pie chart with yellow and green slices"]
+
+def _cosines(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+@pytest.mark.parametrize("backend,min_cosine", [("onnx", 0.999), ("onnx-int8", 0.97)])
+def test_onnx_backend_matches_torch(tmp_path, backend, min_cosine):
+    """
+    Checks that ONNX (and int8-quantized ONNX) vectors point the same way as the PyTorch ones.
+    """
+    image_path = str(tmp_path / "chart.png")
+    Image.new("RGB", (224, 224), color=(200, 180, 40)).save(image_path)
+
+    reference = EmbeddingModel(cache_path=None)
+    candidate = EmbeddingModel(cache_path=None, backend=backend, num_threads=2)
+
+    assert _cosines(reference.embed_text(TEXTS), candidate.embed_text(TEXTS)).min() >= min_cosine
+    assert _cosines(reference.embed_images([image_path]), candidate.embed_images([image_path])).min() >= min_cosine
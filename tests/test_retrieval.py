@@ -0,0 +1,287 @@
+import threading
+import numpy as np
+import pytest
+from src.retrieval.query_batcher import QueryBatcher
+from src.vector_store.compact_index import CompactVectorIndex
+
+class _FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def embed_text(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+class _FakeDB:
+    def __init__(self):
+        self.calls = 0
+
+    def query_similar_batch(self, query_embeddings, n_results=5, where=None):
+        self.calls += 1
+        rows = range(len(query_embeddings))
+        return {
+            "ids": [[f"q{i}-{j}" for j in range(n_results)] for i in rows],
+            "documents": [[f"doc {j}" for j in range(n_results)] for i in rows],
+            "metadatas": [[{} for _ in range(n_results)] for i in rows],
+            "distances": [[0.1 * j for j in range(n_results)] for i in rows],
+        }
+
+def test_concurrent_queries_share_one_batch():
+    """
+    Checks that queries arriving together are embedded and searched in one call,
+    and that each caller only gets the number of results it asked for.
+    """
+    embedder = _FakeEmbedder()
+    db = _FakeDB()
+    batcher = QueryBatcher(embedder, db, max_batch_size=8, max_wait_ms=200)
+
+    results = {}
+    def ask(n):
+        results[n] = batcher.search(f"query {n}", n_results=n)
+
+    threads = [threading.Thread(target=ask, args=(n,)) for n in (2, 4, 6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert db.calls == 1
+    assert len(embedder.calls) == 1 and len(embedder.calls[0]) == 3
+    assert {n: len(r["ids"][0]) for n, r in results.items()} == {2: 2, 4: 4, 6: 6}
+
+def test_bm25_ranks_keyword_matches_and_updates_incrementally(tmp_path):
+    """
+    Checks BM25 ranking, replacement/removal of chunks, and save/load.
+    """
+    from src.retrieval.bm25_index import BM25Index
+
+    index = BM25Index()
+    index.add(["a", "b", "c"], [
+        "quarterly revenue grew in the supply chain division",
+        "employee handbook and vacation policy",
+        "revenue revenue forecast for next quarter",
+    ])
+
+    hits = [chunk_id for chunk_id, _ in index.search("revenue forecast")]
+    assert hits[0] == "c" and "a" in hits and "b" not in hits
+
+    index.add(["c"], ["nothing relevant here"])
+    index.remove(["a"])
+    assert index.search("revenue") == []
+
+    path = str(tmp_path / "bm25.pkl")
+    index.save(path)
+    reloaded = BM25Index.load(path)
+    assert [chunk_id for chunk_id, _ in reloaded.search("vacation")] == ["b"]
+    assert len(reloaded) == 2
+
+def _clustered_vectors(n, dim, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    return (centers[rng.integers(0, 20, n)] + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+
+def test_compact_index_recall_and_memory(tmp_path):
+    """
+    Checks that int8 and float16 codes with float32 rescoring find the exact neighbours,
+    survive a save/load, and use a quarter/half of the float32 memory.
+    """
+    vectors = _clustered_vectors(3000, 64, seed=0)
+    queries = _clustered_vectors(50, 64, seed=1)
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+
+    for precision, max_ratio in (("int8", 0.3), ("float16", 0.5)):
+        index = CompactVectorIndex(str(tmp_path / precision), precision=precision)
+        index.add(ids, vectors)
+        index.save()
+
+        reloaded = CompactVectorIndex.load(str(tmp_path / precision))
+        assert reloaded.recall_at_k(queries, k=10) >= 0.98
+
+        report = reloaded.memory_report()
+        assert report["mb_per_million"] <= max_ratio * report["float32_mb_per_million"]
+
+def test_compact_index_replaces_and_removes(tmp_path):
+    """
+    Checks that re-adding an ID replaces its vector and removed IDs are never returned.
+    """
+    index = CompactVectorIndex(str(tmp_path), precision="int8")
+    index.add(["a", "b"], np.array([[1.0, 0.0], [0.0, 1.0]]))
+    index.add(["a"], np.array([[0.0, 1.0]]))
+    index.remove(["b"])
+
+    assert index.search(np.array([[0.0, 1.0]]), top_k=5) == [[("a", pytest.approx(1.0))]]
+    assert len(index) == 1
+
+def test_bm25_allowed_ids_filter_before_top_k():
+    """
+    Checks that BM25 pre-filtering returns allowed chunks even when better ones are excluded.
+    """
+    from src.retrieval.bm25_index import BM25Index
+
+    index = BM25Index()
+    index.add(["best", "good", "ok"], ["revenue revenue revenue", "revenue revenue", "revenue"])
+
+    assert [chunk_id for chunk_id, _ in index.search("revenue", top_k=1)] == ["best"]
+    assert [chunk_id for chunk_id, _ in index.search("revenue", top_k=1, allowed_ids={"ok"})] == ["ok"]
+    assert index.search("revenue", top_k=1, allowed_ids=set()) == []
+
+def test_retrieve_batch_uses_one_encode_and_one_search():
+    """
+    Checks that retrieve_batch embeds and searches every query in a single call each,
+    and returns one context per query in order.
+    """
+    from src.retrieval.retriever import Retriever
+
+    retriever = Retriever.__new__(Retriever)  # skip loading real models
+    retriever.embedding_model = _FakeEmbedder()
+    retriever.vector_db = _FakeDB()
+    retriever.dual_index = False
+    retriever.hybrid = False
+    retriever.calibration = {}
+    retriever.reranker = None
+
+    contexts = retriever.retrieve_batch(["a", "bb", "ccc"], top_k=2)
+
+    assert len(retriever.embedding_model.calls) == 1
+    assert retriever.vector_db.calls == 1
+    assert [context["text_chunks"][0]["id"] for context in contexts] == ["q0-0", "q1-0", "q2-0"]
+    assert all(len(context["text_chunks"]) == 2 for context in contexts)
+
+class _KeywordCrossEncoder:
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        return [float(text.count(query)) for query, text in pairs]
+
+def _reranker(budget_ms=None):
+    from src.retrieval.reranker import CrossEncoderReranker
+
+    reranker = CrossEncoderReranker.__new__(CrossEncoderReranker)  # skip loading a real model
+    reranker.model_name = "fake"
+    reranker.model = _KeywordCrossEncoder()
+    reranker.batch_size = 2
+    reranker.budget_ms = budget_ms
+    reranker.seconds_per_pair = None
+    reranker.lock = threading.Lock()
+    reranker.reranked = reranker.truncated = reranker.fallbacks = 0
+    return reranker
+
+def test_reranker_reorders_text_and_keeps_image_slots():
+    """
+    Checks that text candidates are re-ordered by the cross-encoder, images stay in place,
+    and an exhausted time budget falls back to the first-stage order.
+    """
+    items = [
+        {"id": "t1", "content": "nothing relevant", "metadata": {"type": "text"}},
+        {"id": "i1", "content": "", "metadata": {"type": "image"}},
+        {"id": "t2", "content": "tariff", "metadata": {"type": "text"}},
+        {"id": "t3", "content": "tariff tariff", "metadata": {"type": "text"}},
+    ]
+
+    reranker = _reranker()
+    assert [item["id"] for item in reranker.rerank("tariff", list(items), top_k=3)] == ["t3", "i1", "t2"]
+
+    reranker = _reranker(budget_ms=0)
+    assert [item["id"] for item in reranker.rerank("tariff", list(items), top_k=3)] == ["t1", "i1", "t2"]
+    assert reranker.stats()["fallbacks"] == 1
+
+def test_rewritten_bm25_index_is_swapped_in_without_blocking_queries(tmp_path, monkeypatch):
+    """
+    Checks that after an ingest rewrites the BM25 file, queries keep being answered from
+    the old index while the new one loads in the background, then switch over.
+    """
+    import os
+    import time
+    from src.retrieval.bm25_index import BM25Index
+    from src.retrieval.retriever import Retriever
+
+    path = str(tmp_path / "bm25.pkl")
+    old = BM25Index()
+    old.add(["old"], ["revenue report"])
+    old.save(path)
+
+    retriever = Retriever.__new__(Retriever)  # skip loading real models
+    retriever.lexical_index_path = path
+    retriever.lexical_index = None
+    retriever.lexical_index_mtime = None
+    retriever.lexical_lock = threading.Lock()
+    retriever.lexical_reload_lock = threading.Lock()
+    assert retriever._lexical_search("revenue", 5)[0][0] == "old"
+
+    new = BM25Index()
+    new.add(["new"], ["revenue report"])
+    new.save(path)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+
+    load = BM25Index.load
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load(p):
+        loading.set()
+        release.wait(5)
+        return load(p)
+
+    monkeypatch.setattr(BM25Index, "load", staticmethod(slow_load))
+    assert retriever._lexical_search("revenue", 5)[0][0] == "old"  # served while loading
+    assert loading.wait(5)
+    release.set()
+    deadline = time.monotonic() + 5
+    while retriever.lexical_index_mtime != os.stat(path).st_mtime_ns and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert retriever._lexical_search("revenue", 5)[0][0] == "new"
+
+def test_unreadable_bm25_index_falls_back_without_retrying_every_query(tmp_path, monkeypatch):
+    """
+    Checks that a BM25 file that fails to load gives vector-only results (no error),
+    that a failed reload keeps the last good index, and that neither is retried until
+    the file changes again.
+    """
+    import os
+    import time
+    from src.retrieval.bm25_index import BM25Index
+    from src.retrieval.retriever import Retriever
+
+    path = str(tmp_path / "bm25.pkl")
+    with open(path, "wb") as f:
+        f.write(b"not a pickle")
+
+    retriever = Retriever.__new__(Retriever)  # skip loading real models
+    retriever.lexical_index_path = path
+    retriever.lexical_index = None
+    retriever.lexical_index_mtime = None
+    retriever.lexical_lock = threading.Lock()
+    retriever.lexical_reload_lock = threading.Lock()
+
+    load = BM25Index.load
+    attempts = []
+
+    def counting_load(p):
+        attempts.append(p)
+        return load(p)
+
+    monkeypatch.setattr(BM25Index, "load", staticmethod(counting_load))
+    assert retriever._lexical_search("revenue", 5) == []
+    assert retriever._lexical_search("revenue", 5) == []
+    assert len(attempts) == 1
+
+    good = BM25Index()
+    good.add(["good"], ["revenue report"])
+    good.save(path)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert retriever._lexical_search("revenue", 5)[0][0] == "good"
+
+    # A broken rewrite: the reload fails in the background, the good index stays
+    with open(path, "wb") as f:
+        f.write(b"truncated")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 2_000_000))
+    broken_mtime = os.stat(path).st_mtime_ns
+    assert retriever._lexical_search("revenue", 5)[0][0] == "good"
+    deadline = time.monotonic() + 5
+    while retriever.lexical_index_mtime != broken_mtime and time.monotonic() < deadline:
+        time.sleep(0.01)
+    while retriever.lexical_reload_lock.locked() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    reloads = len(attempts)
+    for _ in range(3):
+        assert retriever._lexical_search("revenue", 5)[0][0] == "good"
+    assert len(attempts) == reloads == 3
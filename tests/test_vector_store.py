@@ -0,0 +1,121 @@
+from datetime import datetime
+import numpy as np
+from src.vector_store.base import create_vector_store
+from src.vector_store.filters import build_where
+
+def _upsert(store, ids, vectors, source="doc.pdf"):
+    store.upsert_data(
+        ids=ids,
+        embeddings=vectors,
+        documents=[f"text of {chunk_id}" for chunk_id in ids],
+        metadatas=[{"source": source, "page_number": 1} for _ in ids],
+    )
+
+def test_numpy_store_search_and_sidecar_metadata(tmp_path):
+    """
+    Checks that the NumPy store returns Chroma-shaped results with documents and metadata.
+    """
+    store = create_vector_store("numpy", persist_dir=str(tmp_path), index="flat")
+    _upsert(store, ["a", "b", "c"], np.array([[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]]))
+
+    results = store.query_similar_batch(np.array([[1.0, 0.0], [0.0, 1.0]]), n_results=2)
+
+    assert results["ids"] == [["a", "b"], ["c", "b"]]
+    assert results["documents"][0][0] == "text of a"
+    assert results["metadatas"][1][0] == {"source": "doc.pdf", "page_number": 1}
+    assert np.allclose(results["distances"][0], [0.0, 0.4], atol=1e-6)
+    assert store.count() == 3
+
+def test_numpy_store_publishes_changes_to_readers(tmp_path):
+    """
+    Checks that a second process-like reader sees upserts, replacements and deletions
+    once the writer persists.
+    """
+    writer = create_vector_store("numpy", persist_dir=str(tmp_path), index="flat")
+    _upsert(writer, ["a", "b"], np.array([[1.0, 0.0], [0.0, 1.0]]), source="one.pdf")
+    _upsert(writer, ["c"], np.array([[0.9, 0.1]]), source="two.pdf")
+    writer.persist()
+
+    reader = create_vector_store("numpy", persist_dir=str(tmp_path), index="flat")
+    assert reader.query_similar([1.0, 0.0], n_results=3)["ids"] == [["a", "c", "b"]]
+
+    writer.delete_source("two.pdf")
+    _upsert(writer, ["a"], np.array([[0.0, 1.0]]), source="one.pdf")  # "a" moves
+    writer.persist()
+
+    assert reader.query_similar([1.0, 0.0], n_results=3)["ids"][0][-1] == "a"
+    assert reader.get_by_ids(["c"])["ids"] == []
+    assert reader.count() == 2
+
+def test_filters_are_pushed_into_the_search(tmp_path):
+    """
+    Checks that a filtered query returns the best matching chunks even when better
+    non-matching chunks exist (i.e. filtering happens before the top-k cut).
+    """
+    store = create_vector_store("numpy", persist_dir=str(tmp_path), index="flat")
+    ids = [f"c{i}" for i in range(20)]
+    vectors = np.array([[1.0, 0.01 * i] for i in range(20)])
+    metadatas = [{"source": f"docs/{'a' if i < 18 else 'b'}.pdf", "filename": "a.pdf" if i < 18 else "b.pdf",
+                  "source_dir": "docs", "type": "table" if i % 2 else "text", "page_number": i,
+                  "ingested_at": 1_700_000_000 + i} for i in range(20)]
+    store.upsert_data(ids, vectors, [""] * 20, metadatas)
+
+    where = build_where({"filename": "b.pdf"})
+    assert store.query_similar([1.0, 0.0], n_results=2, where=where)["ids"] == [["c18", "c19"]]
+
+    where = build_where({"type": ["table"], "page_min": 5, "page_max": 9,
+                         "ingested_after": datetime.fromtimestamp(1_700_000_006)})
+    assert sorted(store.matching_ids(where)) == ["c7", "c9"]
+    assert store.query_similar([1.0, 0.0], n_results=5, where=where)["ids"] == [["c7", "c9"]]
+
+def test_compact_index_follows_ingests_without_precision(tmp_path):
+    """
+    Checks that chunks written by a store without compact precision still reach an
+    existing compact index, so the API searching it doesn't miss new documents.
+    """
+    import pytest
+    pytest.importorskip("chromadb")
+    from src.ingestion.manifest import IngestManifest, manifest_path
+
+    def publish():
+        IngestManifest(manifest_path(str(tmp_path)), model_name="fake").save()  # bumps the corpus version
+
+    api_store = create_vector_store("chroma", persist_dir=str(tmp_path), compact_precision="int8")
+    _upsert(api_store, ["a"], np.array([[1.0, 0.0]]))
+    api_store.persist()
+    publish()
+    assert api_store.query_similar([1.0, 0.0], n_results=5)["ids"] == [["a"]]
+
+    ingest_store = create_vector_store("chroma", persist_dir=str(tmp_path))
+    _upsert(ingest_store, ["b"], np.array([[0.0, 1.0]]), source="new.pdf")
+    ingest_store.persist()
+    publish()
+    assert api_store.query_similar([0.0, 1.0], n_results=1)["ids"] == [["b"]]
+
+    # Chunks that bypassed the compact index entirely are synced on the next corpus change
+    ingest_store.collection.upsert(ids=["c"], embeddings=[[0.6, 0.8]], documents=["c"],
+                                   metadatas=[{"source": "old.pdf"}])
+    publish()
+    assert "c" in api_store.query_similar([0.6, 0.8], n_results=3)["ids"][0]
+
+def test_empty_filter_lists_are_rejected_and_matching_ids_are_cached():
+    """
+    Checks that an empty value list is an error rather than an IndexError, and that
+    the matching-ID set of a filter is computed once per corpus version.
+    """
+    import pytest
+    from src.vector_store.filters import MatchingIdsCache
+
+    with pytest.raises(ValueError):
+        build_where({"type": []})
+
+    calls = []
+    cache = MatchingIdsCache(max_entries=2)
+    where = build_where({"type": "text"})
+    compute = lambda: calls.append(1) or ["a", "b"]
+
+    assert cache.get(where, 1, compute) == {"a", "b"}
+    assert cache.get(build_where({"type": ["text"]}), 1, compute) == {"a", "b"}
+    assert len(calls) == 1
+    cache.get(where, 2, compute)  # the corpus changed
+    assert len(calls) == 2